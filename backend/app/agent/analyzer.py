@@ -1,49 +1,37 @@
-import re
+import os
 from datetime import datetime, timezone
+from pathlib import Path
 from typing import Any
 
-from app.agent.state import AgentState, FailureInfo
-from app.services.test_runner import run_pytest, run_syntax_check
-
-# Hardcoded pattern -> bug type mappings
-PATTERN_TO_BUG_TYPE = {
-    "unused import": "LINTING",
-    "SyntaxError": "SYNTAX",
-    "invalid syntax": "SYNTAX",
-    "missing ':'": "SYNTAX",
-    "expected ':'": "SYNTAX",
-    "IndentationError": "INDENTATION",
-    "ModuleNotFoundError": "IMPORT",
-    "AssertionError": "LOGIC",
-    "TypeError": "TYPE_ERROR",
-}
-
-
-def detect_bug_type(error_message: str) -> str | None:
-    """Detect bug type from error message. Returns None if unknown."""
-    msg_lower = error_message.lower()
-    for pattern, bug_type in PATTERN_TO_BUG_TYPE.items():
-        if pattern.lower() in msg_lower:
-            return bug_type
-    return None
-
-
-def extract_file_and_line(text: str) -> tuple[str | None, int | None]:
-    """Extract file path and line number from pytest/traceback output."""
-    # Match: File "path/to/file.py", line 123 (traceback format)
-    m = re.search(r'File\s+"([^"]+\.py)"[^,]*,\s*line\s+(\d+)', text)
-    if m:
-        return m.group(1).strip(), int(m.group(2))
-    # Match: FAILED path/to/file.py::test_name or path/to/file.py:123
-    m = re.search(r"(?:FAILED\s+)?([a-zA-Z0-9_/\\\.\-]+\.py)(?::(\d+))?(?:::|$)", text)
-    if m:
-        return m.group(1).strip(), int(m.group(2)) if m.group(2) else None
-    return None, None
+from app.agent.classifier import classify, detect_bug_type
+from app.agent.rules import SYNTAX_FIXPOINT_MAX_ROUNDS, repair_syntax, syntax_failure
+from app.agent.state import AgentState, FailureInfo, FixInfo
+from app.services.import_graph import affected_tests
+from app.services.metrics import FIXES, ITERATIONS
+from app.services.run_events import emit
+from app.services.test_history import durations, previously_failing, record_results
+from app.services.test_runner import records_to_history, run_lint_check, run_pytest, run_syntax_check
+from app.services.venv_service import ensure_venv
+
+# Run previously failing tests first; only run the full suite once they pass
+TEST_PRIORITIZATION = os.environ.get("TEST_PRIORITIZATION", "1").strip() not in ("0", "false", "no")
+# Stop the prioritized run after this many failures (0 = run all previously failing tests)
+FAIL_FAST_MAXFAIL = int(os.environ.get("FAIL_FAST_MAXFAIL", "0"))
+
+# Once a full run exists, confirm with only the tests that import files fixed since then
+TEST_IMPACT_ANALYSIS = os.environ.get("TEST_IMPACT_ANALYSIS", "1").strip() not in ("0", "false", "no")
+# Safety net: every Nth iteration after a full run is a full run again (0 = only the first)
+TEST_IMPACT_FULL_EVERY = int(os.environ.get("TEST_IMPACT_FULL_EVERY", "3"))
+
+# Static unused-import pass; findings are fixed along with a failing iteration, never fail it alone
+LINT_CHECK = os.environ.get("LINT_CHECK", "1").strip() not in ("0", "false", "no")
+
+# pytest exit codes meaning "could not run the selection" (usage error, nothing collected)
+_SELECTION_UNUSABLE = (4, 5)
 
 
 def to_repo_relative_path(full_path: str, repo_path: str) -> str:
     """Convert absolute path to repo-relative (e.g. src/validator.py)."""
-    from pathlib import Path
     full = Path(full_path)
     repo = Path(repo_path)
     try:
@@ -57,109 +45,280 @@ def to_repo_relative_path(full_path: str, repo_path: str) -> str:
         return full_path.replace("\\", "/")
 
 
-def parse_pytest_failures(test_output: str, repo_path: str = "") -> list[FailureInfo]:
+def failures_from_records(records: list[dict], repo_path: str = "") -> list[FailureInfo]:
     """
-    Parse pytest output to extract failures with known bug types only.
-    Handles both FAILED tests and ERROR during collection (e.g. SyntaxError).
-    Returns list of {file, line, bug_type}.
+    Build failures from agent_report_plugin records (one per test / collection error).
+    Uses the recorded exception type and crash site; unknown bug types are skipped.
     """
     failures: list[FailureInfo] = []
-    lines = test_output.split("\n")
-
-    # Pass 1: Find all "File \"path\" line N" lines (traceback format - most reliable for collection errors)
-    for i, line in enumerate(lines):
-        if 'File "' in line and ", line " in line:
-            file_path, line_num = extract_file_and_line(line)
-            if file_path:
-                block = " ".join(lines[max(0, i - 3) : min(len(lines), i + 6)])
-                bug_type = detect_bug_type(block)
-                if bug_type:
-                    rel_path = to_repo_relative_path(file_path, repo_path) if repo_path else file_path
-                    failures.append(
-                        FailureInfo(file=rel_path, line=line_num, bug_type=bug_type, error_snippet=block)
-                    )
-
-    # Pass 2: FAILED test lines (if no traceback-style matches)
-    if not failures:
-        for i, line in enumerate(lines):
-            line_stripped = line.strip()
-            if "FAILED" in line_stripped:
-                file_path, line_num = extract_file_and_line(line_stripped)
-                if not file_path and i + 1 < len(lines):
-                    file_path, line_num = extract_file_and_line(lines[i + 1])
-                if file_path:
-                    block = " ".join(lines[max(0, i - 2) : i + 5])
-                    bug_type = detect_bug_type(block)
-                    if bug_type:
-                        rel_path = to_repo_relative_path(file_path, repo_path) if repo_path else file_path
-                        failures.append(
-                            FailureInfo(file=rel_path, line=line_num, bug_type=bug_type, error_snippet=block)
-                        )
-
-    # Deduplicate by (file, line) - keep first occurrence
     seen: set[tuple[str, int | None]] = set()
-    unique: list[FailureInfo] = []
-    for f in failures:
-        key = (f["file"], f.get("line"))
-        if key not in seen:
-            seen.add(key)
-            unique.append(f)
+    for rec in records:
+        if rec.get("outcome") not in ("failed", "error"):
+            continue
+        exc_type = rec.get("exc_type") or ""
+        message = rec.get("message") or ""
+        bug_type = detect_bug_type(f"{exc_type}: {message}")
+        if not bug_type:
+            continue
+        file_path = rec.get("file") or rec.get("nodeid", "").split("::")[0]
+        if not file_path:
+            continue
+        rel_path = to_repo_relative_path(file_path, repo_path) if repo_path else file_path
+        line = rec.get("line")
+        key = (rel_path, line)
+        if key in seen:
+            continue
+        seen.add(key)
+        failures.append(
+            FailureInfo(
+                file=rel_path,
+                line=line,
+                bug_type=bug_type,
+                error_snippet=f"{exc_type}: {message}" if exc_type else message,
+            )
+        )
+    return failures
 
-    return unique
+
+def parse_pytest_failures(test_output: str, repo_path: str = "") -> list[FailureInfo]:
+    """
+    Fallback for when no structured records exist (interpreter crash, plugin not loaded).
+    Classifies pytest output in one pass (see classifier.classify): traceback
+    locations first, FAILED lines only if there are none. Known bug types only.
+    """
+    failures: list[FailureInfo] = []
+    seen: set[tuple[str, int | None]] = set()
+    for hit in classify(test_output):
+        rel_path = to_repo_relative_path(hit["file"], repo_path) if repo_path else hit["file"]
+        key = (rel_path, hit["line"])
+        if key in seen:
+            continue
+        seen.add(key)
+        failures.append(
+            FailureInfo(
+                file=rel_path,
+                line=hit["line"],
+                bug_type=hit["bug_type"],
+                error_snippet=hit["error_snippet"],
+                log_span=hit["span"],
+            )
+        )
+    return failures
 
 
 def _syntax_failures_to_failure_info(
     syntax_failures: list[tuple[str, int | None, str]]
 ) -> list[FailureInfo]:
     """Convert syntax check results to FailureInfo with bug type detection."""
-    result: list[FailureInfo] = []
-    for file_path, line, error_msg in syntax_failures:
-        bug_type = detect_bug_type(error_msg) or "SYNTAX"
-        result.append(
-            FailureInfo(file=file_path, line=line, bug_type=bug_type, error_snippet=error_msg)
+    return [syntax_failure(file_path, line, error_msg) for file_path, line, error_msg in syntax_failures]
+
+
+def _repair_syntax_in_place(
+    path: Path, failures: list[FailureInfo], state: AgentState
+) -> tuple[list[FailureInfo], list[FixInfo]]:
+    """
+    Run the syntax fixpoint loop before pytest, so cascading syntax errors cost rounds of
+    recompiling touched files instead of whole iterations. Returns (remaining failures, new fixes).
+    """
+    emit(state, "stage", stage="syntax_fix", status="started", failures=len(failures))
+    remaining, fixed = repair_syntax(failures, path)
+    emit(state, "stage", stage="syntax_fix", status="finished", applied=len(fixed), remaining=len(remaining))
+    fixes: list[FixInfo] = []
+    for failure in fixed:
+        FIXES.inc(bug_type=failure.get("bug_type", "SYNTAX"))
+        fixes.append(
+            FixInfo(
+                file=failure.get("file", ""),
+                line=failure.get("line"),
+                bug_type=failure.get("bug_type", "SYNTAX"),
+                description="applied",
+            )
         )
-    return result
+    return remaining, fixes
+
+
+def _live_callbacks(state: AgentState) -> dict[str, Any]:
+    """run_pytest on_line/on_record forwarding to the run's event stream (none without a run id)."""
+    if not state.get("run_id"):
+        return {}
+
+    def on_record(rec: dict) -> None:
+        emit(
+            state,
+            "test",
+            nodeid=rec.get("nodeid"),
+            outcome=rec.get("outcome"),
+            duration=rec.get("duration"),
+            file=rec.get("file"),
+            line=rec.get("line"),
+            message=rec.get("message"),
+        )
+
+    return {"on_line": lambda line: emit(state, "output", line=line), "on_record": on_record}
+
+
+def _changed_since_full_run(state: AgentState, fixes: list[FixInfo], iteration: int) -> list[str] | None:
+    """
+    Files edited by fixes since the last full pytest run (the baseline), or None when the next
+    run must be a full one: no baseline yet, the safety-net interval is up, or a fix changed the
+    environment rather than a file (IMPORT fixes install packages).
+    """
+    last_full = state.get("last_full_test_run", 0)
+    if not TEST_IMPACT_ANALYSIS or not last_full:
+        return None
+    if TEST_IMPACT_FULL_EVERY > 0 and iteration - last_full >= TEST_IMPACT_FULL_EVERY:
+        return None
+    since = fixes[state.get("fixes_at_full_test_run", 0):]
+    if any(f.get("bug_type") == "IMPORT" for f in since):
+        return None
+    return sorted({f["file"] for f in since if f.get("file")})
+
+
+def _run_prioritized_pytest(
+    path: Path, repo_url: str, python: str, state: AgentState | None = None, changed: list[str] | None = None
+) -> tuple[int, str, list[dict], str]:
+    """
+    Run previously failing tests first (fail-fast); if they all pass, confirm with a full run.
+    With changed (files edited since the last full run), the confirming run is restricted to the
+    test modules that can import them (see import_graph.affected_tests): tests nothing changed
+    under keep the outcome of that full run, and the failing ones have just been rerun.
+    Returns (exit_code, output, records, selection): selection is "failing", "impacted" or "full".
+    """
+    state = state or {}
+    live = _live_callbacks(state)
+    failing = previously_failing(repo_url) if TEST_PRIORITIZATION else []
+    known_durations = durations(repo_url)
+    failing_checked = True  # Every previously failing test has an outcome from this iteration
+    if failing:
+        emit(state, "stage", stage="pytest", status="started", selection="failing", tests=len(failing))
+        exit_code, stdout, stderr, records = run_pytest(
+            path, test_ids=failing, maxfail=FAIL_FAST_MAXFAIL, durations=known_durations, python=python, **live
+        )
+        emit(state, "stage", stage="pytest", status="finished", selection="failing", exit_code=exit_code)
+        failing_checked = exit_code not in _SELECTION_UNUSABLE
+        if failing_checked:
+            record_results(repo_url, records_to_history(records))
+            if exit_code != 0:
+                return exit_code, stdout + "\n" + stderr, records, "failing"
+
+    impacted = None
+    if changed is not None and TEST_PRIORITIZATION and failing_checked:
+        impacted = affected_tests(path, changed)
+    if impacted is not None:
+        if not impacted:
+            output = f"No test module imports the {len(changed)} file(s) changed since the last full run"
+            return 0, output, [], "impacted"
+        emit(state, "stage", stage="pytest", status="started", selection="impacted", tests=len(impacted))
+        exit_code, stdout, stderr, records = run_pytest(
+            path, test_ids=impacted, durations=known_durations, python=python, **live
+        )
+        emit(state, "stage", stage="pytest", status="finished", selection="impacted", exit_code=exit_code)
+        if exit_code not in _SELECTION_UNUSABLE:
+            record_results(repo_url, records_to_history(records))
+            return exit_code, stdout + "\n" + stderr, records, "impacted"
+
+    emit(state, "stage", stage="pytest", status="started", selection="full")
+    exit_code, stdout, stderr, records = run_pytest(path, durations=known_durations, python=python, **live)
+    emit(state, "stage", stage="pytest", status="finished", selection="full", exit_code=exit_code)
+    record_results(repo_url, records_to_history(records), full_run=True)
+    return exit_code, stdout + "\n" + stderr, records, "full"
 
 
 def analyzer_node(state: AgentState) -> dict[str, Any]:
     """
-    Run syntax check on all .py files (catches errors in code tests never import),
-    then run pytest. Failures from either step are merged.
+    Run syntax check and the unused-import pass on all .py files (catches errors in
+    code tests never import), then run pytest. Fixable syntax errors are repaired in place
+    first (see _repair_syntax_in_place); those fixes are returned with the iteration's state.
+    Failures from every step are merged.
+    Starts a new iteration and appends its entry to ci_timeline.
+    With a run_id in state, stage transitions and live pytest output/results are published.
     """
     repo_path = state.get("repo_path", "")
     if not repo_path:
         return {"failures": [], "errors": []}
 
-    from pathlib import Path
-
     path = Path(repo_path)
     failures: list[FailureInfo] = []
     exit_code = 0
     test_output = ""
 
+    iteration = state.get("iteration", 0) + 1
+    ITERATIONS.inc()
+    emit(state, "iteration", iteration=iteration, status="started")
+
     # 1. Syntax check: catches SyntaxError/IndentationError in files tests never import
+    emit(state, "stage", stage="syntax_check", status="started")
     syn_exit, syn_out, syn_failures = run_syntax_check(path)
+    emit(state, "stage", stage="syntax_check", status="finished", failures=len(syn_failures))
+    syntax_fixes: list[FixInfo] = []
     if syn_failures:
         failures.extend(_syntax_failures_to_failure_info(syn_failures))
-        exit_code = 1
-        test_output = syn_out
+        if SYNTAX_FIXPOINT_MAX_ROUNDS > 0:
+            failures, syntax_fixes = _repair_syntax_in_place(path, failures, state)
+        if failures:
+            exit_code = 1
+            test_output = syn_out if not syntax_fixes else "\n".join(
+                f"SyntaxError in {f['file']} line {f['line']}: {f['error_snippet']}" for f in failures
+            )
+
+    lint_failures: list[FailureInfo] = []
+    lint_out = ""
+    if LINT_CHECK:
+        emit(state, "stage", stage="lint", status="started")
+        _lint_exit, lint_out, findings = run_lint_check(path)
+        emit(state, "stage", stage="lint", status="finished", failures=len(findings))
+        lint_failures = [
+            FailureInfo(file=rel, line=line, bug_type="LINTING", error_snippet=msg)
+            for rel, line, msg in findings
+        ]
 
     # 2. Pytest: only run if syntax check passed (otherwise collection may fail redundantly)
+    test_selection = "none"
+    full_baseline = False
+    python = state.get("python_executable") or ""
+    all_fixes = list(state.get("fixes", []) or []) + syntax_fixes
     if exit_code == 0:
-        exit_code, stdout, stderr = run_pytest(path)
-        test_output = stdout + "\n" + stderr
-        failures = parse_pytest_failures(test_output, repo_path)
+        # Cached per dependency-file hash: only the first run of a repo pays for setup
+        python = ensure_venv(path, state.get("repo_url", ""))
+        changed = _changed_since_full_run(state, all_fixes, iteration)
+        exit_code, test_output, records, test_selection = _run_prioritized_pytest(
+            path, state.get("repo_url", ""), python, state, changed
+        )
+        # A full run whose outcome is in the test history (not a crash) is the new impact baseline
+        full_baseline = test_selection == "full" and (exit_code == 0 or bool(records))
+        if records:
+            failures = failures_from_records(records, repo_path)
+        else:
+            failures = parse_pytest_failures(test_output, repo_path)
+
+    if lint_failures:
+        test_output = "\n".join(part for part in (test_output, lint_out) if part)
+        # Findings ride along with a failing iteration's fixes; alone they never fail a green run
+        if exit_code != 0:
+            seen = {(f["file"], f.get("line")) for f in failures}
+            failures.extend(f for f in lint_failures if (f["file"], f.get("line")) not in seen)
 
     status = "PASSED" if exit_code == 0 else "FAILED"
-    ci_timeline = [
-        {"iteration": 1, "status": status, "timestamp": datetime.now(timezone.utc).isoformat()}
-    ]
+    ci_timeline = list(state.get("ci_timeline", []) or [])
+    ci_timeline.append(
+        {"iteration": iteration, "status": status, "timestamp": datetime.now(timezone.utc).isoformat()}
+    )
+    emit(state, "iteration", iteration=iteration, status=status, failures=len(failures))
 
-    return {
+    result = {
         "test_output": test_output,
         "test_stdout": test_output.split("\n\n")[0] if test_output else "",
         "test_stderr": "",
         "test_exit_code": exit_code,
         "failures": failures,
         "ci_timeline": ci_timeline,
+        "iteration": iteration,
+        "test_selection": test_selection,
+        "python_executable": python,
     }
+    if syntax_fixes:
+        result["fixes"] = all_fixes
+    if full_baseline:
+        result["last_full_test_run"] = iteration
+        result["fixes_at_full_test_run"] = len(all_fixes)
+    return result
@@ -0,0 +1,192 @@
+"""
+Single-pass failure classifier for pytest/traceback logs.
+
+Traceback locations and FAILED markers share one anchor regex with a literal
+"F" prefix, so the log is scanned once at near-memchr speed (str in memory, or
+bytes over an mmap). Bug-type patterns are then tested, in priority order, only
+against the small line window around each anchor. Only offsets are
+kept, never a split list of lines.
+"""
+
+import mmap
+import re
+from pathlib import Path
+
+# Hardcoded pattern -> bug type mappings (dict order is priority order)
+PATTERN_TO_BUG_TYPE = {
+    "unused import": "LINTING",
+    "SyntaxError": "SYNTAX",
+    "invalid syntax": "SYNTAX",
+    "missing ':'": "SYNTAX",
+    "expected ':'": "SYNTAX",
+    "IndentationError": "INDENTATION",
+    "ModuleNotFoundError": "IMPORT",
+    "AssertionError": "LOGIC",
+    "TypeError": "TYPE_ERROR",
+}
+
+# Lower-cased once; windows are a few lines, so plain substring tests beat a regex there
+_PATTERNS = [(p.lower(), bug_type) for p, bug_type in PATTERN_TO_BUG_TYPE.items()]
+
+_LOC_TAIL = r'ile\s+"(?P<loc_file>[^"\n]+\.py)"[^,\n]*,[ \t]*line[ \t]+(?P<loc_line>\d+)'
+# Common literal prefix factored out so the regex engine can skip ahead to each "F"
+_ANCHOR = rf"F(?:{_LOC_TAIL}|(?P<failed>AILED))"
+_PATH = r"([a-zA-Z0-9_/\\.\-]+\.py)(?::(\d+))?(?:::|$)"
+
+# Lines (before, after) around an anchor whose text decides its bug type (the old 9-line block)
+TRACEBACK_WINDOW = (3, 5)
+FAILED_WINDOW = (2, 4)
+
+_ANCHOR_STR = re.compile(_ANCHOR)
+_ANCHOR_BYTES = re.compile(_ANCHOR.encode())
+_PATH_STR = re.compile(_PATH)
+_LOC_STR = re.compile("F" + _LOC_TAIL)
+
+
+def detect_bug_type(text: str) -> str | None:
+    """Highest-priority bug type whose pattern occurs in text (case-insensitive)."""
+    lowered = text.lower()
+    for pattern, bug_type in _PATTERNS:
+        if pattern in lowered:
+            return bug_type
+    return None
+
+
+class _Log:
+    """Uniform str/bytes(mmap) access used by the resolver."""
+
+    def __init__(self, data):
+        self.data = data
+        self.is_bytes = not isinstance(data, str)
+        self.nl = b"\n" if self.is_bytes else "\n"
+
+    def text(self, start: int, end: int) -> str:
+        chunk = self.data[start:end]
+        return chunk.decode("utf-8", errors="replace") if self.is_bytes else chunk
+
+    def count_nl(self, start: int, end: int) -> int:
+        if self.is_bytes:
+            return self.data[start:end].count(self.nl)
+        return self.data.count(self.nl, start, end)
+
+    def line_start(self, pos: int, back: int = 0) -> int:
+        """Start offset of the line `back` lines above the one containing pos."""
+        start = self.data.rfind(self.nl, 0, pos) + 1
+        for _ in range(back):
+            if start == 0:
+                break
+            start = self.data.rfind(self.nl, 0, start - 1) + 1
+        return start
+
+    def line_end(self, pos: int, forward: int = 0) -> int:
+        """End offset (before the newline) of the line `forward` lines below the one containing pos."""
+        end = self.data.find(self.nl, pos)
+        for _ in range(forward):
+            if end < 0:
+                break
+            end = self.data.find(self.nl, end + 1)
+        return len(self.data) if end < 0 else end
+
+
+def _scan(log: _Log) -> tuple[list[tuple[int, int, str, int]], list[tuple[int, int]]]:
+    """One pass over the log: traceback locations and FAILED markers with their line numbers."""
+    anchor = _ANCHOR_BYTES if log.is_bytes else _ANCHOR_STR
+    locations: list[tuple[int, int, str, int]] = []
+    failed: list[tuple[int, int]] = []
+    line_no = 0
+    last = 0
+    for m in anchor.finditer(log.data):
+        pos = m.start()
+        line_no += log.count_nl(last, pos)
+        last = pos
+        if m.group("failed"):
+            failed.append((line_no, pos))
+        else:
+            file_path = m.group("loc_file")
+            if log.is_bytes:
+                file_path = file_path.decode("utf-8", errors="replace")
+            locations.append((line_no, pos, file_path.strip(), int(m.group("loc_line"))))
+    return locations, failed
+
+
+def _snippet(log: _Log, pos: int, window: tuple[int, int]) -> str:
+    start = log.line_start(pos, window[0])
+    end = log.line_end(pos, window[1])
+    return log.text(start, end).replace("\r", "").replace("\n", " ")
+
+
+def _path_on_line(line: str) -> tuple[str | None, int | None]:
+    m = _LOC_STR.search(line)
+    if m:
+        return m.group("loc_file").strip(), int(m.group("loc_line"))
+    m = _PATH_STR.search(line)
+    if m:
+        return m.group(1).strip(), int(m.group(2)) if m.group(2) else None
+    return None, None
+
+
+def classify(data) -> list[dict]:
+    """
+    Classify a log held as str, bytes or mmap. Returns failures in log order:
+    {file, line, bug_type, error_snippet, span: (first_line, last_line)} (0-based lines).
+    Traceback locations win; FAILED summary lines are used only when there are none.
+    Deduplicated by (file, line), first occurrence kept.
+    """
+    log = _Log(data)
+    locations, failed = _scan(log)
+    results: list[dict] = []
+
+    for line_no, pos, file_path, line in locations:
+        snippet = _snippet(log, pos, TRACEBACK_WINDOW)
+        bug_type = detect_bug_type(snippet)
+        if bug_type:
+            results.append({
+                "file": file_path,
+                "line": line,
+                "bug_type": bug_type,
+                "error_snippet": snippet,
+                "span": (max(0, line_no - TRACEBACK_WINDOW[0]), line_no + TRACEBACK_WINDOW[1]),
+            })
+
+    if not results:
+        seen_lines: set[int] = set()
+        for line_no, pos in failed:
+            if line_no in seen_lines:
+                continue
+            seen_lines.add(line_no)
+            line_text = log.text(log.line_start(pos), log.line_end(pos)).strip()
+            file_path, line = _path_on_line(line_text)
+            if not file_path:
+                nxt = log.line_end(pos) + 1
+                file_path, line = _path_on_line(log.text(nxt, log.line_end(nxt)))
+            if not file_path:
+                continue
+            snippet = _snippet(log, pos, FAILED_WINDOW)
+            bug_type = detect_bug_type(snippet)
+            if bug_type:
+                results.append({
+                    "file": file_path,
+                    "line": line,
+                    "bug_type": bug_type,
+                    "error_snippet": snippet,
+                    "span": (max(0, line_no - FAILED_WINDOW[0]), line_no + FAILED_WINDOW[1]),
+                })
+
+    seen: set[tuple[str, int | None]] = set()
+    unique = []
+    for r in results:
+        key = (r["file"], r["line"])
+        if key not in seen:
+            seen.add(key)
+            unique.append(r)
+    return unique
+
+
+def classify_file(path: Path) -> list[dict]:
+    """Classify a log file via mmap without reading it into memory."""
+    with open(path, "rb") as fh:
+        try:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return classify(mm)
+        except ValueError:  # empty file cannot be mapped
+            return []
@@ -1,19 +1,66 @@
+import os
 from pathlib import Path
 from typing import Any
 
 from app.agent.state import AgentState
-from app.services.git_service import commit_file, push
+from app.services.git_service import commit_file, commit_files, open_repo, push
+from app.services.metrics import PUSH_FAILURES
+from app.services.run_events import emit
+
+# per_fix: one commit per fix, one push per iteration (default)
+# per_file: one commit per touched file, one push
+# squash: a single commit for the whole iteration, one push
+COMMIT_POLICIES = ("per_fix", "per_file", "squash")
+COMMIT_POLICY = os.environ.get("COMMIT_POLICY", "per_fix").strip().lower()
+
+
+def _fix_message(fix: dict) -> str:
+    line = fix.get("line")
+    line_str = str(line) if line is not None else "0"
+    return f"[AI-AGENT] Fix {fix.get('bug_type', 'LOGIC')} error in {fix.get('file', '')} line {line_str}"
+
+
+def pending_fixes(fixes: list[dict], commits: list[dict]) -> list[tuple[int, dict]]:
+    """
+    (index, fix) for fixes not yet committed by an earlier iteration. fixes only grows, so a
+    fix is identified by its index: a later fix at an already-fixed file and line is still new.
+    """
+    done = {c.get("fix_index") for c in commits}
+    return [(i, f) for i, f in enumerate(fixes) if i not in done]
+
+
+def _commit_batches(fixes: list[tuple[int, dict]], policy: str) -> list[tuple[list[tuple[int, dict]], str]]:
+    """Group (index, fix) pairs into (pairs, message) commits for the policy."""
+    if policy == "squash":
+        if len(fixes) == 1:
+            return [(fixes, _fix_message(fixes[0][1]))]
+        body = "\n".join(_fix_message(f) for _i, f in fixes)
+        files = {f.get("file", "") for _i, f in fixes}
+        return [(fixes, f"[AI-AGENT] Fix {len(fixes)} errors in {len(files)} files\n\n{body}")]
+    if policy == "per_file":
+        by_file: dict[str, list[tuple[int, dict]]] = {}
+        for pair in fixes:
+            by_file.setdefault(pair[1].get("file", ""), []).append(pair)
+        batches = []
+        for file_path, group in by_file.items():
+            if len(group) == 1:
+                batches.append((group, _fix_message(group[0][1])))
+            else:
+                body = "\n".join(_fix_message(f) for _i, f in group)
+                batches.append((group, f"[AI-AGENT] Fix {len(group)} errors in {file_path}\n\n{body}"))
+        return batches
+    return [([pair], _fix_message(pair[1])) for pair in fixes]
 
 
 def commit_node(state: AgentState) -> dict[str, Any]:
     """
-    Per-fix commit and push. Never batch.
-    For each fix: git add <file>, git commit -m "[AI-AGENT] Fix <BUG_TYPE> error in <file> line <line>", git push.
+    Commit this iteration's fixes according to COMMIT_POLICY, then push once.
+    Every commit entry records the sha its fix landed in and the pushed head sha.
     """
     repo_path = state.get("repo_path", "")
     branch_name = state.get("branch_name", "")
     fixes: list[dict] = state.get("fixes", []) or []
-    commits_list: list[dict] = state.get("commits", []) or []
+    commits_list: list[dict] = list(state.get("commits", []) or [])
 
     if not repo_path or not fixes or not branch_name:
         return {"commits": commits_list}
@@ -21,28 +68,55 @@ def commit_node(state: AgentState) -> dict[str, Any]:
     if branch_name.lower() in ("main", "master"):
         return {"commits": commits_list}
 
-    path = Path(repo_path)
+    policy = COMMIT_POLICY if COMMIT_POLICY in COMMIT_POLICIES else "per_fix"
+    repo = open_repo(Path(repo_path))
     push_errors: list[str] = list(state.get("push_errors", []) or [])
 
-    for fix in fixes:
-        file_path = fix.get("file", "")
-        bug_type = fix.get("bug_type", "LOGIC")
-        line = fix.get("line")
-        line_str = str(line) if line is not None else "0"
-
-        msg = f"[AI-AGENT] Fix {bug_type} error in {file_path} line {line_str}"
-        sha = commit_file(path, file_path, msg)
-        if sha:
-            try:
-                push(path, branch_name)
-                commits_list.append({
-                    "message": msg,
-                    "sha": sha,
-                    "file": file_path,
-                    "bug_type": bug_type,
-                    "line_number": line,
-                })
-            except Exception as e:
-                push_errors.append(f"Push failed for {file_path}: {e}")
+    pending = pending_fixes(fixes, commits_list)
+    emit(state, "stage", stage="commit", status="started", fixes=len(pending))
+    new_commits: list[dict] = []
+    landed_in: dict[str, tuple[str, str]] = {}  # file -> (sha, subject) of its latest commit
+    for batch, msg in _commit_batches(pending, policy):
+        files = [f.get("file", "") for _i, f in batch]
+        if len(files) == 1:
+            sha = commit_file(repo, files[0], msg)
+        else:
+            sha = commit_files(repo, files, msg)
+        for index, fix in batch:
+            file_path = fix.get("file", "")
+            if sha:
+                landed_in[file_path] = (sha, msg.split("\n")[0])
+            # Per-fix: a later fix in an already-committed file landed in that earlier commit
+            if file_path not in landed_in:
+                continue
+            landed_sha, subject = landed_in[file_path]
+            new_commits.append({
+                "message": subject,
+                "sha": landed_sha,
+                "file": file_path,
+                "bug_type": fix.get("bug_type", "LOGIC"),
+                "line_number": fix.get("line"),
+                "fix_index": index,
+                "pushed": False,
+                "push_sha": None,
+            })
+
+    commits_list.extend(new_commits)
+    emit(state, "stage", stage="commit", status="finished", commits=len({c["sha"] for c in new_commits}))
+    # Includes commits from an earlier iteration whose push failed
+    unpushed = [c for c in commits_list if not c.get("pushed", True)]
+    if unpushed:
+        emit(state, "stage", stage="push", status="started", branch=branch_name)
+        try:
+            head = push(repo, branch_name, force=bool(state.get("replace_fix_branch")))
+            for c in unpushed:
+                c["pushed"] = True
+                c["push_sha"] = head
+            emit(state, "stage", stage="push", status="finished", sha=head)
+        except Exception as e:
+            files = ", ".join(sorted({c["file"] for c in unpushed}))
+            push_errors.append(f"Push failed for {files}: {e}")
+            PUSH_FAILURES.inc()
+            emit(state, "stage", stage="push", status="failed", error=str(e))
 
     return {"commits": commits_list, "push_errors": push_errors}
@@ -2,7 +2,9 @@ from pathlib import Path
 from typing import Any
 
 from app.agent.state import AgentState, FailureInfo, FixInfo, BUG_TYPES
-from app.agent.rules import apply_rule_fix
+from app.agent.rules import apply_rule_fixes
+from app.services.metrics import FIXES
+from app.services.run_events import emit
 
 
 def fixer_node(state: AgentState) -> dict[str, Any]:
@@ -18,30 +20,24 @@ def fixer_node(state: AgentState) -> dict[str, Any]:
     if not known_failures:
         return {"fixes": fixes}
 
-    # Apply fixes in reverse line order (high to low) to avoid line-number shift when removing lines
-    sorted_failures = sorted(
-        known_failures,
-        key=lambda f: (f.get("file", ""), -(f.get("line") or 0)),
+    # Each touched file is read and written once; edits track line shifts themselves
+    emit(state, "stage", stage="fix", status="started", failures=len(known_failures))
+    fixed = apply_rule_fixes(
+        known_failures, repo_path, python=state.get("python_executable"), repo_url=state.get("repo_url", "")
     )
+    emit(state, "stage", stage="fix", status="finished", applied=len(fixed))
+    for failure in fixed:
+        FIXES.inc(bug_type=failure.get("bug_type", "LOGIC"))
 
     applied: list[FixInfo] = list(fixes)
-    for failure in sorted_failures:
-        file_path = failure.get("file", "")
-        line = failure.get("line")
-        bug_type = failure.get("bug_type", "LOGIC")
-        full_path = repo_path / file_path
-
-        if not full_path.exists():
-            continue
-
-        if apply_rule_fix(failure, repo_path):
-            applied.append(
-                FixInfo(
-                    file=file_path,
-                    line=line,
-                    bug_type=bug_type,
-                    description="applied",
-                )
+    for failure in sorted(fixed, key=lambda f: (f.get("file", ""), f.get("line") or 0)):
+        applied.append(
+            FixInfo(
+                file=failure.get("file", ""),
+                line=failure.get("line"),
+                bug_type=failure.get("bug_type", "LOGIC"),
+                description="applied",
             )
+        )
 
     return {"fixes": applied}
@@ -1,27 +1,76 @@
+from typing import Callable
+
 from langgraph.graph import END, START, StateGraph
 
 from app.agent.analyzer import analyzer_node
 from app.agent.fixer import fixer_node
 from app.agent.reviewer import reviewer_node
-from app.agent.commit_node import commit_node
+from app.agent.commit_node import commit_node, pending_fixes
 from app.agent.state import AgentState
+from app.services.metrics import timed
+
+DEFAULT_NODES: dict[str, Callable] = {
+    "analyzer": analyzer_node,
+    "fixer": fixer_node,
+    "reviewer": reviewer_node,
+    "commit": commit_node,
+}
+
+
+def route_after_analyzer(state: AgentState) -> str:
+    """
+    Tests failing -> fix. Tests green -> done, unless the analyzer itself repaired syntax
+    errors this iteration: those fixes still go through review and commit.
+    """
+    if state.get("test_exit_code", 1) != 0:
+        return "fixer"
+    if pending_fixes(state.get("fixes", []) or [], state.get("commits", []) or []):
+        return "reviewer"
+    return END
+
+
+def route_after_commit(state: AgentState) -> str:
+    """
+    Re-analyze until tests pass or the retry limit is used up
+    (fixes from the last iteration still get committed).
+    """
+    if state.get("test_exit_code", 1) == 0 or state.get("iteration", 0) >= state.get("retry_limit", 5):
+        return END
+    return "analyzer"
 
 
-def run_pipeline(state: AgentState) -> dict:
-    """Build and run the linear LangGraph pipeline. No recursion, no loops."""
+def build_graph(nodes: dict[str, Callable] | None = None):
+    """
+    Compile the healing loop:
+    analyzer -> (passed: END) -> fixer -> reviewer -> commit -> (limit: END) -> analyzer.
+    A passing analyzer that repaired syntax in place goes analyzer -> reviewer -> commit -> END.
+    """
+    nodes = {**DEFAULT_NODES, **(nodes or {})}
     builder = StateGraph(AgentState)
 
-    builder.add_node("analyzer", analyzer_node)
-    builder.add_node("fixer", fixer_node)
-    builder.add_node("reviewer", reviewer_node)
-    builder.add_node("commit", commit_node)
+    for name in ("analyzer", "fixer", "reviewer", "commit"):
+        builder.add_node(name, timed(f"node:{name}")(nodes[name]))
 
     builder.add_edge(START, "analyzer")
-    builder.add_edge("analyzer", "fixer")
+    builder.add_conditional_edges("analyzer", route_after_analyzer, ["fixer", "reviewer", END])
     builder.add_edge("fixer", "reviewer")
     builder.add_edge("reviewer", "commit")
-    builder.add_edge("commit", END)
+    builder.add_conditional_edges("commit", route_after_commit, ["analyzer", END])
+
+    return builder.compile()
+
+
+# Compiled once at import (app startup) and shared by all runs
+PIPELINE = build_graph()
+
+
+def recursion_limit(retry_limit: int) -> int:
+    """LangGraph step budget: four nodes per iteration plus slack."""
+    return max(25, retry_limit * 4 + 5)
+
 
-    graph = builder.compile()
-    final_state = graph.invoke(state)
-    return dict(final_state)
+def run_pipeline(state: AgentState, graph=None) -> dict:
+    """Run the healing loop to completion: until tests pass or retry_limit iterations are used."""
+    graph = graph or PIPELINE
+    retry_limit = state.get("retry_limit", 5)
+    return graph.invoke(state, {"recursion_limit": recursion_limit(retry_limit)})
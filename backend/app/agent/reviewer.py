@@ -2,6 +2,7 @@ import re
 from typing import Any
 
 from app.agent.state import AgentState, FixInfo
+from app.services.run_events import emit
 
 # Exact format for dashboard output
 DESCRIPTION_FORMAT = "{bug_type} error in {file} line {line} → Fix: {description}"
@@ -49,6 +50,7 @@ def reviewer_node(state: AgentState) -> dict[str, Any]:
     """
     fixes: list[FixInfo] = state.get("fixes", []) or []
     rewritten: list[FixInfo] = []
+    emit(state, "stage", stage="review", status="started", fixes=len(fixes))
 
     for fix in fixes:
         desc = fix.get("description", "")
@@ -63,4 +65,5 @@ def reviewer_node(state: AgentState) -> dict[str, Any]:
             )
         )
 
+    emit(state, "stage", stage="review", status="finished", fixes=len(rewritten))
     return {"fixes": rewritten}
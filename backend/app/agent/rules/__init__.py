@@ -1,12 +1,24 @@
 """Rule-based fix dispatcher. No LLM at runtime."""
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from app.agent.state import FailureInfo
-from app.agent.rules.fixers import FIXERS
+from app.agent.classifier import detect_bug_type
+from app.agent.state import SYNTAX_BUG_TYPES, FailureInfo
+from app.agent.rules import fix_cache
+from app.agent.rules.edit_buffer import EditBuffer
+from app.agent.rules.fixers import FIXERS, LINE_FIXERS, import_fix_module
+from app.services import syntax_check
+from app.services.metrics import timed
+from app.services.venv_service import ensure_venv, install_modules
 
+FIX_WORKERS = int(os.environ.get("FIX_WORKERS", "8"))
+# Compile -> fix -> recompile rounds before pytest (0 disables the loop)
+SYNTAX_FIXPOINT_MAX_ROUNDS = int(os.environ.get("SYNTAX_FIXPOINT_MAX_ROUNDS", "20"))
 
-def apply_rule_fix(failure: FailureInfo, repo_path: Path) -> bool:
+
+def apply_rule_fix(failure: FailureInfo, repo_path: Path, python: str | None = None) -> bool:
     """
     Apply rule-based fix for a single failure.
     Returns True if fix was applied, False otherwise.
@@ -22,5 +34,149 @@ def apply_rule_fix(failure: FailureInfo, repo_path: Path) -> bool:
 
     if bug_type == "IMPORT":
         error_snippet = failure.get("error_snippet", "")
-        return fixer(file_path, line, full_path, error_snippet)
+        return fixer(file_path, line, full_path, error_snippet, python=python)
     return fixer(file_path, line, full_path)
+
+
+def _fix_file_in_buffer(full_path: Path, failures: list[FailureInfo]) -> list[FailureInfo]:
+    """
+    Load full_path once, apply every line fix in original line order, flush once.
+    A fix cache hit for the same content and failures replays the stored result instead.
+    """
+    try:
+        before = full_path.read_bytes()
+    except OSError:
+        return []
+    if fix_cache.FIX_CACHE_ENABLED:
+        cached = fix_cache.CACHE.replay(before, failures, str(full_path))
+        if cached is not None:
+            after, fixed = cached
+            try:
+                full_path.write_bytes(after)
+            except OSError:
+                return []
+            return fixed
+    try:
+        buf = EditBuffer(full_path)
+    except (OSError, UnicodeDecodeError):
+        return []
+    applied: list[FailureInfo] = []
+    for failure in sorted(failures, key=lambda f: f.get("line") or 0):
+        try:
+            if LINE_FIXERS[failure["bug_type"]](buf, failure.get("line")):
+                applied.append(failure)
+        except Exception:
+            continue
+    try:
+        buf.flush()
+    except OSError:
+        return []
+    if fix_cache.FIX_CACHE_ENABLED and applied:
+        try:
+            fix_cache.CACHE.store(before, failures, applied, full_path.read_bytes(), str(full_path))
+        except OSError:
+            pass
+    return applied
+
+
+def _install_missing_modules(
+    failures: list[FailureInfo], repo_path: Path, python: str | None, repo_url: str = ""
+) -> list[FailureInfo]:
+    """
+    One batched pip install for every missing module of the iteration. Without python, the
+    venv is resolved like the analyzer does (same repo_url, same key).
+    """
+    wanted: dict[str, list[FailureInfo]] = {}
+    for failure in failures:
+        full_path = repo_path / failure.get("file", "")
+        if not full_path.exists():
+            continue
+        module = import_fix_module(full_path, failure.get("error_snippet", ""), repo_path)
+        if module:
+            wanted.setdefault(module, []).append(failure)
+    if not wanted:
+        return []
+    python = python if python is not None else ensure_venv(repo_path, repo_url)
+    if not python:
+        return []  # No isolated interpreter: never install into the server's own
+    installed = install_modules(python, list(wanted))
+    return [f for module, group in wanted.items() if installed.get(module) for f in group]
+
+
+def apply_rule_fixes(
+    failures: list[FailureInfo], repo_path: Path, python: str | None = None, repo_url: str = ""
+) -> list[FailureInfo]:
+    """
+    Apply fixes for many failures. Line-level fixes are grouped per file and applied
+    through one EditBuffer each, files in parallel; missing modules are installed into
+    python (the run's interpreter; else repo_url's venv) in one batch; other bug types go
+    through apply_rule_fix.
+    Returns the failures that were fixed.
+    """
+    by_file: dict[str, list[FailureInfo]] = {}
+    imports: list[FailureInfo] = []
+    others: list[FailureInfo] = []
+    for failure in failures:
+        if failure.get("bug_type") in LINE_FIXERS and failure.get("line"):
+            by_file.setdefault(failure.get("file", ""), []).append(failure)
+        elif failure.get("bug_type") == "IMPORT":
+            imports.append(failure)
+        else:
+            others.append(failure)
+
+    applied: list[FailureInfo] = []
+    jobs = [(repo_path / f, group) for f, group in by_file.items() if (repo_path / f).is_file()]
+    if len(jobs) > 1 and FIX_WORKERS > 1:
+        with ThreadPoolExecutor(max_workers=min(FIX_WORKERS, len(jobs))) as pool:
+            for result in pool.map(lambda job: _fix_file_in_buffer(*job), jobs):
+                applied.extend(result)
+    else:
+        for full_path, group in jobs:
+            applied.extend(_fix_file_in_buffer(full_path, group))
+
+    applied.extend(_install_missing_modules(imports, repo_path, python, repo_url))
+
+    for failure in others:
+        if (repo_path / failure.get("file", "")).exists() and apply_rule_fix(failure, repo_path, python):
+            applied.append(failure)
+    return applied
+
+
+def syntax_failure(file_path: str, line: int | None, error_msg: str) -> FailureInfo:
+    """FailureInfo for a syntax check result (SyntaxError subclasses decide SYNTAX vs INDENTATION)."""
+    return FailureInfo(
+        file=file_path, line=line, bug_type=detect_bug_type(error_msg) or "SYNTAX", error_snippet=error_msg
+    )
+
+
+@timed("syntax_fix")
+def repair_syntax(
+    failures: list[FailureInfo], repo_path: Path, max_rounds: int = SYNTAX_FIXPOINT_MAX_ROUNDS
+) -> tuple[list[FailureInfo], list[FailureInfo]]:
+    """
+    Fixpoint loop over syntax check results: apply the SYNTAX/INDENTATION line fixes, recompile
+    only the touched files, repeat with the errors that surface next (ones a fix exposed, or the
+    diagnostics scanner missed), until none is fixable or a round makes no progress.
+    Returns (failures still present, failures fixed in order).
+    """
+    remaining = list(failures)
+    applied: list[FailureInfo] = []
+    attempted: set[tuple[str, int | None, str]] = set()
+    for _ in range(max_rounds):
+        fixable = [
+            f for f in remaining
+            if f.get("bug_type") in SYNTAX_BUG_TYPES
+            and (f.get("file", ""), f.get("line"), f.get("error_snippet", "")) not in attempted
+        ]
+        if not fixable:
+            break
+        attempted.update((f.get("file", ""), f.get("line"), f.get("error_snippet", "")) for f in fixable)
+        fixed = apply_rule_fixes(fixable, repo_path)
+        if not fixed:
+            break
+        applied.extend(fixed)
+        touched = sorted({f.get("file", "") for f in fixed})
+        rechecked, _compiled = syntax_check.check_files(repo_path, [repo_path / f for f in touched])
+        remaining = [f for f in remaining if f.get("file", "") not in touched]
+        remaining.extend(syntax_failure(*r) for r in rechecked)
+    return remaining, applied
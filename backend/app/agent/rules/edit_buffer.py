@@ -0,0 +1,89 @@
+"""In-memory line buffer for a source file: load once, queue line edits, flush once."""
+
+import re
+from bisect import bisect_left, insort
+from pathlib import Path
+
+_LINE_RE = re.compile(r"([^\r\n]*)(\r\n|\r|\n|$)")
+
+
+class EditBuffer:
+    """
+    Lines of one file addressed by their ORIGINAL 1-based line numbers.
+    Deleting a line shifts later lines; lookups account for that, so fixes
+    can be applied in any order. Each line keeps its own line ending.
+    """
+
+    def __init__(self, full_path: Path):
+        self.path = full_path
+        text = full_path.read_bytes().decode("utf-8")
+        self._lines: list[str] = []
+        self._ends: list[str] = []
+        for m in _LINE_RE.finditer(text):
+            content, end = m.group(1), m.group(2)
+            if not content and not end:
+                break
+            self._lines.append(content)
+            self._ends.append(end)
+        self._deleted: list[int] = []  # original line numbers, sorted
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def _index(self, line: int) -> int | None:
+        """Current 0-based index of original line, or None if out of range / deleted."""
+        if line < 1:
+            return None
+        pos = bisect_left(self._deleted, line)
+        if pos < len(self._deleted) and self._deleted[pos] == line:
+            return None
+        idx = line - 1 - pos
+        return idx if 0 <= idx < len(self._lines) else None
+
+    def get(self, line: int) -> str | None:
+        idx = self._index(line)
+        return None if idx is None else self._lines[idx]
+
+    def set(self, line: int, content: str) -> bool:
+        idx = self._index(line)
+        if idx is None:
+            return False
+        if self._lines[idx] != content:
+            self._lines[idx] = content
+            self.dirty = True
+        return True
+
+    def delete(self, line: int) -> bool:
+        idx = self._index(line)
+        if idx is None:
+            return False
+        del self._lines[idx]
+        end = self._ends.pop(idx)
+        # Deleting the last line must not leave the new last line without its original ending
+        if idx == len(self._lines) and self._ends and not end:
+            self._ends[-1] = ""
+        insort(self._deleted, line)
+        self.dirty = True
+        return True
+
+    def prev_nonblank(self, line: int) -> str | None:
+        """Current content of the nearest non-blank line above original line."""
+        idx = self._index(line)
+        if idx is None:
+            return None
+        for i in range(idx - 1, -1, -1):
+            if self._lines[i].strip():
+                return self._lines[i]
+        return None
+
+    def text(self) -> str:
+        return "".join(c + e for c, e in zip(self._lines, self._ends))
+
+    def flush(self) -> bool:
+        """Write the file once if anything changed. Returns True if written."""
+        if not self.dirty:
+            return False
+        self.path.write_bytes(self.text().encode("utf-8"))
+        self.dirty = False
+        return True
@@ -0,0 +1,196 @@
+"""
+Content-addressed cache of rule fixes: (file sha256, failure signature, rules version) -> fixed file.
+Forks of one assignment repo hit the same broken files; a hit replays the stored result and
+follows the chain of later syntax-class fixes recorded for that file (what the compile check
+reports next anyway), so several retest iterations collapse into one. Other bug types never
+chain: their failures come from pytest or lint and are only fixed when this run reports them.
+A replayed result is validated only by recompiling the file.
+"""
+
+import hashlib
+import inspect
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from app.agent.rules import edit_buffer, fixers
+from app.agent.state import SYNTAX_BUG_TYPES, FailureInfo
+from app.services.metrics import register_gauge
+from app.services.syntax_check import check_source
+
+FIX_CACHE_ENABLED = os.environ.get("FIX_CACHE_ENABLED", "1").strip() not in ("0", "false", "no")
+FIX_CACHE_MAX_ENTRIES = int(os.environ.get("FIX_CACHE_MAX_ENTRIES", "4096"))
+FIX_CACHE_MAX_BYTES = int(os.environ.get("FIX_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Longest chain of recorded follow-up (syntax-class) fixes replayed for one file
+FIX_CACHE_MAX_CHAIN = int(os.environ.get("FIX_CACHE_MAX_CHAIN", "10"))
+
+
+def _rules_version() -> str:
+    """Hash of the fixer rules' source: editing FIXERS invalidates every entry automatically."""
+    h = hashlib.sha256()
+    for module in (fixers, edit_buffer):
+        try:
+            h.update(inspect.getsource(module).encode())
+        except (OSError, TypeError):
+            h.update(module.__name__.encode())
+    return h.hexdigest()[:12]
+
+
+RULES_VERSION = _rules_version()
+
+_QUOTED_PATH_RE = re.compile(r"[\"'][^\"']*[/\\][^\"']*[\"']")
+_PATH_RE = re.compile(r"(?:[A-Za-z]:)?[\w.\-]*[/\\][\w./\\\-]*")
+_NUM_RE = re.compile(r"\d+")
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_error(snippet: str) -> str:
+    """Error text without workspace paths, numbers or layout, so forks produce the same signature."""
+    text = _QUOTED_PATH_RE.sub("<path>", snippet or "")
+    text = _PATH_RE.sub("<path>", text)
+    text = _NUM_RE.sub("#", text)
+    return _WS_RE.sub(" ", text).strip().lower()
+
+
+def signature(failures: list[FailureInfo]) -> tuple[tuple[str, int, str], ...]:
+    """Order-independent description of the failures reported for one file."""
+    return tuple(
+        sorted(
+            (f.get("bug_type", ""), f.get("line") or 0, normalize_error(f.get("error_snippet", "")))
+            for f in failures
+        )
+    )
+
+
+def _sha(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("after", "applied", "compiles")
+
+    def __init__(self, after: bytes, applied: list[dict], compiles: bool):
+        self.after = after
+        self.applied = applied  # [{bug_type, line, error_snippet}] the rules fixed
+        self.compiles = compiles
+
+
+class FixCache:
+    """Thread-safe LRU bounded by entry count and stored bytes, with hit/miss counters."""
+
+    def __init__(self, max_entries: int = FIX_CACHE_MAX_ENTRIES, max_bytes: int = FIX_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        # content sha -> key of the syntax-class fix last recorded for that content (drives chained replay)
+        self._by_content: dict[str, tuple] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stores = self.evictions = self.invalidations = self.chained = 0
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.after)
+            if self._by_content.get(key[0]) == key:
+                del self._by_content[key[0]]
+
+    def store(
+        self, before: bytes, failures: list[FailureInfo], applied: list[FailureInfo], after: bytes, filename: str
+    ) -> None:
+        """Record the rule result for before + failures. No-op if nothing changed."""
+        if not applied or after == before:
+            return
+        key = (_sha(before), signature(failures), RULES_VERSION)
+        fixed = [
+            {"bug_type": f.get("bug_type", ""), "line": f.get("line"), "error_snippet": f.get("error_snippet", "")}
+            for f in applied
+        ]
+        entry = _Entry(after, fixed, check_source(after, filename) is None)
+        with self._lock:
+            self._drop(key)
+            self._data[key] = entry
+            if all(bug_type in SYNTAX_BUG_TYPES for bug_type, _line, _error in key[1]):
+                self._by_content[key[0]] = key
+            self._bytes += len(after)
+            self.stores += 1
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def replay(
+        self, before: bytes, failures: list[FailureInfo], filename: str
+    ) -> tuple[bytes, list[FailureInfo]] | None:
+        """
+        Fixed content and the failures it fixes, or None on a miss.
+        After the direct hit, follows syntax-class fixes recorded for each resulting content (what
+        the next compile checks would have found); other fixes are never replayed unasked.
+        The final content must compile exactly as it did when stored.
+        """
+        key = (_sha(before), signature(failures), RULES_VERSION)
+        rel = failures[0].get("file", filename)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            content, fixed, last = entry.after, [dict(f, file=rel) for f in entry.applied], entry
+            seen = {key[0]}
+            for _ in range(FIX_CACHE_MAX_CHAIN):
+                sha = _sha(content)
+                next_key = self._by_content.get(sha)
+                if sha in seen or next_key is None or next_key[2] != RULES_VERSION:
+                    break
+                seen.add(sha)
+                last = self._data[next_key]
+                self._data.move_to_end(next_key)
+                content = last.after
+                fixed.extend(dict(f, file=rel) for f in last.applied)
+                self.chained += 1
+
+        if (check_source(content, filename) is None) != last.compiles:
+            self.invalidate(key)
+            return None
+        with self._lock:
+            self.hits += 1
+        return content, [FailureInfo(**f) for f in fixed]
+
+    def invalidate(self, key: tuple | None = None) -> int:
+        """Drop one entry, or everything (e.g. after changing rules at runtime). Returns entries dropped."""
+        with self._lock:
+            if key is None:
+                dropped = len(self._data)
+                self._data.clear()
+                self._by_content.clear()
+                self._bytes = 0
+            else:
+                dropped = int(key in self._data)
+                self._drop(key)
+            self.invalidations += dropped
+            return dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": FIX_CACHE_ENABLED,
+                "rules_version": RULES_VERSION,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "chained_fixes": self.chained,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+CACHE = FixCache()
+
+register_gauge("agent_fix_cache_entries", "Entries in the fix cache.", lambda: CACHE.stats()["entries"])
+register_gauge("agent_fix_cache_hits", "Fix cache hits since start.", lambda: CACHE.stats()["hits"])
+register_gauge("agent_fix_cache_misses", "Fix cache misses since start.", lambda: CACHE.stats()["misses"])
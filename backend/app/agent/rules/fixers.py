@@ -1,117 +1,117 @@
 """Rule-based fixers for each bug type. No LLM at runtime."""
 
 import re
-import subprocess
-import sys
 from pathlib import Path
 from typing import Callable
 
+from app.agent.rules.edit_buffer import EditBuffer
+from app.services.venv_service import install_modules, is_local_module, missing_module
+
 # Keywords that require a trailing colon
 COLON_KEYWORDS = ("def", "class", "if", "else", "elif", "for", "while", "try", "except", "finally", "with")
 
 
-def fix_linting(file_path: str, line: int | None, full_path: Path) -> bool:
+def fix_linting_lines(buf: EditBuffer, line: int | None) -> bool:
     """Remove the unused import line at line."""
-    if not line or not full_path.exists():
-        return False
-    try:
-        lines = full_path.read_text(encoding="utf-8").splitlines()
-        if line < 1 or line > len(lines):
-            return False
-        # Remove line (1-based index -> 0-based)
-        del lines[line - 1]
-        full_path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
-        return True
-    except Exception:
+    if not line or buf.get(line) is None:
         return False
+    return buf.delete(line)
 
 
-def fix_syntax(file_path: str, line: int | None, full_path: Path) -> bool:
+def fix_syntax_lines(buf: EditBuffer, line: int | None) -> bool:
     """Add missing ':' after def/class/if/for/while/try/elif/except."""
-    if not line or not full_path.exists():
+    content = buf.get(line) if line else None
+    if content is None:
         return False
-    try:
-        lines = full_path.read_text(encoding="utf-8").splitlines()
-        if line < 1 or line > len(lines):
-            return False
-        idx = line - 1
-        content = lines[idx]
-        stripped = content.strip()
-        # Already has colon
-        if stripped.rstrip().endswith(":"):
-            return False
-        # Check if line starts with a colon-requiring keyword
-        for kw in COLON_KEYWORDS:
-            if stripped.startswith(kw + " ") or stripped == kw or stripped.startswith(kw + "("):
-                # Add colon at end (remove trailing whitespace, add colon)
-                lines[idx] = content.rstrip() + ":"
-                full_path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
-                return True
-        return False
-    except Exception:
+    stripped = content.strip()
+    # Already has colon
+    if stripped.rstrip().endswith(":"):
         return False
+    # Check if line starts with a colon-requiring keyword
+    for kw in COLON_KEYWORDS:
+        if stripped.startswith(kw + " ") or stripped == kw or stripped.startswith(kw + "("):
+            # Add colon at end (remove trailing whitespace, add colon)
+            return buf.set(line, content.rstrip() + ":")
+    return False
 
 
-def fix_indentation(file_path: str, line: int | None, full_path: Path) -> bool:
+def fix_indentation_lines(buf: EditBuffer, line: int | None) -> bool:
     """Fix indentation of the offending line to match expected block level (4 spaces per level)."""
+    content = buf.get(line) if line else None
+    if content is None:
+        return False
+    stripped = content.strip()
+    if not stripped:
+        return False
+    # Find previous non-empty line to determine expected indent
+    prev = buf.prev_nonblank(line)
+    if prev is None:
+        # First line - no indent
+        expected_indent = 0
+    else:
+        prev_indent = len(prev) - len(prev.lstrip())
+        # If previous line ends with colon, we're inside a block - add 4 spaces
+        if prev.strip().endswith(":"):
+            expected_indent = prev_indent + 4
+        else:
+            expected_indent = prev_indent
+    buf.set(line, " " * expected_indent + stripped)
+    return True
+
+
+def _fix_file(line_fixer: Callable[[EditBuffer, int | None], bool], line: int | None, full_path: Path) -> bool:
+    """Apply one line fixer to a file: load, fix, flush."""
     if not line or not full_path.exists():
         return False
     try:
-        lines = full_path.read_text(encoding="utf-8").splitlines()
-        if line < 1 or line > len(lines):
-            return False
-        idx = line - 1
-        content = lines[idx]
-        stripped = content.strip()
-        if not stripped:
+        buf = EditBuffer(full_path)
+        if not line_fixer(buf, line):
             return False
-        # Find previous non-empty line to determine expected indent
-        prev_idx = idx - 1
-        while prev_idx >= 0 and not lines[prev_idx].strip():
-            prev_idx -= 1
-        if prev_idx < 0:
-            # First line - no indent
-            expected_indent = 0
-        else:
-            prev = lines[prev_idx]
-            prev_stripped = prev.strip()
-            # If previous line ends with colon, we're inside a block - add 4 spaces
-            if prev_stripped.rstrip().endswith(":"):
-                prev_indent = len(prev) - len(prev.lstrip())
-                expected_indent = prev_indent + 4
-            else:
-                prev_indent = len(prev) - len(prev.lstrip())
-                expected_indent = prev_indent
-        lines[idx] = " " * expected_indent + stripped
-        full_path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+        buf.flush()
         return True
     except Exception:
         return False
 
 
-def fix_import(file_path: str, line: int | None, full_path: Path, error_snippet: str = "") -> bool:
-    """Try pip install for missing module from ModuleNotFoundError. Else skip."""
-    if not full_path.exists():
-        return False
-    # Parse "No module named 'X'" or "No module named \"X\""
-    m = re.search(r"No module named ['\"]([a-zA-Z0-9_-]+)['\"]", error_snippet or "")
-    if not m:
-        return False
-    module = m.group(1)
-    # Only allow simple alphanumeric module names (no path traversal)
-    if not re.match(r"^[a-zA-Z0-9_-]+$", module):
+def fix_linting(file_path: str, line: int | None, full_path: Path) -> bool:
+    """Remove the unused import line at line."""
+    return _fix_file(fix_linting_lines, line, full_path)
+
+
+def fix_syntax(file_path: str, line: int | None, full_path: Path) -> bool:
+    """Add missing ':' after def/class/if/for/while/try/elif/except."""
+    return _fix_file(fix_syntax_lines, line, full_path)
+
+
+def fix_indentation(file_path: str, line: int | None, full_path: Path) -> bool:
+    """Fix indentation of the offending line to match expected block level (4 spaces per level)."""
+    return _fix_file(fix_indentation_lines, line, full_path)
+
+
+def import_fix_module(full_path: Path, error_snippet: str, repo_path: Path | None = None) -> str | None:
+    """Module to install for a ModuleNotFoundError, or None if it is not a pip-installable name."""
+    module = missing_module(error_snippet)
+    # Only allow simple module names (no path traversal)
+    if not module or not re.match(r"^[a-zA-Z0-9_][a-zA-Z0-9_.-]*$", module):
+        return None
+    if repo_path is not None and is_local_module(repo_path, module):
+        return None
+    return module
+
+
+def fix_import(
+    file_path: str, line: int | None, full_path: Path, error_snippet: str = "", python: str | None = None
+) -> bool:
+    """
+    pip install the missing module from ModuleNotFoundError into the run's interpreter. Else skip
+    (also without an interpreter: the server's own is never installed into).
+    """
+    if not python or not full_path.exists():
         return False
-    try:
-        subprocess.run(
-            [sys.executable, "-m", "pip", "install", module],
-            cwd=full_path.parent,
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
-        return True
-    except Exception:
+    module = import_fix_module(full_path, error_snippet)
+    if not module:
         return False
+    return install_modules(python, [module]).get(module, False)
 
 
 def fix_logic(file_path: str, line: int | None, full_path: Path) -> bool:
@@ -132,3 +132,10 @@ FIXERS: dict[str, Callable[..., bool]] = {
     "LOGIC": fix_logic,
     "TYPE_ERROR": fix_type_error,
 }
+
+# Bug types fixable as in-memory line edits; several per file share one EditBuffer
+LINE_FIXERS: dict[str, Callable[[EditBuffer, int | None], bool]] = {
+    "LINTING": fix_linting_lines,
+    "SYNTAX": fix_syntax_lines,
+    "INDENTATION": fix_indentation_lines,
+}
@@ -8,6 +8,8 @@ except ImportError:
 
 # Bug types from hardcoded pattern mappings
 BUG_TYPES = ("LINTING", "SYNTAX", "INDENTATION", "IMPORT", "LOGIC", "TYPE_ERROR")
+# Bug types a recompile can confirm as fixed
+SYNTAX_BUG_TYPES = ("SYNTAX", "INDENTATION")
 
 
 class FailureInfo(TypedDict):
@@ -15,6 +17,7 @@ class FailureInfo(TypedDict):
     line: int | None
     bug_type: str
     error_snippet: NotRequired[str]
+    log_span: NotRequired[tuple[int, int]]  # First/last log line (0-based) the failure was classified from
 
 
 class FixInfo(TypedDict):
@@ -25,11 +28,13 @@ class FixInfo(TypedDict):
 
 
 class AgentState(TypedDict, total=False):
+    run_id: str  # Job id; progress events are published under it (see run_events)
     repo_path: str
     repo_url: str
     team_name: str
     team_leader_name: str
     branch_name: str
+    replace_fix_branch: bool  # Force-push over a fix branch left by an earlier run
     test_output: str
     test_exit_code: int
     test_stdout: str
@@ -41,3 +46,8 @@ class AgentState(TypedDict, total=False):
     push_errors: list[str]  # Push failures to surface to user
     ci_timeline: list[dict]  # [{iteration, status, timestamp}]
     retry_limit: int
+    python_executable: str  # Interpreter (per-repo venv) tests run and installs go into
+    iteration: int  # Completed analyzer passes (1-based after the first)
+    test_selection: str  # "failing" (prioritized run) | "impacted" (see import_graph) | "full" | "none" (syntax errors)
+    last_full_test_run: int  # Iteration of the last full pytest run: the baseline of test impact analysis
+    fixes_at_full_test_run: int  # len(fixes) at that run; files of later fixes are the changed set
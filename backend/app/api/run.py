@@ -1,14 +1,31 @@
+import asyncio
 import os
-import shutil
 import time
+from collections import Counter
 from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
+from typing import Callable
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 
 from app.agent.graph import run_pipeline
-from app.models import RunRequest, RunResponse
-from app.services.repo_service import clone_and_create_branch, create_branch_name
+from app.agent.rules import fix_cache
+from app.models import (
+    BatchRun,
+    BatchRunRequest,
+    BatchStatus,
+    FixCacheStats,
+    JobStatus,
+    QueueStats,
+    RunList,
+    RunRequest,
+    RunResponse,
+)
+from app.services import job_queue, metrics, profiling, run_events, run_store
+from app.services.mirror_cache import normalize_repo_url, remote_host
+from app.services.repo_service import clone_and_create_branch, create_branch_name, release_workspace
 from app.utils.result_builder import build_run_response
 
 router = APIRouter()
@@ -16,66 +33,347 @@ router = APIRouter()
 RETRY_LIMIT = int(os.environ.get("RETRY_LIMIT", "5"))
 
 
-@router.post("/run", response_model=RunResponse)
-def run_agent(request: RunRequest) -> RunResponse:
+@router.post("/run", response_model=JobStatus, status_code=202)
+def run_agent(request: RunRequest) -> JobStatus:
     """
-    Trigger agent pipeline synchronously.
+    Enqueue an agent run and return its job immediately.
+    Poll GET /api/runs/{job_id} for the RunResponse, or follow GET /api/runs/{job_id}/events.
+    """
+    try:
+        job = submit_run(request)
+    except job_queue.QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JobStatus(**job)
+
+
+def submit_run(request: RunRequest, execute: Callable[[str], RunResponse] | None = None) -> dict:
+    """
+    Queue a run of request on the shared job queue. execute(job_id) replaces execute_run
+    (webhook runs resolve their request when they start). Returns the job snapshot; raises QueueFullError.
+    """
+    job_id = job_queue.new_job_id()
+    run_events.open_run(job_id)
+    try:
+        return job_queue.submit(
+            partial(execute, job_id) if execute is not None else partial(execute_run, request, run_id=job_id),
+            meta={"repo_url": request.repo_url},
+            job_id=job_id,
+            group=_fairness_group(request),
+            host=remote_host(request.repo_url),
+        )
+    except job_queue.QueueFullError:
+        run_events.discard(job_id)
+        raise
+
+
+def _fairness_group(request: RunRequest) -> str:
+    return request.team_name.strip().lower()
+
+
+@router.post("/run/batch", response_model=BatchStatus, status_code=202)
+def run_batch(batch: BatchRunRequest) -> BatchStatus:
+    """
+    Enqueue many runs at once (all of them, or 503 if the queue cannot take them all).
+    They share the run workers: teams are served round-robin and at most RUN_MAX_PER_HOST
+    runs talk to one git host at a time. Poll GET /api/run/batch/{batch_id} for progress.
+    """
+    seen: dict[tuple[str, str], int] = {}
+    for i, request in enumerate(batch.runs):
+        key = (normalize_repo_url(request.repo_url), create_branch_name(request.team_name, request.team_leader_name))
+        if key in seen:
+            # Both runs would push the same branch
+            detail = f"runs[{i}] repeats runs[{seen[key]}] (same repository and branch)"
+            raise HTTPException(status_code=422, detail=detail)
+        seen[key] = i
+
+    jobs = []
+    for request in batch.runs:
+        job_id = job_queue.new_job_id()
+        meta = {"repo_url": request.repo_url, "team_name": request.team_name}
+        fn = partial(execute_run, request, run_id=job_id)
+        jobs.append((job_id, fn, meta, _fairness_group(request), remote_host(request.repo_url)))
+        run_events.open_run(job_id)
+    try:
+        batch_id, _snapshots = job_queue.submit_batch(jobs)
+    except job_queue.QueueFullError as e:
+        for job in jobs:
+            run_events.discard(job[0])
+        raise HTTPException(status_code=503, detail=str(e))
+    return _batch_status(batch_id)
+
+
+def _batch_run(job_id: str, job: dict | None) -> BatchRun:
+    """Summary of one batch run from its live job, else from the run store once the job expired."""
+    if job is None:
+        stored = run_store.get_run(job_id)
+        if stored is None:
+            return BatchRun(job_id=job_id, repo_url="", team_name="", status="expired")
+        return BatchRun(
+            job_id=job_id,
+            repo_url=stored["repo_url"],
+            team_name=stored["team_name"],
+            status="completed",
+            ci_status=stored["ci_status"],
+            total_failures=stored["total_failures"],
+            total_fixes_applied=stored["total_fixes_applied"],
+            total_time_seconds=stored["total_time_seconds"],
+            error=stored["error"],
+        )
+    run = BatchRun(
+        job_id=job_id,
+        repo_url=job.get("repo_url", ""),
+        team_name=job.get("team_name", ""),
+        status=job["status"],
+        error=job.get("error"),
+    )
+    result: RunResponse | None = job.get("result")
+    if result is not None:
+        run.ci_status = result.ci_status
+        run.total_failures = result.total_failures
+        run.total_fixes_applied = result.total_fixes_applied
+        run.total_time_seconds = result.total_time_seconds
+        run.error = result.error
+    return run
+
+
+def _batch_status(batch_id: str) -> BatchStatus:
+    found = job_queue.get_batch(batch_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch id")
+    batch, jobs = found
+    runs = [_batch_run(job_id, job) for job_id, job in zip(batch["job_ids"], jobs)]
+    counts = Counter(r.status for r in runs)
+    finished = len(runs) - counts["queued"] - counts["running"]
+    if finished == len(runs):
+        status = "finished"
+    else:
+        status = "queued" if counts["queued"] == len(runs) else "running"
+    return BatchStatus(
+        batch_id=batch_id,
+        status=status,
+        created_at=batch["created_at"],
+        total=len(runs),
+        counts=dict(counts),
+        passed=sum(1 for r in runs if r.ci_status == "PASSED"),
+        progress=round(finished / len(runs), 3),
+        runs=runs,
+    )
+
+
+@router.get("/run/batch/{batch_id}", response_model=BatchStatus)
+def get_batch(batch_id: str) -> BatchStatus:
+    """Aggregated progress and per-run results of a batch (full results via GET /api/runs/{job_id})."""
+    return _batch_status(batch_id)
+
+
+@router.get("/runs", response_model=RunList)
+def list_runs(
+    repo_url: str | None = None,
+    branch: str | None = None,
+    status: str | None = None,
+    since: str | None = Query(default=None, description="ISO timestamp, inclusive"),
+    until: str | None = Query(default=None, description="ISO timestamp, exclusive"),
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+) -> RunList:
+    """Stored run history, newest first."""
+    runs, total = run_store.list_runs(repo_url, branch, status, since, until, limit, offset)
+    return RunList(total=total, limit=limit, offset=offset, runs=runs)
+
+
+def _live_stages(job_id: str) -> list[dict]:
+    return [
+        {**s, "started_at": datetime.fromtimestamp(s["started_at"], timezone.utc).isoformat()}
+        for s in run_events.stage_timings(job_id)
+    ]
+
+
+@router.get("/runs/{job_id}", response_model=JobStatus)
+def get_run(job_id: str) -> JobStatus:
+    """Job status; result holds the RunResponse once completed. Falls back to the run store after expiry."""
+    job = job_queue.get_job(job_id)
+    if job is not None:
+        profiles = run_store.profile_kinds(job_id) if job["status"] in ("completed", "failed") else []
+        return JobStatus(**job, stages=_live_stages(job_id), profiles=profiles)
+    stored = run_store.get_run(job_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired run id")
+    return JobStatus(
+        job_id=job_id,
+        status="completed",
+        repo_url=stored["repo_url"],
+        queued_at=stored["created_at"],
+        result=stored["result"],
+        stages=stored["stages"],
+        profiles=stored["profiles"],
+    )
+
+
+# format -> (artifact kind, media type, file extension)
+_PROFILE_FORMATS = {
+    "collapsed": ("collapsed", "text/plain; charset=utf-8", "folded"),
+    "pstats": ("pstats", "application/octet-stream", "pstats"),
+}
+
+
+@router.get("/runs/{job_id}/profile")
+def get_run_profile(job_id: str, format: str = Query(default="collapsed", pattern="^(collapsed|pstats)$")) -> Response:
+    """
+    Backend CPU profile of a profiled run, as a download: collapsed stacks (flamegraph.pl,
+    speedscope) or a pstats file (python -m pstats, snakeviz).
+    """
+    kind, media_type, ext = _PROFILE_FORMATS[format]
+    stored = run_store.get_profile(job_id, kind)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="No profile stored for this run")
+    mode, data = stored
+    return Response(
+        content=data,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="run-{job_id}.{ext}"',
+            "X-Profile-Mode": mode,
+        },
+    )
+
+
+@router.get("/runs/{job_id}/events")
+async def run_event_stream(
+    job_id: str,
+    http_request: Request,
+    after: int = 0,
+    last_event_id: str | None = Header(default=None),
+) -> StreamingResponse:
+    """
+    Server-Sent Events: stage transitions, per-test results, pytest output lines and
+    iteration boundaries, ending with a done event. Resumes after Last-Event-ID (or ?after=).
+    """
+    if not run_events.exists(job_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired run id")
+    if last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+
+    async def stream():
+        cursor = after
+        idle = 0.0
+        while True:
+            events, closed = run_events.events_since(job_id, cursor)
+            for event in events:
+                cursor = event["id"]
+                yield run_events.format_sse(event)
+            if closed or await http_request.is_disconnected():
+                return
+            if events:
+                idle = 0.0
+            elif idle >= run_events.RUN_EVENTS_KEEPALIVE_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(run_events.RUN_EVENTS_POLL_SECONDS)
+            idle += run_events.RUN_EVENTS_POLL_SECONDS
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/queue", response_model=QueueStats)
+def queue_stats() -> QueueStats:
+    """Run queue depth and worker utilization."""
+    return QueueStats(**job_queue.stats())
+
+
+@router.get("/fix-cache", response_model=FixCacheStats)
+def fix_cache_stats() -> FixCacheStats:
+    """Fix cache size and hit/miss counters."""
+    return FixCacheStats(**fix_cache.CACHE.stats())
+
+
+@router.delete("/fix-cache", response_model=FixCacheStats)
+def invalidate_fix_cache() -> FixCacheStats:
+    """Drop every cached fix (entries also stop matching on their own when the rules change)."""
+    fix_cache.CACHE.invalidate()
+    return FixCacheStats(**fix_cache.CACHE.stats())
+
+
+def execute_run(request: RunRequest, run_id: str | None = None) -> RunResponse:
+    """
+    Run the agent pipeline to completion (called on a job worker).
     Returns results.json structure (judge-critical, always non-empty).
     Retries up to RETRY_LIMIT times until tests pass.
+    Progress is published to run_events and the result stored in run_store under run_id.
+    Every span timed during the run is included in the response's timings/spans.
+    Profiled runs (request.profile, or sampled) also store pstats and collapsed-stack artifacts.
     """
+    run_id = run_id or job_queue.new_job_id()
+    if not profiling.should_profile(request.profile):
+        with metrics.record_run() as spans:
+            response = _execute_run(request, run_id, spans)
+    else:
+        with profiling.profile_run() as profile, metrics.record_run() as spans:
+            response = _execute_run(request, run_id, spans)
+        run_store.record_profile(
+            run_id, profile.mode, {"pstats": profile.pstats, "collapsed": profile.collapsed.encode("utf-8")}
+        )
+    metrics.RUNS.inc(status=response.ci_status)
+    metrics.RUN_SECONDS.observe(response.total_time_seconds)
+    return response
+
+
+def _execute_run(request: RunRequest, run_id: str, spans: list[dict]) -> RunResponse:
     repo_path: Path | None = None
     start_time = time.perf_counter()
+    created_at = time.time()
+    ci_status = "FAILED"
 
     try:
         # 1. Clone and create branch (use per-request token if provided)
+        run_events.publish(run_id, "stage", stage="clone", status="started", repo_url=request.repo_url)
         repo_path, branch_name = clone_and_create_branch(
             request.repo_url,
             request.team_name,
             request.team_leader_name,
             token_override=request.github_token,
+            ref=request.ref,
+            sha=request.sha,
         )
         repo_path = Path(repo_path)
+        run_events.publish(run_id, "stage", stage="clone", status="finished", branch=branch_name)
 
         # 2. Build initial state
         state = {
+            "run_id": run_id,
             "repo_path": str(repo_path),
             "repo_url": request.repo_url,
             "team_name": request.team_name,
             "team_leader_name": request.team_leader_name,
             "branch_name": branch_name,
+            "replace_fix_branch": request.replace_fix_branch,
             "failures": [],
             "fixes": [],
             "commits": [],
             "retry_limit": RETRY_LIMIT,
+            "iteration": 0,
+            "ci_timeline": [],
         }
 
-        # 3. Retry loop: run pipeline until PASSED or limit reached
-        ci_timeline: list[dict] = []
-        iteration = 1
-        while iteration <= RETRY_LIMIT:
-            state = run_pipeline(state)
-            exit_code = state.get("test_exit_code", 1)
-            ci_status = "PASSED" if exit_code == 0 else "FAILED"
-            ci_timeline.append({
-                "iteration": iteration,
-                "status": ci_status,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            })
-            if exit_code == 0:
-                break
-            iteration += 1
+        # 3. Retry loop runs inside the compiled graph: until PASSED or limit reached
+        state = run_pipeline(state)
+        ci_timeline: list[dict] = state.get("ci_timeline", []) or []
+        exit_code = state.get("test_exit_code", 1)
+        ci_status = "PASSED" if exit_code == 0 else "FAILED"
 
         # 6. Build fixes from state fixes (have description) + commits (have commit_message, status)
         commits = state.get("commits", []) or []
         state_fixes = state.get("fixes", []) or []
-        commit_by_key = {(c.get("file"), c.get("line_number")): c for c in commits}
+        commit_by_fix = {c.get("fix_index"): c for c in commits}
 
         fixes_for_response = []
-        for f in state_fixes:
-            key = (f.get("file", ""), f.get("line"))
-            c = commit_by_key.get(key)
+        for index, f in enumerate(state_fixes):
+            c = commit_by_fix.get(index)
             commit_msg = (c.get("message", "") if c else "") or f"[AI-AGENT] Fix {f.get('bug_type', 'LOGIC')} error in {f.get('file', '')} line {f.get('line', '?')}"
-            status = "Fixed" if c else "Failed"
+            status = "Fixed" if c and c.get("pushed", True) else "Failed"
             fixes_for_response.append({
                 "file": f.get("file", ""),
                 "bug_type": f.get("bug_type", "LOGIC"),
@@ -83,6 +381,8 @@ def run_agent(request: RunRequest) -> RunResponse:
                 "commit_message": commit_msg,
                 "description": f.get("description"),
                 "status": status,
+                "commit_sha": c.get("sha") if c else None,
+                "pushed_sha": c.get("push_sha") if c else None,
             })
 
         total_time_seconds = time.perf_counter() - start_time
@@ -107,15 +407,11 @@ def run_agent(request: RunRequest) -> RunResponse:
             ci_timeline=ci_timeline,
             retry_limit=RETRY_LIMIT,
             error=error_msg,
+            spans=spans,
         )
 
-        # Write results.json to workspace (judge requirement)
-        results_path = Path(__file__).resolve().parent.parent.parent / "results.json"
-        try:
-            results_path.write_text(response.model_dump_json(indent=2), encoding="utf-8")
-        except OSError:
-            pass  # Non-fatal
-
+        # Persisted off the request path; results.json is exported from the latest stored run
+        run_store.record_run(run_id, response, run_events.stage_timings(run_id), created_at)
         return response
 
     except Exception as e:
@@ -124,7 +420,7 @@ def run_agent(request: RunRequest) -> RunResponse:
         ci_timeline = [
             {"iteration": 1, "status": "FAILED", "timestamp": datetime.now(timezone.utc).isoformat()},
         ]
-        return build_run_response(
+        response = build_run_response(
             repo_url=request.repo_url,
             team_name=request.team_name,
             team_leader_name=request.team_leader_name,
@@ -137,10 +433,11 @@ def run_agent(request: RunRequest) -> RunResponse:
             ci_timeline=ci_timeline,
             retry_limit=RETRY_LIMIT,
             error=str(e),
+            spans=spans,
         )
+        run_store.record_run(run_id, response, run_events.stage_timings(run_id), created_at)
+        return response
     finally:
-        if repo_path is not None and Path(repo_path).exists():
-            try:
-                shutil.rmtree(repo_path)
-            except OSError:
-                pass
+        if repo_path is not None:
+            release_workspace(repo_path)
+        run_events.close_run(run_id, ci_status)
@@ -0,0 +1,63 @@
+import json
+
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from app.api.run import execute_run, submit_run
+from app.models import WebhookResult, WebhookStats
+from app.services import webhooks
+from app.services.metrics import WEBHOOK_EVENTS, register_gauge
+
+router = APIRouter()
+
+
+def _submit(dispatch: webhooks.Dispatch) -> str:
+    job = submit_run(dispatch.request, lambda job_id: dispatch.run(lambda request: execute_run(request, run_id=job_id)))
+    return job["job_id"]
+
+
+_debouncer = webhooks.Debouncer(_submit)
+register_gauge("agent_webhook_pending", "Branches with a debounced push waiting to run.", _debouncer.pending_count)
+
+
+@router.post("/webhooks/push", response_model=WebhookResult, status_code=202)
+async def push_webhook(
+    request: Request,
+    team_name: str | None = None,
+    team_leader_name: str | None = None,
+    x_github_event: str | None = Header(default=None),
+    x_hub_signature_256: str | None = Header(default=None),
+) -> WebhookResult:
+    """
+    Push webhook receiver (GitHub format, application/json). Signed deliveries are debounced per
+    repository and branch, and the run heals the branch's latest head sha. ?team_name= and
+    ?team_leader_name= name the fix branch (default WEBHOOK_TEAM_NAME / WEBHOOK_TEAM_LEADER),
+    followed by the source branch.
+    """
+    if not webhooks.WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhooks are disabled (WEBHOOK_SECRET is not set)")
+    body = await request.body()
+    if not webhooks.verify_signature(body, x_hub_signature_256):
+        WEBHOOK_EVENTS.inc(outcome="rejected")
+        raise HTTPException(status_code=401, detail=f"Missing or invalid {webhooks.SIGNATURE_HEADER}")
+    if x_github_event == "ping":
+        return WebhookResult(status="pong")
+    if x_github_event != "push":
+        return WebhookResult(status="ignored", reason=f"{x_github_event or 'unknown'} events are not handled")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body is not JSON")
+    event, reason = webhooks.parse_push(payload if isinstance(payload, dict) else {})
+    if event is None:
+        WEBHOOK_EVENTS.inc(outcome="skipped")
+        return WebhookResult(status="skipped", reason=reason)
+    result = _debouncer.push(
+        event, team_name or webhooks.WEBHOOK_TEAM_NAME, team_leader_name or webhooks.WEBHOOK_TEAM_LEADER
+    )
+    return WebhookResult(**result)
+
+
+@router.get("/webhooks", response_model=WebhookStats)
+def webhook_stats() -> WebhookStats:
+    """Branches with a debounced push waiting, and the webhook run in flight for each."""
+    return WebhookStats(**_debouncer.stats())
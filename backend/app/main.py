@@ -7,9 +7,12 @@ load_dotenv(dotenv_path=_env_path)
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.run import router as run_router
 from app.api.auth import router as auth_router
+from app.api.webhooks import router as webhooks_router
+from app.services import metrics
 
 app = FastAPI(title="CI/CD Healing Agent", version="0.1.0")
 
@@ -22,6 +25,7 @@ app.add_middleware(
 )
 
 app.include_router(run_router, prefix="/api", tags=["run"])
+app.include_router(webhooks_router, prefix="/api", tags=["webhooks"])
 app.include_router(auth_router)
 
 
@@ -35,6 +39,12 @@ def health():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    """Counters and histograms in Prometheus text format; rendered only when scraped."""
+    return PlainTextResponse(metrics.expose(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/check")
 @app.get("/api/check")
 def check_config():
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class RunRequest(BaseModel):
@@ -6,6 +6,10 @@ class RunRequest(BaseModel):
     team_name: str
     team_leader_name: str
     github_token: str | None = None  # Optional per-request token for push (deployed usage)
+    profile: bool | None = None  # Profile this run (None: RUN_PROFILE_SAMPLE_RATE decides)
+    ref: str | None = None  # Branch to heal (None: the default branch)
+    sha: str | None = None  # Commit of ref to heal (None: its tip)
+    replace_fix_branch: bool = False  # Force-push over the fix branch of an earlier run (webhook runs)
 
 
 class FixResult(BaseModel):
@@ -15,6 +19,8 @@ class FixResult(BaseModel):
     commit_message: str
     description: str | None = None  # Exact format: "X error in Y line Z → Fix: W"
     status: str = "Fixed"
+    commit_sha: str | None = None  # Commit the fix landed in
+    pushed_sha: str | None = None  # Branch head of the push that published it
 
 
 class ScoreResult(BaseModel):
@@ -30,6 +36,13 @@ class CITimelineEntry(BaseModel):
     timestamp: str
 
 
+class SpanTiming(BaseModel):
+    name: str  # node:<graph node> or a service call (clone, syntax_check, pytest, pip_install, commit, push...)
+    parent: str | None = None
+    start_offset: float  # Seconds since the run started
+    seconds: float
+
+
 class RunResponse(BaseModel):
     """results.json format - judge-critical."""
     repo_url: str
@@ -45,3 +58,133 @@ class RunResponse(BaseModel):
     ci_timeline: list[CITimelineEntry]
     retry_limit: int = 5
     error: str | None = None  # Set when exception occurs (clone, push, etc.)
+    timings: dict[str, float] = {}  # Total seconds per span name
+    spans: list[SpanTiming] = []
+
+
+class StageTiming(BaseModel):
+    stage: str  # clone | syntax_check | syntax_fix | lint | pytest | fix | review | commit | push
+    iteration: int
+    status: str  # finished | failed
+    started_at: str
+    seconds: float
+
+
+class JobStatus(BaseModel):
+    """Async run job. result is set once status is completed."""
+    job_id: str
+    status: str  # queued | running | completed | failed
+    repo_url: str = ""
+    queued_at: str
+    started_at: str | None = None
+    finished_at: str | None = None
+    result: RunResponse | None = None
+    error: str | None = None
+    stages: list[StageTiming] = []
+    profiles: list[str] = []  # Downloadable via GET /api/runs/{job_id}/profile?format=...
+
+
+class BatchRunRequest(BaseModel):
+    runs: list[RunRequest] = Field(min_length=1)
+
+
+class BatchRun(BaseModel):
+    """One run of a batch; the result fields are set once it finished."""
+    job_id: str
+    repo_url: str
+    team_name: str
+    status: str  # queued | running | completed | failed | expired
+    ci_status: str | None = None
+    total_failures: int | None = None
+    total_fixes_applied: int | None = None
+    total_time_seconds: float | None = None
+    error: str | None = None
+
+
+class BatchStatus(BaseModel):
+    """Aggregated progress of POST /api/run/batch; full results via GET /api/runs/{job_id}."""
+    batch_id: str
+    status: str  # queued | running | finished
+    created_at: str
+    total: int
+    counts: dict[str, int]  # Runs per job status
+    passed: int  # Finished with ci_status PASSED
+    progress: float  # Finished runs / total
+    runs: list[BatchRun]
+
+
+class WebhookResult(BaseModel):
+    status: str  # scheduled | coalesced | skipped | ignored | pong
+    reason: str | None = None  # Why a push was skipped or an event ignored
+    repo_url: str | None = None
+    branch: str | None = None
+    sha: str | None = None
+    run_in_seconds: float | None = None  # Until the run is queued, if no newer push arrives
+
+
+class WebhookBranch(BaseModel):
+    repo_url: str  # Normalized
+    branch: str
+    pending_sha: str | None = None  # Latest push still in its debounce period
+    coalesced: int  # Earlier pushes of the burst it replaced
+    run_in_seconds: float | None = None
+    job_id: str | None = None  # Webhook run queued or running for the branch
+    job_sha: str | None = None
+
+
+class WebhookStats(BaseModel):
+    debounce_seconds: float
+    max_delay_seconds: float
+    branches: list[WebhookBranch]
+
+
+class FixCacheStats(BaseModel):
+    enabled: bool
+    rules_version: str  # Hash of the fixer rules; entries from other versions never match
+    entries: int
+    bytes: int
+    hits: int
+    misses: int
+    hit_rate: float
+    chained_fixes: int  # Follow-up fixes replayed from later iterations of earlier runs
+    stores: int
+    evictions: int
+    invalidations: int
+
+
+class RunSummary(BaseModel):
+    """One stored run (GET /api/runs)."""
+    run_id: str
+    repo_url: str
+    branch_name: str
+    team_name: str
+    team_leader_name: str
+    ci_status: str
+    total_failures: int
+    total_fixes_applied: int
+    total_time_seconds: float
+    score_total: int
+    error: str | None = None
+    created_at: str
+
+
+class RunList(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    runs: list[RunSummary]
+
+
+class QueueStats(BaseModel):
+    workers: int
+    busy_workers: int
+    utilization: float
+    queue_depth: int
+    queue_max: int
+    completed: int
+    failed: int
+    tracked_jobs: int
+    queued_groups: int  # Teams with runs waiting (served round-robin)
+    max_per_host: int
+    active_hosts: dict[str, int]  # Runs in progress per git host
+    tracked_batches: int
@@ -0,0 +1,123 @@
+"""Shared engine for per-file static passes: content-hash cache plus process-pool fan-out."""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+SKIP_DIRS = {"__pycache__", ".git", "venv", ".venv", "env", "node_modules"}
+
+CHECK_WORKERS = int(os.environ.get("CHECK_WORKERS", "0")) or (os.cpu_count() or 1)
+# Below this many uncached files the pool start-up costs more than it saves
+CHECK_PARALLEL_MIN = int(os.environ.get("CHECK_PARALLEL_MIN", "64"))
+CHECK_CACHE_MAX_ENTRIES = int(os.environ.get("CHECK_CACHE_MAX_ENTRIES", "200000"))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+class ContentCache:
+    """Thread-safe LRU of (rel_path, sha1 of bytes) -> pass result."""
+
+    def __init__(self, max_entries: int = CHECK_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[tuple[str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str]) -> tuple[bool, Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return True, self._data[key]
+        return False, None
+
+    def put(self, key: tuple[str, str], value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def iter_python_files(repo_path: Path):
+    """Yield .py files under repo_path, pruning SKIP_DIRS without descending into them."""
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            if name.endswith(".py"):
+                yield Path(root) / name
+
+
+def rel_path(py_file: Path, repo_path: Path) -> str:
+    try:
+        rel = str(py_file.relative_to(repo_path))
+    except ValueError:
+        rel = str(py_file)
+    return rel.replace("\\", "/")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=CHECK_WORKERS)
+        return _pool
+
+
+def _check_batch(check: Callable[[bytes, str], Any], batch: list[tuple[str, bytes]]) -> list[Any]:
+    return [check(source, rel) for rel, source in batch]
+
+
+def run_file_pass(
+    repo_path: Path,
+    check: Callable[[bytes, str], Any],
+    cache: ContentCache,
+    files: list[Path] | None = None,
+) -> tuple[dict[str, Any], int]:
+    """
+    Run check(source_bytes, rel_path) over files (default: every .py under repo_path).
+    check must be a module-level function so it can be sent to pool workers.
+    Returns ({rel_path: result}, number of files actually checked, i.e. cache misses).
+    """
+    if files is None:
+        files = list(iter_python_files(repo_path))
+
+    results: dict[str, Any] = {}
+    misses: list[tuple[tuple[str, str], bytes]] = []
+    for py_file in files:
+        rel = rel_path(py_file, repo_path)
+        try:
+            source = py_file.read_bytes()
+        except OSError:
+            continue
+        key = (rel, hashlib.sha1(source).hexdigest())
+        hit, result = cache.get(key)
+        if hit:
+            results[rel] = result
+        else:
+            misses.append((key, source))
+
+    if len(misses) >= CHECK_PARALLEL_MIN and CHECK_WORKERS > 1:
+        n_batches = CHECK_WORKERS * 4
+        size = max(1, -(-len(misses) // n_batches))
+        batches = [misses[i : i + size] for i in range(0, len(misses), size)]
+        pool = _get_pool()
+        futures = [pool.submit(_check_batch, check, [(k[0], src) for k, src in b]) for b in batches]
+        checked = [r for fut in futures for r in fut.result()]
+    else:
+        checked = [check(src, k[0]) for k, src in misses]
+
+    for (key, _src), result in zip(misses, checked):
+        cache.put(key, result)
+        results[key[0]] = result
+    return results, len(misses)
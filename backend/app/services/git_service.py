@@ -1,9 +1,16 @@
+import threading
 from pathlib import Path
 
 from git import Repo
 
+from app.services.metrics import timed
+
 PREFIX = "[AI-AGENT]"
 
+# One Repo handle per workspace for the lifetime of a run
+_repos: dict[str, Repo] = {}
+_repos_lock = threading.Lock()
+
 
 def ensure_prefix(message: str) -> str:
     """Ensure commit message starts with [AI-AGENT]."""
@@ -12,12 +19,32 @@ def ensure_prefix(message: str) -> str:
     return message.strip()
 
 
-def commit(repo_path: Path, message: str) -> str | None:
+def open_repo(repo_path: Path | Repo) -> Repo:
+    """Return the cached Repo handle for repo_path (opened on first use)."""
+    if isinstance(repo_path, Repo):
+        return repo_path
+    key = str(Path(repo_path).resolve())
+    with _repos_lock:
+        repo = _repos.get(key)
+        if repo is None:
+            repo = _repos[key] = Repo(key)
+        return repo
+
+
+def close_repo(repo_path: Path) -> None:
+    """Drop the cached handle (and its git cat-file processes) when a workspace is released."""
+    with _repos_lock:
+        repo = _repos.pop(str(Path(repo_path).resolve()), None)
+    if repo is not None:
+        repo.close()
+
+
+def commit(repo_path: Path | Repo, message: str) -> str | None:
     """
     Stage all changes and commit with [AI-AGENT] prefix.
     Returns commit sha or None if nothing to commit.
     """
-    repo = Repo(repo_path)
+    repo = open_repo(repo_path)
     if repo.is_dirty() or repo.untracked_files:
         repo.git.add(A=True)
         msg = ensure_prefix(message)
@@ -26,16 +53,18 @@ def commit(repo_path: Path, message: str) -> str | None:
     return None
 
 
-def commit_file(repo_path: Path, file_path: str, message: str) -> str | None:
+@timed("commit")
+def commit_files(repo_path: Path | Repo, file_paths: list[str], message: str) -> str | None:
     """
-    Stage single file and commit. For per-fix commits.
+    Stage the given files and commit them together.
     Returns commit sha or None if nothing to commit.
     """
-    repo = Repo(repo_path)
-    full = repo_path / file_path
-    if not full.exists():
+    repo = open_repo(repo_path)
+    root = Path(repo.working_tree_dir)
+    existing = [f for f in dict.fromkeys(file_paths) if (root / f).exists()]
+    if not existing:
         return None
-    repo.git.add(file_path)
+    repo.git.add(*existing)
     staged = repo.index.diff("HEAD")
     if not staged:
         return None
@@ -44,10 +73,23 @@ def commit_file(repo_path: Path, file_path: str, message: str) -> str | None:
     return repo.head.commit.hexsha
 
 
-def push(repo_path: Path, branch_name: str) -> None:
-    """Push branch to origin. Never push to main."""
+def commit_file(repo_path: Path | Repo, file_path: str, message: str) -> str | None:
+    """
+    Stage single file and commit. For per-fix commits.
+    Returns commit sha or None if nothing to commit.
+    """
+    return commit_files(repo_path, [file_path], message)
+
+
+@timed("push")
+def push(repo_path: Path | Repo, branch_name: str, force: bool = False) -> str:
+    """
+    Push branch to origin. Never push to main. Returns the pushed head sha.
+    force replaces the remote branch (a fix branch an earlier run based on an older commit).
+    """
     if branch_name.lower() in ("main", "master"):
         raise ValueError("Cannot push to main/master")
-    repo = Repo(repo_path)
+    repo = open_repo(repo_path)
     origin = repo.remotes.origin
-    origin.push(branch_name)
+    origin.push(branch_name, force=force).raise_if_error()
+    return repo.head.commit.hexsha
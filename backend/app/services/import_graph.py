@@ -0,0 +1,208 @@
+"""
+Static import graph of a repository, for test impact analysis: which test modules can import
+(directly or transitively) a set of changed files. Per-file imports are parsed from the AST on
+the shared file pass engine, so they are cached by content hash across iterations and runs;
+only resolution against the repository layout is redone per call.
+"""
+
+import ast
+from collections import deque
+from pathlib import Path, PurePosixPath
+
+from app.services.file_pass import ContentCache, run_file_pass
+
+# (module, level, imported names): "from ..a import b" -> ("a", 2, ("b",)), "import a.b" -> ("a.b", 0, ())
+ImportSpec = tuple[str, int, tuple[str, ...]]
+
+_cache = ContentCache()
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def is_test_file(rel: str) -> bool:
+    """pytest's default python_files: test_*.py and *_test.py."""
+    name = rel.rsplit("/", 1)[-1]
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def _constant_strings(node: ast.AST | None) -> list[str]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [e.value for e in node.elts if isinstance(e, ast.Constant) and isinstance(e.value, str)]
+    return []
+
+
+def parse_imports(source: bytes, filename: str) -> list[ImportSpec] | None:
+    """
+    Every import of a module, including function-level and conditional ones, importlib.import_module()
+    / __import__() with a literal name and pytest_plugins entries. None if the file does not parse.
+    """
+    try:
+        tree = ast.parse(source, filename=filename)
+    except (SyntaxError, ValueError):
+        return None
+    specs: list[ImportSpec] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            specs.extend((alias.name, 0, ()) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            specs.append((node.module or "", node.level, tuple(alias.name for alias in node.names)))
+        elif isinstance(node, ast.Call) and node.args:
+            func = node.func
+            name = func.attr if isinstance(func, ast.Attribute) else func.id if isinstance(func, ast.Name) else ""
+            if name in ("import_module", "__import__"):
+                specs.extend((module, 0, ()) for module in _constant_strings(node.args[0]))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            if any(isinstance(t, ast.Name) and t.id == "pytest_plugins" for t in targets):
+                specs.extend((module, 0, ()) for module in _constant_strings(node.value))
+    return specs
+
+
+class ImportGraph:
+    """Files (repo-relative, "/"-separated) and who imports whom, resolved against the repo layout."""
+
+    def __init__(self, files: dict[str, list[ImportSpec] | None]) -> None:
+        self.files = files
+        self.unparsable = {rel for rel, specs in files.items() if specs is None}
+        self._dirs_with_init = {rel.rsplit("/", 1)[0] if "/" in rel else "" for rel in files
+                                if rel.endswith("/__init__.py") or rel == "__init__.py"}
+        self.modules = self._index_modules()
+        self.importers: dict[str, set[str]] = {}
+        # What other files take from a file: names from-imported, or the whole module
+        # (plain import, star import) when any attribute may be used
+        self.imported_names: dict[str, set[str]] = {}
+        self.module_imported: set[str] = set()
+        for rel, specs in files.items():
+            for target in self._dependencies(rel, specs or []):
+                if target != rel:
+                    self.importers.setdefault(target, set()).add(rel)
+
+    def _basedir(self, rel: str) -> str:
+        """Directory pytest (rootdir-relative "prepend" import mode) puts on sys.path for rel."""
+        parent = str(PurePosixPath(rel).parent)
+        parent = "" if parent == "." else parent
+        while parent and parent in self._dirs_with_init:
+            parent = parent.rsplit("/", 1)[0] if "/" in parent else ""
+        return parent
+
+    def _index_modules(self) -> dict[str, list[str]]:
+        """
+        Dotted module name -> files, for every sys.path root a test run can have: the repository
+        root, src/, and the base directory of every package or loose module tree.
+        """
+        roots = {"", "src"} | {self._basedir(rel) for rel in self.files}
+        modules: dict[str, list[str]] = {}
+        for rel in self.files:
+            parts = rel[:-3].split("/")
+            if parts[-1] == "__init__":
+                parts.pop()
+            for i in range(len(parts)):
+                if "/".join(parts[:i]) in roots:
+                    modules.setdefault(".".join(parts[i:]), []).append(rel)
+        return modules
+
+    def _package_inits(self, rel: str) -> list[str]:
+        """__init__.py files executed before rel (its enclosing packages)."""
+        inits = []
+        parent = rel.rsplit("/", 1)[0] if "/" in rel else ""
+        while parent in self._dirs_with_init:
+            inits.append(f"{parent}/__init__.py" if parent else "__init__.py")
+            if not parent:
+                break
+            parent = parent.rsplit("/", 1)[0] if "/" in parent else ""
+        return inits
+
+    def _resolve_absolute(self, module: str) -> list[str]:
+        parts = module.split(".")
+        found = []
+        for i in range(1, len(parts) + 1):
+            found.extend(self.modules.get(".".join(parts[:i]), ()))
+        return found
+
+    def _resolve_relative(self, rel: str, module: str, level: int) -> tuple[str, list[str]]:
+        base = PurePosixPath(rel).parent
+        for _ in range(level - 1):
+            base = base.parent
+        path = str(base / module.replace(".", "/")) if module else str(base)
+        path = "" if path == "." else path
+        found = [f for f in (f"{path}.py", f"{path}/__init__.py" if path else "__init__.py") if f in self.files]
+        return path, found
+
+    def _record_use(self, rel: str, targets: list[str], names: tuple[str, ...] | None) -> None:
+        for target in targets:
+            if target == rel:
+                continue
+            if names is None or "*" in names:
+                self.module_imported.add(target)
+            else:
+                self.imported_names.setdefault(target, set()).update(names)
+
+    def _dependencies(self, rel: str, specs: list[ImportSpec]) -> set[str]:
+        deps = set(self._package_inits(rel))
+        for module, level, names in specs:
+            if level:
+                path, found = self._resolve_relative(rel, module, level)
+                deps.update(found)
+                self._record_use(rel, found, names)
+                # "from . import name": name may be a submodule rather than an attribute
+                prefix = f"{path}/" if path else ""
+                for name in names:
+                    submodules = [f for f in (f"{prefix}{name}.py", f"{prefix}{name}/__init__.py") if f in self.files]
+                    deps.update(submodules)
+                    self._record_use(rel, submodules, None)
+            elif not names:
+                # "import a.b.c" binds a: attributes of every package on the way can be used
+                found = self._resolve_absolute(module)
+                deps.update(found)
+                self._record_use(rel, found, None)
+            else:
+                deps.update(self._resolve_absolute(module))
+                self._record_use(rel, list(self.modules.get(module, ())), names)
+                for name in names:
+                    if name != "*":
+                        submodules = list(self.modules.get(f"{module}.{name}", ()))
+                        deps.update(submodules)
+                        self._record_use(rel, submodules, None)
+        for dep in list(deps):
+            deps.update(self._package_inits(dep))
+        return deps
+
+    def dependents(self, changed: set[str]) -> set[str]:
+        """changed plus every file that imports one of them, transitively."""
+        seen = set(changed)
+        queue = deque(changed)
+        while queue:
+            for importer in self.importers.get(queue.popleft(), ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    queue.append(importer)
+        return seen
+
+
+def build_graph(repo_path: Path) -> ImportGraph:
+    """Import graph of every .py file under repo_path; unchanged files reuse their cached parse."""
+    results, _checked = run_file_pass(repo_path, parse_imports, _cache)
+    return ImportGraph(results)
+
+
+def affected_tests(repo_path: Path, changed_files: list[str]) -> list[str] | None:
+    """
+    Test modules (repo-relative, sorted) whose outcome can depend on changed_files: tests importing
+    one of them transitively, every test under a conftest.py that does, and any unparsable test.
+    Files that do not parse count as importing everything. Returns None when the graph cannot
+    answer (a changed file is not a Python file of the repository) and the whole suite should run.
+    """
+    changed = {f.replace("\\", "/").removeprefix("./") for f in changed_files}
+    graph = build_graph(repo_path)
+    if any(f not in graph.files for f in changed):
+        return None
+    affected = graph.dependents(changed | graph.unparsable)
+    tests = {rel for rel in affected if is_test_file(rel)}
+    for conftest in (rel for rel in affected if rel.rsplit("/", 1)[-1] == "conftest.py"):
+        scope = conftest[: -len("conftest.py")]
+        tests.update(rel for rel in graph.files if is_test_file(rel) and rel.startswith(scope))
+    return sorted(tests)
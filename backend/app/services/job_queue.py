@@ -0,0 +1,233 @@
+"""
+Bounded in-process job queue: a fixed pool of worker threads executing agent runs.
+Jobs wait in one FIFO per fairness group (the team); workers take from the groups round-robin,
+skipping jobs whose remote host already has RUN_MAX_PER_HOST runs going.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from app.services.metrics import register_gauge
+
+# Concurrent runs (0 = available cores)
+RUN_WORKERS = max(1, int(os.environ.get("RUN_WORKERS", "2")) or (os.cpu_count() or 1))
+RUN_QUEUE_MAX = int(os.environ.get("RUN_QUEUE_MAX", "100"))
+# Concurrent runs against one git host (0 = only RUN_WORKERS limits them)
+RUN_MAX_PER_HOST = int(os.environ.get("RUN_MAX_PER_HOST", "4"))
+# Finished jobs are kept this long for GET /api/runs/{id}
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+
+JOB_STATUSES = ("queued", "running", "completed", "failed")
+
+
+class QueueFullError(RuntimeError):
+    """Raised when RUN_QUEUE_MAX jobs are already waiting."""
+
+
+_jobs: dict[str, dict] = {}
+_jobs_lock = threading.Lock()
+_work_ready = threading.Condition(_jobs_lock)
+# Fairness group -> FIFO of (job_id, fn, host); dict order is the round-robin order
+_pending: "OrderedDict[str, deque[tuple[str, Callable[[], Any], str]]]" = OrderedDict()
+_pending_count = 0
+_host_active: Counter = Counter()
+_batches: dict[str, dict] = {}
+_workers: list[threading.Thread] = []
+_busy = 0
+_completed = 0
+_failed = 0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _next_job() -> tuple[str, Callable[[], Any], str] | None:
+    """
+    Oldest job of the first group (round-robin) whose host has a free slot, moving that group to
+    the back. Jobs for a saturated host are skipped, not blocking their group. Caller holds _jobs_lock.
+    """
+    for group, jobs in _pending.items():
+        for i, (_job_id, _fn, host) in enumerate(jobs):
+            if RUN_MAX_PER_HOST <= 0 or _host_active[host] < RUN_MAX_PER_HOST:
+                picked = jobs[i]
+                del jobs[i]
+                del _pending[group]
+                if jobs:
+                    _pending[group] = jobs
+                return picked
+    return None
+
+
+def _worker() -> None:
+    global _busy, _completed, _failed, _pending_count
+    while True:
+        with _work_ready:
+            picked = _next_job()
+            while picked is None:
+                _work_ready.wait()
+                picked = _next_job()
+            job_id, fn, host = picked
+            _pending_count -= 1
+            job = _jobs.get(job_id)
+            if job is None:
+                continue
+            job["status"] = "running"
+            job["started_at"] = _now()
+            _busy += 1
+            _host_active[host] += 1
+        try:
+            result = fn()
+            with _jobs_lock:
+                job["result"] = result
+                job["status"] = "completed"
+                _completed += 1
+        except Exception as e:
+            with _jobs_lock:
+                job["error"] = str(e)
+                job["status"] = "failed"
+                _failed += 1
+        finally:
+            with _work_ready:
+                job["finished_at"] = _now()
+                job["_finished"] = time.monotonic()
+                _busy -= 1
+                _host_active[host] -= 1
+                if _host_active[host] <= 0:
+                    del _host_active[host]
+                # A host slot freed up: a job skipped for it may be runnable now
+                _work_ready.notify_all()
+
+
+def _ensure_workers() -> None:
+    with _jobs_lock:
+        while len(_workers) < RUN_WORKERS:
+            t = threading.Thread(target=_worker, name=f"run-worker-{len(_workers)}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def _prune() -> None:
+    """Drop finished jobs older than JOB_RETENTION_SECONDS and batches left without jobs. Caller holds _jobs_lock."""
+    cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+    stale = [jid for jid, j in _jobs.items() if j.get("_finished") and j["_finished"] < cutoff]
+    for jid in stale:
+        del _jobs[jid]
+    if stale:
+        for batch_id in [b for b, batch in _batches.items() if not any(j in _jobs for j in batch["job_ids"])]:
+            del _batches[batch_id]
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _enqueue(job_id: str, fn: Callable[[], Any], meta: dict | None, group: str, host: str) -> dict:
+    """Register and queue one job. Caller holds _jobs_lock and has checked RUN_QUEUE_MAX."""
+    global _pending_count
+    _jobs[job_id] = {
+        "job_id": job_id,
+        "status": "queued",
+        "queued_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None,
+        **(meta or {}),
+    }
+    _pending.setdefault(group, deque()).append((job_id, fn, host))
+    _pending_count += 1
+    return _snapshot(job_id)
+
+
+def submit(
+    fn: Callable[[], Any], meta: dict | None = None, job_id: str | None = None, group: str = "", host: str = ""
+) -> dict:
+    """
+    Enqueue fn for a worker. Returns the job snapshot. Raises QueueFullError when saturated.
+    job_id lets the caller hand the id to fn before it is queued (default: a new one).
+    group is the fairness group (the team) and host the remote the run talks to.
+    """
+    _ensure_workers()
+    job_id = job_id or new_job_id()
+    with _work_ready:
+        _prune()
+        if RUN_QUEUE_MAX > 0 and _pending_count >= RUN_QUEUE_MAX:
+            raise QueueFullError(f"Run queue is full ({RUN_QUEUE_MAX} jobs waiting)")
+        snapshot = _enqueue(job_id, fn, meta, group, host)
+        _work_ready.notify()
+    return snapshot
+
+
+def submit_batch(jobs: list[tuple[str, Callable[[], Any], dict, str, str]]) -> tuple[str, list[dict]]:
+    """
+    Enqueue (job_id, fn, meta, group, host) jobs as one batch: all of them or, when they do not
+    all fit under RUN_QUEUE_MAX, none (QueueFullError). Returns (batch_id, job snapshots).
+    """
+    _ensure_workers()
+    batch_id = new_job_id()
+    with _work_ready:
+        _prune()
+        if RUN_QUEUE_MAX > 0 and _pending_count + len(jobs) > RUN_QUEUE_MAX:
+            raise QueueFullError(
+                f"Run queue cannot take {len(jobs)} more jobs ({_pending_count} of {RUN_QUEUE_MAX} waiting)"
+            )
+        snapshots = [_enqueue(job_id, fn, meta, group, host) for job_id, fn, meta, group, host in jobs]
+        _batches[batch_id] = {"batch_id": batch_id, "created_at": _now(), "job_ids": [j[0] for j in jobs]}
+        _work_ready.notify_all()
+    return batch_id, snapshots
+
+
+def _snapshot(job_id: str) -> dict | None:
+    job = _jobs.get(job_id)
+    if job is None:
+        return None
+    return {k: v for k, v in job.items() if not k.startswith("_")}
+
+
+def get_job(job_id: str) -> dict | None:
+    """Public snapshot of a job, or None if unknown/expired."""
+    with _jobs_lock:
+        return _snapshot(job_id)
+
+
+def get_batch(batch_id: str) -> tuple[dict, list[dict | None]] | None:
+    """(batch record, snapshot or None per job in submission order), or None if unknown/expired."""
+    with _jobs_lock:
+        batch = _batches.get(batch_id)
+        if batch is None:
+            return None
+        return dict(batch), [_snapshot(job_id) for job_id in batch["job_ids"]]
+
+
+def _gauge(field: str) -> Callable[[], float]:
+    return lambda: stats()[field]
+
+
+register_gauge("agent_queue_depth", "Runs waiting for a worker.", _gauge("queue_depth"))
+register_gauge("agent_busy_workers", "Run workers currently executing a run.", _gauge("busy_workers"))
+
+
+def stats() -> dict:
+    """Queue depth and worker utilization."""
+    with _jobs_lock:
+        workers = max(len(_workers), RUN_WORKERS)
+        return {
+            "workers": workers,
+            "busy_workers": _busy,
+            "utilization": round(_busy / workers, 3),
+            "queue_depth": _pending_count,
+            "queue_max": RUN_QUEUE_MAX,
+            "queued_groups": sum(1 for jobs in _pending.values() if jobs),
+            "max_per_host": RUN_MAX_PER_HOST,
+            "active_hosts": dict(_host_active),
+            "tracked_batches": len(_batches),
+            "completed": _completed,
+            "failed": _failed,
+            "tracked_jobs": len(_jobs),
+        }
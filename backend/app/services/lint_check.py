@@ -0,0 +1,126 @@
+"""
+Static unused-import detector (AST based), cached by content hash and run on the shared process pool.
+Per-file findings are then filtered against the repository's import graph: names other modules
+import from a file are re-exports, and plain imports of repo modules or submodules may be kept
+for their side effects (registration, plugins), so neither is reported.
+"""
+
+import ast
+import re
+from pathlib import Path
+
+from app.services.file_pass import ContentCache, run_file_pass
+from app.services.import_graph import build_graph
+
+# [(line, message, bound names, modules of a plain "import x" statement), ...] per file
+LintResult = list[tuple[int, str, tuple[str, ...], tuple[str, ...]]]
+
+_cache = ContentCache()
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Files whose imports are usually re-exports or pytest fixtures resolved by name
+_SKIP_FILENAMES = ("__init__.py", "conftest.py")
+
+
+def _used_names(tree: ast.AST) -> set[str]:
+    """Every identifier the module could refer to an import by, conservatively."""
+    used: set[str] = set()
+    docstrings = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and node.body:
+            first = node.body[0]
+            if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant):
+                docstrings.add(id(first.value))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            used.add(node.id)
+        elif isinstance(node, ast.arg):
+            # pytest fixtures imported into a test module are requested by parameter name
+            used.add(node.arg)
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in docstrings:
+            # String annotations, __all__ entries, getattr() names
+            used.update(_WORD_RE.findall(node.value))
+    return used
+
+
+def _bound_names(node: ast.Import | ast.ImportFrom) -> list[str]:
+    names = []
+    for alias in node.names:
+        if alias.name == "*":
+            return []
+        if alias.asname:
+            names.append(alias.asname)
+        elif isinstance(node, ast.Import):
+            names.append(alias.name.split(".")[0])
+        else:
+            names.append(alias.name)
+    return names
+
+
+def check_unused_imports(source: bytes, filename: str) -> LintResult:
+    """
+    Report top-level import statements none of whose names are used (names listed in __all__
+    count as used).
+    Only single-line statements alone on their line are reported, so that
+    fix_linting's whole-line delete is always safe. Unparsable files report nothing.
+    """
+    if filename.rsplit("/", 1)[-1] in _SKIP_FILENAMES:
+        return []
+    try:
+        tree = ast.parse(source, filename)
+    except (SyntaxError, ValueError):
+        return []
+
+    used = _used_names(tree)
+    lines = source.decode("utf-8", errors="replace").splitlines()
+    body = tree.body
+    results: LintResult = []
+    for i, node in enumerate(body):
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+            continue
+        if node.end_lineno != node.lineno:
+            continue
+        # Another statement on the same line (a; b) would be deleted with it
+        if (i > 0 and body[i - 1].end_lineno == node.lineno) or (
+            i + 1 < len(body) and body[i + 1].lineno == node.lineno
+        ):
+            continue
+        names = _bound_names(node)
+        if not names or any(n in used for n in names):
+            continue
+        text = lines[node.lineno - 1].strip() if node.lineno <= len(lines) else ""
+        modules = tuple(alias.name for alias in node.names) if isinstance(node, ast.Import) else ()
+        results.append((node.lineno, f"unused import: {', '.join(names)} ({text})", tuple(names), modules))
+    return results
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def check_files(
+    repo_path: Path, files: list[Path] | None = None
+) -> tuple[list[tuple[str, int, str]], int]:
+    """
+    Find unused imports in files (default: every .py under repo_path), minus re-exports and
+    side-effect imports (see module docstring).
+    Returns ([(rel_path, line, message), ...] sorted, number of files actually parsed).
+    """
+    results, parsed = run_file_pass(repo_path, check_unused_imports, _cache, files)
+    if not any(results.values()):
+        return [], parsed
+    graph = build_graph(repo_path)
+    findings = []
+    for rel, res in sorted(results.items()):
+        if rel in graph.module_imported:
+            continue  # Imported whole elsewhere: any of its names may be used as an attribute
+        exported = graph.imported_names.get(rel, set())
+        for line, msg, names, modules in res:
+            if exported.intersection(names):
+                continue
+            if any("." in m or m in graph.modules for m in modules):
+                continue
+            findings.append((rel, line, msg))
+    return findings, parsed
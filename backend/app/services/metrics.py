@@ -0,0 +1,206 @@
+"""
+Span timing and Prometheus-style metrics, without external dependencies.
+Recording is a perf_counter pair plus a locked dict update; text exposition is
+only built when /metrics is scraped. Spans opened inside record_run() are also
+collected into that run's breakdown.
+"""
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# Upper bounds in seconds; covers sub-millisecond parses up to whole runs
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _label_key(labels: dict[str, str]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple[tuple[str, str], ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _k, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _v), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {_format_value(cumulative)}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {round(series[-1], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(cumulative)}")
+        return lines
+
+
+RUNS = Counter("agent_runs_total", "Finished agent runs by CI status.")
+ITERATIONS = Counter("agent_iterations_total", "Analyzer passes (healing loop iterations).")
+FIXES = Counter("agent_fixes_total", "Fixes applied, by bug type.")
+PUSH_FAILURES = Counter("agent_push_failures_total", "Failed pushes of the fix branch.")
+WEBHOOK_EVENTS = Counter("agent_webhook_events_total", "Push webhook events and debounced dispatches, by outcome.")
+RUN_SECONDS = Histogram("agent_run_seconds", "Wall time of whole runs.")
+SPAN_SECONDS = Histogram("agent_span_seconds", "Wall time of instrumented spans (graph nodes and service calls).")
+
+_METRICS: list[Counter | Histogram] = [RUNS, ITERATIONS, FIXES, PUSH_FAILURES, WEBHOOK_EVENTS, RUN_SECONDS, SPAN_SECONDS]
+# name -> (help, callback returning {label key: value}); sampled only on scrape
+_GAUGES: dict[str, tuple[str, Callable[[], dict[tuple, float]]]] = {}
+
+
+def register_gauge(name: str, help_text: str, callback: Callable[[], dict[tuple, float] | float]) -> None:
+    """Gauge computed at scrape time (queue depth, cache sizes...): no cost between scrapes."""
+    def _normalized() -> dict[tuple, float]:
+        value = callback()
+        return value if isinstance(value, dict) else {(): value}
+
+    _GAUGES[name] = (help_text, _normalized)
+
+
+class _RunSpans:
+    """Spans of one run: finished spans in order plus the stack of open span names."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spans: list[dict] = []
+        self.stack: list[str] = []
+        self.lock = threading.Lock()
+
+
+_current: contextvars.ContextVar[_RunSpans | None] = contextvars.ContextVar("agent_run_spans", default=None)
+
+
+@contextmanager
+def record_run() -> Iterator[list[dict]]:
+    """Collect every span opened in this context (and contexts copied from it) into the yielded list."""
+    run = _RunSpans()
+    token = _current.set(run)
+    try:
+        yield run.spans
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block: always into agent_span_seconds, and into the current run's breakdown if any."""
+    run = _current.get()
+    parent = None
+    if run is not None:
+        with run.lock:
+            parent = run.stack[-1] if run.stack else None
+            run.stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        SPAN_SECONDS.observe(seconds, span=name)
+        if run is not None:
+            with run.lock:
+                if run.stack and run.stack[-1] == name:
+                    run.stack.pop()
+                run.spans.append({
+                    "name": name,
+                    "parent": parent,
+                    "start_offset": round(start - run.started, 4),
+                    "seconds": round(seconds, 4),
+                })
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """Decorator form of span()."""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def summarize(spans: list[dict]) -> dict[str, float]:
+    """Total seconds per span name (a span that ran in several iterations is summed)."""
+    totals: dict[str, float] = {}
+    for s in spans:
+        totals[s["name"]] = round(totals.get(s["name"], 0.0) + s["seconds"], 4)
+    return totals
+
+
+def expose() -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines: list[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.expose())
+    for name, (help_text, callback) in sorted(_GAUGES.items()):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        try:
+            values = callback()
+        except Exception:
+            continue
+        lines.extend(f"{name}{_format_labels(k)} {_format_value(v)}" for k, v in sorted(values.items()))
+    return "\n".join(lines) + "\n"
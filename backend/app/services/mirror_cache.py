@@ -0,0 +1,212 @@
+"""Local bare-mirror cache so repeated runs on the same repo fetch incrementally."""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from git import Repo
+
+MIRROR_CACHE_ENABLED = os.environ.get("MIRROR_CACHE_ENABLED", "1").strip() not in ("0", "false", "no")
+MIRROR_CACHE_DIR = Path(
+    os.environ.get("MIRROR_CACHE_DIR", "") or Path(tempfile.gettempdir()) / "ai_agent_mirrors"
+)
+MIRROR_CACHE_MAX_ENTRIES = int(os.environ.get("MIRROR_CACHE_MAX_ENTRIES", "20"))
+MIRROR_CACHE_MAX_BYTES = int(os.environ.get("MIRROR_CACHE_MAX_BYTES", str(5 * 1024**3)))
+
+_META_FILE = "agent_cache.json"
+
+_locks: dict[str, threading.Lock] = {}
+_active: dict[str, int] = {}
+_workspaces: dict[str, str] = {}  # workspace path -> mirror key
+_guard = threading.Lock()
+_cleanup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workspace-cleanup")
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """Normalize repo URL for cache keys: drop credentials, case of host, trailing .git and slashes."""
+    url = repo_url.strip()
+    m = re.match(r"(?i)(https?|ssh|git)://(?:[^@/]*@)?([^/]+)(/.*)?$", url)
+    if m:
+        path = (m.group(3) or "").rstrip("/")
+        if path.endswith(".git"):
+            path = path[:-4]
+        return f"{m.group(1).lower()}://{m.group(2).lower()}{path}"
+    url = url.rstrip("/")
+    return url[:-4] if url.endswith(".git") else url
+
+
+def remote_host(repo_url: str) -> str:
+    """Lower-cased host a repo URL talks to (scp-style git@host:path too); "local" for paths and file:// URLs."""
+    url = repo_url.strip()
+    m = re.match(r"(?i)(?:https?|ssh|git)://(?:[^@/]*@)?([^/:]+)", url)
+    m = m or re.match(r"(?:[^@/]+@)?([^/:]{2,}):(?!//)", url)
+    return m.group(1).lower() if m else "local"
+
+
+def mirror_key(repo_url: str) -> str:
+    """Stable directory key for a repo URL."""
+    return hashlib.sha1(normalize_repo_url(repo_url).encode("utf-8")).hexdigest()[:16]
+
+
+def _mirror_lock(key: str) -> threading.Lock:
+    with _guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _read_meta(mirror_dir: Path) -> dict:
+    try:
+        return json.loads((mirror_dir / _META_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(mirror_dir: Path, repo_url: str) -> None:
+    meta = {
+        "repo_url": normalize_repo_url(repo_url),
+        "last_used": time.time(),
+        "size_bytes": _dir_size(mirror_dir),
+    }
+    try:
+        (mirror_dir / _META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+    except OSError:
+        pass
+
+
+def _refresh_mirror(mirror_dir: Path, repo_url: str, clone_url: str) -> None:
+    """Clone a bare mirror or fetch into an existing one. Caller holds the mirror lock."""
+    if (mirror_dir / "HEAD").exists():
+        mirror = Repo(mirror_dir)
+        # Fetch by explicit URL so tokens are never persisted in the mirror config
+        mirror.git.fetch(
+            clone_url,
+            "+refs/heads/*:refs/heads/*",
+            "+refs/tags/*:refs/tags/*",
+            "--prune",
+            "--force",
+        )
+        return
+    if mirror_dir.exists():
+        shutil.rmtree(mirror_dir, ignore_errors=True)
+    mirror = Repo.clone_from(clone_url, mirror_dir, mirror=True)
+    mirror.git.remote("set-url", "origin", normalize_repo_url(repo_url))
+    # Workspaces borrow objects from the mirror; never let auto-gc prune them
+    with mirror.config_writer() as cw:
+        cw.set_value("gc", "auto", "0")
+
+
+def checkout_workspace(repo_url: str, clone_url: str, sparse: bool = False) -> Path:
+    """
+    Refresh the cached mirror for repo_url and create a workspace from it.
+    The workspace is a --shared clone (objects borrowed from the mirror) whose
+    origin points at clone_url, so pushes go straight to the real remote.
+    sparse leaves the work tree empty (--no-checkout) for the caller's sparse checkout.
+    A mirror that fails to refresh is rebuilt, unless live workspaces still borrow from it:
+    then the workspace is a plain clone of clone_url.
+    """
+    key = mirror_key(repo_url)
+    mirror_dir = MIRROR_CACHE_DIR / f"{key}.git"
+    workspace = Path(tempfile.gettempdir()) / f"repo_{uuid.uuid4().hex[:8]}"
+    MIRROR_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    with _mirror_lock(key):
+        try:
+            _refresh_mirror(mirror_dir, repo_url, clone_url)
+            usable = True
+        except Exception:
+            with _guard:
+                in_use = _active.get(key, 0) > 0
+            usable = not in_use
+            if usable:
+                # Corrupt or diverged mirror: rebuild once from scratch
+                shutil.rmtree(mirror_dir, ignore_errors=True)
+                _refresh_mirror(mirror_dir, repo_url, clone_url)
+        if usable:
+            repo = Repo.clone_from(str(mirror_dir), workspace, shared=True, no_checkout=sparse)
+            repo.git.remote("set-url", "origin", clone_url)
+            _write_meta(mirror_dir, repo_url)
+            with _guard:
+                _active[key] = _active.get(key, 0) + 1
+                _workspaces[str(workspace)] = key
+
+    if not usable:
+        # Live --shared workspaces borrow this mirror's objects, so it is never deleted under them:
+        # this run clones straight from the remote instead
+        Repo.clone_from(clone_url, workspace, no_checkout=sparse)
+        return workspace
+    evict()
+    return workspace
+
+
+def _release(workspace: Path) -> None:
+    shutil.rmtree(workspace, ignore_errors=True)
+    with _guard:
+        key = _workspaces.pop(str(workspace), None)
+        if key is not None:
+            _active[key] = max(0, _active.get(key, 1) - 1)
+
+
+def schedule_cleanup(workspace: Path) -> None:
+    """Remove a workspace in the background so rmtree is off the request path."""
+    _cleanup_pool.submit(_release, Path(workspace))
+
+
+def evict() -> list[str]:
+    """
+    Drop least-recently-used mirrors until both the entry and byte limits hold.
+    Mirrors with live workspaces or a held lock are skipped. Returns evicted keys.
+    """
+    if not MIRROR_CACHE_DIR.exists():
+        return []
+    entries = []
+    for mirror_dir in MIRROR_CACHE_DIR.glob("*.git"):
+        meta = _read_meta(mirror_dir)
+        entries.append((meta.get("last_used", 0.0), meta.get("size_bytes", 0), mirror_dir))
+    entries.sort(key=lambda e: e[0])
+
+    count = len(entries)
+    total_bytes = sum(e[1] for e in entries)
+    evicted: list[str] = []
+    for _last_used, size, mirror_dir in entries:
+        if count <= MIRROR_CACHE_MAX_ENTRIES and total_bytes <= MIRROR_CACHE_MAX_BYTES:
+            break
+        key = mirror_dir.name[: -len(".git")]
+        with _guard:
+            if _active.get(key, 0) > 0:
+                continue
+        lock = _mirror_lock(key)
+        if not lock.acquire(blocking=False):
+            continue
+        try:
+            # A checkout may have registered a workspace since the check above
+            with _guard:
+                if _active.get(key, 0) > 0:
+                    continue
+            shutil.rmtree(mirror_dir, ignore_errors=True)
+        finally:
+            lock.release()
+        count -= 1
+        total_bytes -= size
+        evicted.append(key)
+    return evicted
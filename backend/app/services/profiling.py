@@ -0,0 +1,166 @@
+"""
+Opt-in per-run CPU profiling of the backend itself (not the repo's tests).
+deterministic: cProfile on the run's thread. sampling: a background thread snapshots the
+run thread's stack every RUN_PROFILE_INTERVAL seconds (cheap enough to leave on for a
+fraction of traffic). Both produce a pstats file and collapsed stacks for flamegraph tools.
+"""
+
+import cProfile
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+PROFILE_MODES = ("sampling", "deterministic")
+RUN_PROFILE_MODE = os.environ.get("RUN_PROFILE_MODE", "sampling").strip().lower()
+# Fraction of runs profiled when the request does not say (0 = only on request, 1 = every run)
+RUN_PROFILE_SAMPLE_RATE = float(os.environ.get("RUN_PROFILE_SAMPLE_RATE", "0"))
+RUN_PROFILE_INTERVAL = float(os.environ.get("RUN_PROFILE_INTERVAL", "0.005"))
+# Deepest stack kept per sample (outermost frames are dropped)
+RUN_PROFILE_MAX_DEPTH = int(os.environ.get("RUN_PROFILE_MAX_DEPTH", "200"))
+
+
+def should_profile(requested: bool | None) -> bool:
+    """Explicit request flag wins; otherwise profile a RUN_PROFILE_SAMPLE_RATE fraction of runs."""
+    if requested is not None:
+        return requested
+    return RUN_PROFILE_SAMPLE_RATE > 0 and random.random() < RUN_PROFILE_SAMPLE_RATE
+
+
+def _code_key(code) -> tuple[str, int, str]:
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def _label(key: tuple[str, int, str]) -> str:
+    filename, line, name = key
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ":")
+
+
+class _Sampler:
+    """Collects stack samples of one thread: {(outermost..innermost code keys): count}."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="run-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < RUN_PROFILE_MAX_DEPTH:
+                stack.append(_code_key(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def collapsed_from_samples(stacks: Counter) -> str:
+    """Brendan Gregg collapsed format: "outer;...;inner count" per line."""
+    return "".join(f"{';'.join(_label(k) for k in stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+def pstats_from_samples(stacks: Counter, interval: float) -> bytes:
+    """
+    Marshalled pstats dict built from samples, loadable with pstats.Stats(path).
+    Sample counts stand in for call counts; times are samples * interval.
+    """
+    stats: dict = {}
+    for stack, count in stacks.items():
+        seconds = count * interval
+        seen: set = set()
+        for depth, key in enumerate(stack):
+            cc, nc, tt, ct, callers = stats.get(key, (0, 0, 0.0, 0.0, {}))
+            if key not in seen:  # recursion: inclusive time once per sample
+                ct += seconds
+                seen.add(key)
+            if depth == len(stack) - 1:
+                tt += seconds
+            nc += count
+            cc += count
+            if depth > 0:
+                caller = stack[depth - 1]
+                pc, pn, ptt, pct = callers.get(caller, (0, 0, 0.0, 0.0))
+                callers[caller] = (pc + count, pn + count, ptt + (seconds if depth == len(stack) - 1 else 0.0), pct + seconds)
+            stats[key] = (cc, nc, tt, ct, callers)
+    return marshal.dumps(stats)
+
+
+def collapsed_from_profile(profile: cProfile.Profile) -> str:
+    """
+    Collapsed stacks reconstructed from cProfile's caller graph: each function's self time is
+    attributed along its heaviest caller chain (cProfile records edges, not full stacks).
+    """
+    profile.create_stats()
+    stats = profile.stats
+    lines: list[str] = []
+    for key, (_cc, _nc, tt, _ct, callers) in stats.items():
+        micros = int(tt * 1_000_000)
+        if micros <= 0:
+            continue
+        chain = [key]
+        current = key
+        while len(chain) < RUN_PROFILE_MAX_DEPTH:
+            parents = stats.get(current, (0, 0, 0.0, 0.0, {}))[4]
+            candidates = [(v[3], c) for c, v in parents.items() if c not in chain]
+            if not candidates:
+                break
+            current = max(candidates)[1]
+            chain.append(current)
+        lines.append(f"{';'.join(_label(k) for k in reversed(chain))} {micros}\n")
+    return "".join(sorted(lines))
+
+
+class RunProfile:
+    """Result of profile_run(): filled in when the with-block exits."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.pstats: bytes = b""
+        self.collapsed: str = ""
+        self.seconds = 0.0
+
+
+@contextmanager
+def profile_run(mode: str | None = None) -> Iterator[RunProfile]:
+    """Profile the calling thread for the duration of the block."""
+    mode = mode or RUN_PROFILE_MODE
+    if mode not in PROFILE_MODES:
+        mode = "sampling"
+    result = RunProfile(mode)
+    start = time.perf_counter()
+    if mode == "deterministic":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            result.collapsed = collapsed_from_profile(profiler)  # also fills profiler.stats
+            result.pstats = marshal.dumps(profiler.stats)
+            result.seconds = time.perf_counter() - start
+        return
+
+    sampler = _Sampler(threading.get_ident(), RUN_PROFILE_INTERVAL)
+    sampler.start()
+    try:
+        yield result
+    finally:
+        sampler.stop()
+        result.collapsed = collapsed_from_samples(sampler.stacks)
+        result.pstats = pstats_from_samples(sampler.stacks, RUN_PROFILE_INTERVAL)
+        result.seconds = time.perf_counter() - start
@@ -0,0 +1,252 @@
+"""
+Warm pytest fork server started by pytest_server (python -m agent_fork_server SOCKET REPO).
+Imports pytest, its plugins and the repo's third-party imports once, then forks one child
+per request; the child runs pytest.main with the client's stdout/stderr pipes (passed over
+the Unix socket), cwd and environment. Project modules are never imported here, so every
+child imports them fresh from disk.
+Standalone on purpose: it runs inside the target repo's interpreter, not the backend.
+
+Protocol per connection: client sends b"<payload length>\\n" with its stdout/stderr fds
+attached, then the JSON payload {args, cwd, env}; the server answers {"pid": n} once the
+child is forked and {"exit": code} when it finishes.
+"""
+
+from __future__ import annotations
+
+import ast
+import importlib
+import importlib.util
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+IDLE_SECONDS = float(os.environ.get("PYTEST_FORK_SERVER_IDLE", "900"))
+# Never pre-import these: side effects on import, or GUI toolkits
+_SKIP = {"__future__", "__main__", "antigravity", "this", "tkinter", "turtle", "idlelib", "conftest"}
+_SKIP_DIRS = {".git", ".hg", ".tox", ".nox", ".venv", "venv", "env", "node_modules", "__pycache__", "site-packages", "build", "dist"}
+
+
+def _under(path: str | None, root: str) -> bool:
+    return bool(path) and os.path.abspath(path).startswith(root + os.sep)
+
+
+def _imported_names(root: str) -> set[str]:
+    """Top-level names of every absolute import in the repo's .py files."""
+    names: set[str] = set()
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in _SKIP_DIRS and not d.startswith(".")]
+        for name in files:
+            if not name.endswith(".py"):
+                continue
+            try:
+                with open(os.path.join(dirpath, name), "rb") as fh:
+                    tree = ast.parse(fh.read())
+            except (OSError, SyntaxError, ValueError):
+                continue
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    names.update(alias.name.split(".")[0] for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                    names.add(node.module.split(".")[0])
+    return names
+
+
+def _third_party(name: str, root: str) -> bool:
+    """Importable and not part of the project (those must stay fresh in every child)."""
+    if name in _SKIP or name in sys.modules:
+        return False
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return False
+    if spec is None:
+        return False
+    locations = list(spec.submodule_search_locations or [])
+    return not any(_under(p, root) for p in [spec.origin, *locations])
+
+
+def _plugin_modules() -> set[str]:
+    """Top-level modules of distributions that register pytest plugins (pytest marks these for rewriting)."""
+    from importlib import metadata
+
+    names: set[str] = set()
+    for ep in metadata.entry_points(group="pytest11"):
+        names.add(ep.value.split(".")[0].split(":")[0])
+        for path in (ep.dist.files or []) if ep.dist is not None else []:
+            parts = path.parts
+            if len(parts) > 1 and parts[0].isidentifier():
+                names.add(parts[0])
+            elif len(parts) == 1 and path.suffix == ".py":
+                names.add(path.stem)
+    return names
+
+
+def warm_up(root: str) -> list[str]:
+    """Import pytest, its entry-point plugins and the repo's third-party imports. Returns what was imported."""
+    import pytest  # noqa: F401
+    from importlib import metadata
+
+    loaded = ["pytest"]
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    saved = os.dup(1), os.dup(2)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    try:
+        for ep in metadata.entry_points(group="pytest11"):
+            try:
+                ep.load()
+                loaded.append(ep.value)
+            except BaseException:
+                continue
+        for name in sorted(_imported_names(root)):
+            if _third_party(name, root):
+                try:
+                    importlib.import_module(name)
+                    loaded.append(name)
+                except BaseException:
+                    continue
+    finally:
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in (devnull, *saved):
+            os.close(fd)
+    return loaded
+
+
+def rewrite_warning_filters() -> list[str]:
+    """
+    -W options silencing pytest's "already imported so cannot be rewritten" warning for the
+    plugin packages warm_up imported: only their own asserts lose rewriting, never the repo's.
+    """
+    args = []
+    for name in sorted(_plugin_modules()):
+        if name in sys.modules:
+            args += ["-W", f"ignore:Module already imported so cannot be rewritten; {name}:pytest.PytestAssertRewriteWarning"]
+    return args
+
+
+def _child(
+    conn: socket.socket, listener: socket.socket, fds: list[int], request: dict, root: str, extra_args: list[str]
+) -> None:
+    """Runs in the forked child: never returns."""
+    code = 3
+    try:
+        listener.close()
+        conn.close()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        os.dup2(fds[0], 1)
+        os.dup2(fds[1], 2)
+        for fd in fds:
+            os.close(fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        importlib.invalidate_caches()
+        # Defensive: anything from the workspace must be re-imported from the current files
+        for name, module in list(sys.modules.items()):
+            if _under(getattr(module, "__file__", None), root):
+                del sys.modules[name]
+        args = [*extra_args, *request["args"]]
+        sys.argv = ["pytest", *args]
+        import pytest
+
+        code = int(pytest.main(args))
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _recv_request(conn: socket.socket) -> tuple[dict, list[int]]:
+    header, fds, _flags, _addr = socket.recv_fds(conn, 64, 2)
+    size, _, rest = header.partition(b"\n")
+    data = bytearray(rest)
+    while len(data) < int(size):
+        chunk = conn.recv(int(size) - len(data))
+        if not chunk:
+            raise ConnectionError("client went away")
+        data.extend(chunk)
+    return json.loads(data), list(fds)
+
+
+def serve(socket_path: str, root: str) -> None:
+    root = os.path.abspath(root)
+    parent = os.getppid()
+    warm_up(root)
+    extra_args = rewrite_warning_filters()
+    if threading.active_count() > 1:
+        # A library started threads on import: forking now could deadlock the children
+        print("unsafe: threads started during warm-up", flush=True)
+        return
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(16)
+    print("ready", flush=True)
+
+    children: dict[int, socket.socket] = {}
+    last_active = time.monotonic()
+    while True:
+        readable, _, _ = select.select([listener], [], [], 0.02 if children else 1.0)
+        if readable:
+            last_active = time.monotonic()
+            conn, _addr = listener.accept()
+            fds: list[int] = []
+            try:
+                request, fds = _recv_request(conn)
+                if len(fds) != 2:
+                    raise ValueError("expected stdout and stderr fds")
+                sys.stdout.flush()
+                pid = os.fork()
+                if pid == 0:
+                    _child(conn, listener, fds, request, root, extra_args)
+                children[pid] = conn
+                conn.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+            except Exception:
+                conn.close()
+            finally:
+                for fd in fds:
+                    os.close(fd)
+        while children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            conn = children.pop(pid, None)
+            if conn is not None:
+                try:
+                    conn.sendall(json.dumps({"exit": os.waitstatus_to_exitcode(status)}).encode() + b"\n")
+                except OSError:
+                    pass
+                conn.close()
+        if children:
+            last_active = time.monotonic()
+        elif os.getppid() != parent or time.monotonic() - last_active > IDLE_SECONDS:
+            return
+
+
+def main() -> None:
+    socket_path, root = sys.argv[1], sys.argv[2]
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        serve(socket_path, root)
+    finally:
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
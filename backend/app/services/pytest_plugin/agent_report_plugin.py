@@ -0,0 +1,109 @@
+"""
+pytest plugin injected by test_runner.run_pytest (-p agent_report_plugin).
+Appends one JSON record per test / collection error to $AGENT_REPORT_PATH:
+{nodeid, outcome, exc_type, message, file, line, duration}.
+Standalone on purpose: it runs inside the target repo's interpreter, not the backend.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import traceback
+
+_REPORT_PATH = os.environ.get("AGENT_REPORT_PATH", "")
+
+_results: dict[str, dict] = {}
+_rootdir = ""
+
+
+def _root_cause(value: BaseException) -> BaseException:
+    """pytest wraps import/syntax errors at collection in CollectError(...) from <original>."""
+    while type(value).__name__ == "CollectError" and value.__cause__ is not None:
+        value = value.__cause__
+    return value
+
+
+def _crash_site(value: BaseException) -> tuple[str | None, int | None]:
+    """Deepest frame inside the repo (skipping site-packages); SyntaxErrors point at the broken file."""
+    if isinstance(value, SyntaxError) and value.filename:
+        return value.filename, value.lineno
+    frames = traceback.extract_tb(value.__traceback__)
+    for frame in reversed(frames):
+        fname = os.path.abspath(frame.filename)
+        if fname.startswith(_rootdir) and "site-packages" not in fname:
+            return fname, frame.lineno
+    if frames:
+        return frames[-1].filename, frames[-1].lineno
+    return None, None
+
+
+def _write(record: dict) -> None:
+    if not _REPORT_PATH:
+        return
+    with open(_REPORT_PATH, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(record) + "\n")
+        fh.flush()
+
+
+def _record(nodeid: str) -> dict:
+    rec = _results.get(nodeid)
+    if rec is None:
+        rec = _results[nodeid] = {
+            "nodeid": nodeid,
+            "outcome": "passed",
+            "exc_type": None,
+            "message": None,
+            "file": None,
+            "line": None,
+            "duration": 0.0,
+        }
+    return rec
+
+
+def pytest_configure(config):
+    global _rootdir
+    root = getattr(config, "rootpath", None) or config.rootdir
+    _rootdir = os.path.abspath(str(root))
+
+
+def pytest_exception_interact(node, call, report):
+    excinfo = call.excinfo
+    if excinfo is None:
+        return
+    rec = _record(node.nodeid or str(getattr(node, "path", "")))
+    if rec["exc_type"] is None:
+        value = _root_cause(excinfo.value)
+        rec["exc_type"] = type(value).__name__
+        rec["message"] = str(value).strip().split("\n")[0][:500]
+        rec["file"], rec["line"] = _crash_site(value)
+
+
+def pytest_runtest_logreport(report):
+    rec = _record(report.nodeid)
+    rec["duration"] = round(rec["duration"] + (report.duration or 0.0), 6)
+    if report.when == "call":
+        if hasattr(report, "wasxfail"):
+            rec["outcome"] = "xfailed" if report.skipped else "xpassed"
+        elif report.outcome != "passed" or rec["outcome"] == "passed":
+            rec["outcome"] = report.outcome
+    elif report.failed:
+        rec["outcome"] = "error"
+    elif report.skipped and rec["outcome"] == "passed":
+        rec["outcome"] = "skipped"
+
+
+def pytest_runtest_logfinish(nodeid, location):
+    rec = _results.pop(nodeid, None)
+    if rec is not None:
+        _write(rec)
+
+
+def pytest_collectreport(report):
+    if report.failed:
+        rec = _record(report.nodeid)
+        del _results[report.nodeid]
+        rec["outcome"] = "error"
+        if rec["exc_type"] is None:
+            rec["message"] = str(report.longrepr).strip().split("\n")[-1][:500]
+        _write(rec)
@@ -0,0 +1,261 @@
+"""
+Warm pytest fork servers, one per (workspace, interpreter).
+The first pytest call for a workspace starts agent_fork_server in the background and runs
+cold; later calls are forked from the warm server, skipping interpreter start-up, pytest and
+plugin loading and third-party imports. Project modules are imported fresh in every child.
+spawn() returns None whenever no ready server exists, and ForkServerError is raised if one
+breaks mid-run: callers then use the plain subprocess path.
+"""
+
+import atexit
+import json
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.services.metrics import register_gauge
+
+PYTEST_FORK_SERVER = (
+    os.environ.get("PYTEST_FORK_SERVER", "1").strip() not in ("0", "false", "no")
+    and hasattr(os, "fork")
+    and hasattr(socket, "send_fds")
+)
+# Warm servers kept at once (least recently used idle ones are stopped first)
+PYTEST_FORK_SERVER_MAX = int(os.environ.get("PYTEST_FORK_SERVER_MAX", "4"))
+PYTEST_FORK_SERVER_START_TIMEOUT = float(os.environ.get("PYTEST_FORK_SERVER_START_TIMEOUT", "60"))
+
+
+class ForkServerError(RuntimeError):
+    """The fork server failed before the child's exit status was known."""
+
+
+class ForkedProcess:
+    """Popen-like handle on a pytest child forked by a server: stdout, stderr, poll, wait, kill."""
+
+    def __init__(self, conn: socket.socket, pid: int, stdout_fd: int, stderr_fd: int, on_done=None) -> None:
+        self.pid = pid
+        self.returncode: int | None = None
+        self.stdout = open(stdout_fd, encoding="utf-8", errors="replace", buffering=1)
+        self.stderr = open(stderr_fd, encoding="utf-8", errors="replace")
+        self._conn = conn
+        self._buffer = b""
+        self._on_done = on_done
+        self._error: str | None = None
+
+    def _finish(self) -> None:
+        self._conn.close()
+        if self._on_done is not None:
+            self._on_done()
+            self._on_done = None
+
+    def _read_status(self, timeout: float | None) -> None:
+        if self._error is not None:
+            raise ForkServerError(self._error)
+        while b"\n" not in self._buffer:
+            if timeout is not None and not select.select([self._conn], [], [], timeout)[0]:
+                return
+            chunk = self._conn.recv(4096)
+            if not chunk:
+                # Server died: its child would otherwise keep the output pipes open
+                self.kill()
+                self._error = "fork server closed the connection"
+                self._finish()
+                raise ForkServerError(self._error)
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        self.returncode = int(json.loads(line)["exit"])
+        self._finish()
+
+    def poll(self) -> int | None:
+        if self.returncode is None:
+            self._read_status(timeout=0)
+        return self.returncode
+
+    def wait(self) -> int:
+        if self.returncode is None:
+            self._read_status(timeout=None)
+        return self.returncode
+
+    def kill(self) -> None:
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+class _Server:
+    def __init__(self, python: str, repo_path: Path, env: dict[str, str]) -> None:
+        self.python = python
+        self.repo_path = repo_path
+        self.dir = Path(tempfile.mkdtemp(prefix="agent_fs_"))
+        self.socket_path = str(self.dir / "s")
+        self.ready = threading.Event()
+        self.failed = False
+        self.active = 0  # Children forked and not yet reaped
+        self.last_used = time.monotonic()
+        self.proc = subprocess.Popen(
+            [python, "-m", "agent_fork_server", self.socket_path, str(repo_path)],
+            cwd=repo_path,
+            env={**env, "PYTHONUNBUFFERED": "1"},
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        threading.Thread(target=self._wait_ready, name="fork-server-start", daemon=True).start()
+
+    def _wait_ready(self) -> None:
+        timer = threading.Timer(PYTEST_FORK_SERVER_START_TIMEOUT, self.stop)
+        timer.start()
+        try:
+            line = self.proc.stdout.readline()
+        except (OSError, ValueError):
+            line = b""
+        finally:
+            timer.cancel()
+        if line.strip() == b"ready":
+            self.ready.set()
+        else:
+            self.failed = True
+            self.stop()
+
+    def usable(self) -> bool:
+        return self.ready.is_set() and not self.failed and self.proc.poll() is None
+
+    def spawn(self, args: list[str], cwd: Path, env: dict[str, str]) -> ForkedProcess:
+        payload = json.dumps({"args": args, "cwd": str(cwd), "env": env}).encode("utf-8")
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(self.socket_path)
+            socket.send_fds(conn, [f"{len(payload)}\n".encode()], [out_w, err_w])
+            conn.sendall(payload)
+            reply = b""
+            while b"\n" not in reply:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    raise ForkServerError("fork server refused the request")
+                reply += chunk
+        except (OSError, ForkServerError) as e:
+            conn.close()
+            for fd in (out_r, err_r):
+                os.close(fd)
+            self.failed = True
+            raise ForkServerError(str(e)) from e
+        finally:
+            # The server and the child hold their own copies; ours must close for EOF
+            os.close(out_w)
+            os.close(err_w)
+        line, _, rest = reply.partition(b"\n")
+        with _lock:
+            self.active += 1
+            self.last_used = time.monotonic()
+        proc = ForkedProcess(conn, int(json.loads(line)["pid"]), out_r, err_r, on_done=self._release)
+        proc._buffer = rest
+        return proc
+
+    def _release(self) -> None:
+        with _lock:
+            self.active -= 1
+
+    def stop(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        if self.proc.stdout is not None:
+            self.proc.stdout.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+_servers: dict[tuple[str, str], _Server] = {}
+# Workspaces whose server could not start or broke: they stay on the subprocess path
+_failed: set[tuple[str, str]] = set()
+_lock = threading.Lock()
+
+
+def _key(python: str, repo_path: Path) -> tuple[str, str]:
+    return python, str(Path(repo_path).resolve())
+
+
+def _make_room() -> list[_Server]:
+    """
+    Pick the servers to stop so one more fits: failed ones, then the least recently used idle one.
+    Returns them (stop them outside the lock); empty with no free slot means no room. Call with _lock held.
+    """
+    evicted = []
+    for key, server in list(_servers.items()):
+        if server.failed or server.proc.poll() is not None:
+            evicted.append(_servers.pop(key))
+            if server.failed:
+                _failed.add(key)
+    if len(_servers) >= PYTEST_FORK_SERVER_MAX:
+        idle = [(s.last_used, k) for k, s in _servers.items() if s.active == 0 and s.ready.is_set()]
+        if idle:
+            evicted.append(_servers.pop(min(idle)[1]))
+    return evicted
+
+
+def spawn(python: str, repo_path: Path, args: list[str], env: dict[str, str]) -> ForkedProcess | None:
+    """
+    Fork `pytest <args>` from the warm server for (repo_path, python), or return None if there is
+    none ready yet (one is started in the background on first use). env must be the child's full
+    environment. Raises ForkServerError if the server fails while handing over the run.
+    """
+    if not PYTEST_FORK_SERVER:
+        return None
+    key = _key(python, repo_path)
+    evicted: list[_Server] = []
+    with _lock:
+        server = _servers.get(key)
+        if server is not None and (server.failed or server.proc.poll() is not None):
+            # Broken servers are not retried for this workspace; idle-expired ones are restarted
+            if server.failed:
+                _failed.add(key)
+            evicted.append(_servers.pop(key))
+            server = None
+        if server is None and key not in _failed:
+            evicted.extend(_make_room())
+            if len(_servers) < PYTEST_FORK_SERVER_MAX:
+                base_env = {k: v for k, v in env.items() if k != "AGENT_REPORT_PATH"}
+                try:
+                    _servers[key] = _Server(python, Path(key[1]), base_env)
+                except OSError:
+                    _failed.add(key)
+    for old in evicted:
+        old.stop()
+    if server is None or not server.usable():
+        return None
+    return server.spawn(args, repo_path, env)
+
+
+def shutdown(repo_path: Path | None = None) -> None:
+    """Stop the servers of one workspace (every interpreter), or all of them."""
+    root = str(Path(repo_path).resolve()) if repo_path is not None else None
+    with _lock:
+        keys = [k for k in _servers if root is None or k[1] == root]
+        stopping = [_servers.pop(k) for k in keys]
+        _failed.difference_update(k for k in list(_failed) if root is None or k[1] == root)
+    for server in stopping:
+        server.stop()
+
+
+def _ready_count() -> int:
+    with _lock:
+        servers = list(_servers.values())
+    return sum(1 for s in servers if s.usable())
+
+
+atexit.register(shutdown)
+register_gauge("agent_pytest_fork_servers", "Warm pytest fork servers ready to fork test runs.", _ready_count)
@@ -1,10 +1,59 @@
 import os
 import re
+import shutil
 import tempfile
 import uuid
 from pathlib import Path
 
-from git import Repo
+from git import GitCommandError, Repo
+
+from app.services import pytest_server
+from app.services.git_service import close_repo
+from app.services.metrics import timed
+from app.services.mirror_cache import MIRROR_CACHE_ENABLED, checkout_workspace, schedule_cleanup
+
+# Comma-separated: full (default) | shallow (depth 1, default branch only) |
+# blobless (filter=blob:none, blobs fetched on demand) | sparse (check out CLONE_SPARSE_PATTERNS only).
+# shallow/blobless clone straight from the remote, bypassing the mirror cache; sparse works with both.
+CLONE_STRATEGIES = ("full", "shallow", "blobless", "sparse")
+CLONE_STRATEGY = frozenset(
+    s.strip().lower() for s in os.environ.get("CLONE_STRATEGY", "full").split(",") if s.strip()
+) & frozenset(CLONE_STRATEGIES) or frozenset({"full"})
+# gitignore-style patterns kept by sparse checkout: code, tests and the files that configure them
+CLONE_SPARSE_PATTERNS = [
+    p.strip()
+    for p in os.environ.get(
+        "CLONE_SPARSE_PATTERNS",
+        "*.py,*.pyi,*.toml,*.cfg,*.ini,*.txt,*.json,*.yaml,*.yml,/tests/,/test/,/requirements/,py.typed",
+    ).split(",")
+    if p.strip()
+]
+
+
+def apply_sparse_checkout(repo: Repo, patterns: list[str] | None = None) -> None:
+    """Populate a --no-checkout clone with only the paths matching patterns (non-cone mode)."""
+    repo.git.sparse_checkout("set", "--no-cone", *(patterns or CLONE_SPARSE_PATTERNS))
+    repo.git.checkout(repo.head.reference.name)
+
+
+def clone_repo(
+    clone_url: str, dest: Path, strategy: frozenset[str] | set[str] = CLONE_STRATEGY, branch: str | None = None
+) -> Repo:
+    """
+    Clone clone_url into dest using strategy (see CLONE_STRATEGY), checking out branch (default: the remote HEAD).
+    Shallow clones stay pushable: the fix branch only adds commits on top of the fetched tip.
+    """
+    kwargs: dict = {"branch": branch} if branch else {}
+    if "shallow" in strategy:
+        kwargs.update(depth=1, single_branch=True, no_tags=True)
+    if "blobless" in strategy:
+        kwargs["filter"] = "blob:none"
+    if "sparse" in strategy:
+        kwargs["no_checkout"] = True
+    repo = Repo.clone_from(clone_url, dest, **kwargs)
+    if "sparse" in strategy:
+        apply_sparse_checkout(repo)
+    return repo
 
 
 def _inject_token(repo_url: str, token: str) -> str:
@@ -18,41 +67,85 @@ def _inject_token(repo_url: str, token: str) -> str:
     return repo_url
 
 
+def _uses_mirror() -> bool:
+    return MIRROR_CACHE_ENABLED and not ({"shallow", "blobless"} & CLONE_STRATEGY)
+
+
+FIX_BRANCH_SUFFIX = "_AI_Fix"
+
+
 def create_branch_name(team_name: str, team_leader_name: str) -> str:
     """Create branch name: TEAM_NAME_LEADER_NAME_AI_Fix (uppercase, spaces -> underscores)."""
     team = team_name.upper().replace(" ", "_")
     leader = team_leader_name.upper().replace(" ", "_")
-    return f"{team}_{leader}_AI_Fix"
+    return f"{team}_{leader}{FIX_BRANCH_SUFFIX}"
 
 
+@timed("clone")
 def clone_and_create_branch(
     repo_url: str,
     team_name: str,
     team_leader_name: str,
     token_override: str | None = None,
+    ref: str | None = None,
+    sha: str | None = None,
 ) -> tuple[Path, str]:
     """
-    Clone repo to temp dir, create fix branch from main/master.
+    Clone repo to temp dir, create fix branch from main/master, or from ref (at sha if given).
     Returns (repo_path, branch_name).
     Never modifies main.
     Uses token_override if provided, else GITHUB_TOKEN from env.
+    With MIRROR_CACHE_ENABLED the checkout comes from the local mirror cache, unless
+    CLONE_STRATEGY asks for a shallow or blobless clone from the remote.
     """
-    temp_dir = Path(tempfile.gettempdir()) / f"repo_{uuid.uuid4().hex[:8]}"
-    temp_dir.mkdir(parents=True, exist_ok=True)
-
     token = (token_override or os.environ.get("GITHUB_TOKEN", "")).strip()
     clone_url = _inject_token(repo_url, token) if token else repo_url
 
-    repo = Repo.clone_from(clone_url, temp_dir)
+    if _uses_mirror():
+        temp_dir = checkout_workspace(repo_url, clone_url, sparse="sparse" in CLONE_STRATEGY)
+    else:
+        temp_dir = Path(tempfile.gettempdir()) / f"repo_{uuid.uuid4().hex[:8]}"
+        temp_dir.mkdir(parents=True, exist_ok=True)
 
-    # Determine default branch (main or master)
+    # The caller only learns temp_dir on success: on any failure release it here, or the
+    # checkout leaks on disk and keeps its mirror marked in use
     try:
-        default_branch = repo.active_branch.name
-    except TypeError:
-        default_branch = "main" if "main" in [h.name for h in repo.heads] else "master"
+        if _uses_mirror():
+            repo = Repo(temp_dir)
+            if "sparse" in CLONE_STRATEGY:
+                apply_sparse_checkout(repo)
+        else:
+            repo = clone_repo(clone_url, temp_dir, branch=ref)
 
-    # Create fix branch from default
-    branch_name = create_branch_name(team_name, team_leader_name)
-    repo.git.checkout("-b", branch_name)
+        # Determine default branch (main or master)
+        try:
+            default_branch = repo.active_branch.name
+        except TypeError:
+            default_branch = "main" if "main" in [h.name for h in repo.heads] else "master"
+
+        if ref and (repo.head.is_detached or repo.active_branch.name != ref):
+            repo.git.checkout(ref)
+        if sha:
+            try:
+                repo.git.checkout(sha)
+            except GitCommandError:
+                pass  # Not fetched (e.g. outside a shallow clone): heal the ref's tip instead
+
+        # Create fix branch from default (or ref)
+        branch_name = create_branch_name(team_name, team_leader_name)
+        repo.git.checkout("-b", branch_name)
+    except BaseException:
+        release_workspace(temp_dir)
+        raise
 
     return temp_dir, branch_name
+
+
+def release_workspace(repo_path: Path) -> None:
+    """Dispose of a checkout. Mirror-backed workspaces are removed in the background."""
+    close_repo(repo_path)
+    pytest_server.shutdown(repo_path)
+    if _uses_mirror():
+        schedule_cleanup(repo_path)
+    elif Path(repo_path).exists():
+        shutil.rmtree(repo_path, ignore_errors=True)
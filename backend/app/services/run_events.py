@@ -0,0 +1,130 @@
+"""
+Per-run progress events for GET /api/runs/{id}/events (Server-Sent Events).
+Producers (job worker, agent nodes, pytest output readers) publish into a bounded
+in-memory channel per run; SSE readers poll it by event id, so a reconnecting
+client resumes from Last-Event-ID.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Mapping
+
+# Events kept per run; older ones are dropped (readers that fall behind see a gap, not unbounded memory)
+RUN_EVENTS_HISTORY = int(os.environ.get("RUN_EVENTS_HISTORY", "5000"))
+# Closed runs' events stay readable this long
+RUN_EVENTS_RETENTION_SECONDS = int(os.environ.get("RUN_EVENTS_RETENTION_SECONDS", "3600"))
+# How often an SSE reader checks for new events, and sends a keep-alive comment when idle
+RUN_EVENTS_POLL_SECONDS = float(os.environ.get("RUN_EVENTS_POLL_SECONDS", "0.2"))
+RUN_EVENTS_KEEPALIVE_SECONDS = float(os.environ.get("RUN_EVENTS_KEEPALIVE_SECONDS", "15"))
+
+# Event kinds: stage {stage, status, ...}, test {nodeid, outcome, duration, ...},
+# output {line}, iteration {iteration, status}, done {status}
+STAGES = ("clone", "syntax_check", "syntax_fix", "lint", "pytest", "fix", "review", "commit", "push")
+
+
+class _Channel:
+    def __init__(self) -> None:
+        self.events: deque[dict] = deque(maxlen=RUN_EVENTS_HISTORY)
+        self.next_id = 1
+        self.closed_at: float | None = None
+        # Stage timings are kept outside the ring so output floods cannot evict them
+        self.iteration = 0
+        self.open_stages: dict[str, float] = {}
+        self.stages: list[dict] = []
+
+    def track(self, event: str, data: dict) -> None:
+        if event == "iteration" and data.get("status") == "started":
+            self.iteration = data.get("iteration", self.iteration)
+        elif event == "stage":
+            stage, status = data.get("stage", ""), data.get("status")
+            if status == "started":
+                self.open_stages[stage] = time.time()
+            elif stage in self.open_stages:
+                started = self.open_stages.pop(stage)
+                self.stages.append({
+                    "stage": stage,
+                    "iteration": self.iteration,
+                    "status": status,
+                    "started_at": started,
+                    "seconds": round(time.time() - started, 4),
+                })
+
+
+_channels: dict[str, _Channel] = {}
+_lock = threading.Lock()
+
+
+def _prune() -> None:
+    """Drop channels closed longer than the retention. Caller holds _lock."""
+    cutoff = time.monotonic() - RUN_EVENTS_RETENTION_SECONDS
+    for run_id in [r for r, c in _channels.items() if c.closed_at and c.closed_at < cutoff]:
+        del _channels[run_id]
+
+
+def open_run(run_id: str) -> None:
+    """Create the channel before the run starts so early readers do not get 404."""
+    with _lock:
+        _prune()
+        _channels.setdefault(run_id, _Channel())
+
+
+def publish(run_id: str | None, event: str, **data: Any) -> None:
+    """Append an event to run_id's channel. No-op without a run id or for unknown/closed runs."""
+    if not run_id:
+        return
+    with _lock:
+        channel = _channels.get(run_id)
+        if channel is None or channel.closed_at is not None:
+            return
+        channel.events.append({"id": channel.next_id, "event": event, "data": data})
+        channel.next_id += 1
+        channel.track(event, data)
+
+
+def emit(state: Mapping[str, Any], event: str, **data: Any) -> None:
+    """publish() for agent nodes: the run id travels in AgentState["run_id"]."""
+    publish(state.get("run_id"), event, **data)
+
+
+def close_run(run_id: str, status: str) -> None:
+    """Publish the final done event; readers stop after it."""
+    publish(run_id, "done", status=status)
+    with _lock:
+        channel = _channels.get(run_id)
+        if channel is not None:
+            channel.closed_at = time.monotonic()
+
+
+def discard(run_id: str) -> None:
+    """Forget a run that was never started (e.g. rejected by a full queue)."""
+    with _lock:
+        _channels.pop(run_id, None)
+
+
+def stage_timings(run_id: str) -> list[dict]:
+    """[{stage, iteration, status, started_at (epoch), seconds}] of every finished stage, in order."""
+    with _lock:
+        channel = _channels.get(run_id)
+        return list(channel.stages) if channel is not None else []
+
+
+def exists(run_id: str) -> bool:
+    with _lock:
+        return run_id in _channels
+
+
+def events_since(run_id: str, after: int = 0) -> tuple[list[dict], bool]:
+    """Events with id > after, and whether the run is closed. Unknown runs read as closed."""
+    with _lock:
+        channel = _channels.get(run_id)
+        if channel is None:
+            return [], True
+        return [e for e in channel.events if e["id"] > after], channel.closed_at is not None
+
+
+def format_sse(event: dict) -> str:
+    """One SSE frame: id, event name and a single-line JSON data field."""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -0,0 +1,349 @@
+"""
+Persistent run history in SQLite (WAL mode).
+Writes go through one background writer thread so the request path never waits on disk;
+reads use per-thread connections and see committed rows concurrently with the writer.
+results.json is re-exported from the latest row after every write.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.models import RunResponse
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+RUN_STORE_PATH = Path(os.environ.get("RUN_STORE_PATH", "") or _BACKEND_DIR / "runs.db")
+# Export of the latest stored run (judge requirement); empty disables it
+RESULTS_EXPORT_PATH = os.environ.get("RESULTS_EXPORT_PATH", str(_BACKEND_DIR / "results.json"))
+# Retention: runs older than this many days, or beyond the newest N, are deleted (0 = keep)
+RUN_STORE_RETENTION_DAYS = float(os.environ.get("RUN_STORE_RETENTION_DAYS", "30"))
+RUN_STORE_MAX_RUNS = int(os.environ.get("RUN_STORE_MAX_RUNS", "10000"))
+# Apply retention and reclaim free pages every N writes
+RUN_STORE_COMPACT_EVERY = int(os.environ.get("RUN_STORE_COMPACT_EVERY", "100"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    repo_url TEXT NOT NULL,
+    branch_name TEXT NOT NULL,
+    team_name TEXT NOT NULL,
+    team_leader_name TEXT NOT NULL,
+    ci_status TEXT NOT NULL,
+    total_failures INTEGER NOT NULL,
+    total_fixes_applied INTEGER NOT NULL,
+    total_time_seconds REAL NOT NULL,
+    score_total INTEGER NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    response_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_repo_time ON runs (repo_url, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_branch_time ON runs (branch_name, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_time ON runs (created_at DESC);
+
+CREATE TABLE IF NOT EXISTS run_timeline (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    iteration INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_timeline_run ON run_timeline (run_id);
+
+CREATE TABLE IF NOT EXISTS run_fixes (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    file TEXT NOT NULL,
+    bug_type TEXT NOT NULL,
+    line_number INTEGER,
+    status TEXT NOT NULL,
+    commit_message TEXT NOT NULL,
+    commit_sha TEXT,
+    pushed_sha TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_fixes_run ON run_fixes (run_id);
+
+CREATE TABLE IF NOT EXISTS run_stages (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    iteration INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stages_run ON run_stages (run_id);
+
+CREATE TABLE IF NOT EXISTS run_spans (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    parent TEXT,
+    start_offset REAL NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_spans_run ON run_spans (run_id);
+
+CREATE TABLE IF NOT EXISTS run_profiles (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (run_id, kind)
+);
+"""
+
+_SUMMARY_COLUMNS = (
+    "run_id, repo_url, branch_name, team_name, team_leader_name, ci_status, total_failures, "
+    "total_fixes_applied, total_time_seconds, score_total, error, created_at"
+)
+
+# (write function, args) applied in order by the writer thread
+_writes: "queue.Queue[tuple]" = queue.Queue()
+_writer: threading.Thread | None = None
+_writer_lock = threading.Lock()
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    RUN_STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(RUN_STORE_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    # auto_vacuum only takes effect before the first table exists
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _reader() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != RUN_STORE_PATH:
+        conn = _local.conn = _connect()
+        _local.path = RUN_STORE_PATH
+    return conn
+
+
+def _insert(conn: sqlite3.Connection, run_id: str, response: RunResponse, stages: list[dict], created_at: float) -> None:
+    with conn:
+        conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        conn.execute(
+            f"INSERT INTO runs ({_SUMMARY_COLUMNS}, response_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                response.repo_url,
+                response.branch_name,
+                response.team_name,
+                response.team_leader_name,
+                response.ci_status,
+                response.total_failures,
+                response.total_fixes_applied,
+                response.total_time_seconds,
+                response.score.total,
+                response.error,
+                created_at,
+                response.model_dump_json(),
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO run_timeline VALUES (?, ?, ?, ?)",
+            [(run_id, e.iteration, e.status, e.timestamp) for e in response.ci_timeline],
+        )
+        conn.executemany(
+            "INSERT INTO run_fixes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, f.file, f.bug_type, f.line_number, f.status, f.commit_message, f.commit_sha, f.pushed_sha)
+                for f in response.fixes
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO run_spans VALUES (?, ?, ?, ?, ?)",
+            [(run_id, s.name, s.parent, s.start_offset, s.seconds) for s in response.spans],
+        )
+        conn.executemany(
+            "INSERT INTO run_stages VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, s.get("iteration", 0), s.get("stage", ""), s.get("status", ""), s["started_at"], s["seconds"])
+                for s in stages
+            ],
+        )
+
+
+def compact(conn: sqlite3.Connection) -> int:
+    """Apply the retention policy and return freed pages to the OS. Returns runs deleted."""
+    deleted = 0
+    with conn:
+        if RUN_STORE_RETENTION_DAYS > 0:
+            cutoff = time.time() - RUN_STORE_RETENTION_DAYS * 86400
+            deleted += conn.execute("DELETE FROM runs WHERE created_at < ?", (cutoff,)).rowcount
+        if RUN_STORE_MAX_RUNS > 0:
+            deleted += conn.execute(
+                "DELETE FROM runs WHERE run_id IN (SELECT run_id FROM runs ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (RUN_STORE_MAX_RUNS,),
+            ).rowcount
+    if deleted:
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return deleted
+
+
+def _export_latest(conn: sqlite3.Connection) -> None:
+    if not RESULTS_EXPORT_PATH:
+        return
+    # Insertion order, not start time: with concurrent jobs the run that finished last is written last
+    row = conn.execute("SELECT response_json FROM runs ORDER BY rowid DESC LIMIT 1").fetchone()
+    if row is None:
+        return
+    path = Path(RESULTS_EXPORT_PATH)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        response = RunResponse.model_validate_json(row["response_json"])
+        tmp.write_text(response.model_dump_json(indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # Non-fatal
+
+
+def _insert_profile(conn: sqlite3.Connection, run_id: str, mode: str, artifacts: dict[str, bytes]) -> None:
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO run_profiles VALUES (?, ?, ?, ?)",
+            [(run_id, kind, mode, data) for kind, data in artifacts.items()],
+        )
+
+
+def _write_loop() -> None:
+    conn = _connect()
+    writes = 0
+    while True:
+        write, args = _writes.get()
+        try:
+            write(conn, *args)
+            if write is _insert:
+                writes += 1
+                if RUN_STORE_COMPACT_EVERY > 0 and writes % RUN_STORE_COMPACT_EVERY == 0:
+                    compact(conn)
+                _export_latest(conn)
+        except sqlite3.Error:
+            pass  # History is best effort: a failed write must not take the writer down
+        finally:
+            _writes.task_done()
+
+
+def _ensure_writer() -> None:
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_loop, name="run-store-writer", daemon=True)
+            _writer.start()
+
+
+def record_run(run_id: str, response: RunResponse, stages: list[dict] | None = None, created_at: float | None = None) -> None:
+    """Queue a finished run for the writer thread. Returns immediately."""
+    _ensure_writer()
+    _writes.put((_insert, (run_id, response, stages or [], created_at or time.time())))
+
+
+def record_profile(run_id: str, mode: str, artifacts: dict[str, bytes]) -> None:
+    """Queue profile artifacts ({kind: bytes}) for a run recorded earlier (writes are applied in order)."""
+    _ensure_writer()
+    _writes.put((_insert_profile, (run_id, mode, artifacts)))
+
+
+def flush() -> None:
+    """Block until every queued write is on disk (shutdown, benchmarks)."""
+    if _writer is not None:
+        _writes.join()
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def _summary(row: sqlite3.Row) -> dict:
+    data = dict(row)
+    data["created_at"] = _iso(data["created_at"])
+    return data
+
+
+def _epoch(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def list_runs(
+    repo_url: str | None = None,
+    branch: str | None = None,
+    status: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> tuple[list[dict], int]:
+    """Run summaries newest first, filtered (since/until are ISO timestamps). Returns (page, total matches)."""
+    where, params = [], []
+    if repo_url:
+        where.append("repo_url = ?")
+        params.append(repo_url)
+    if branch:
+        where.append("branch_name = ?")
+        params.append(branch)
+    if status:
+        where.append("ci_status = ?")
+        params.append(status.upper())
+    for op, value in ((">=", _epoch(since)), ("<", _epoch(until))):
+        if value is not None:
+            where.append(f"created_at {op} ?")
+            params.append(value)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    conn = _reader()
+    total = conn.execute(f"SELECT COUNT(*) FROM runs {clause}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT {_SUMMARY_COLUMNS} FROM runs {clause} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+        [*params, limit, offset],
+    ).fetchall()
+    return [_summary(r) for r in rows], total
+
+
+def get_run(run_id: str) -> dict | None:
+    """Stored run: summary fields plus result (RunResponse dict), stages and profile kinds, or None."""
+    conn = _reader()
+    row = conn.execute(f"SELECT {_SUMMARY_COLUMNS}, response_json FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    if row is None:
+        return None
+    data = _summary(row)
+    data["result"] = json.loads(data.pop("response_json"))
+    data["stages"] = [
+        {**dict(s), "started_at": _iso(s["started_at"])}
+        for s in conn.execute(
+            "SELECT stage, iteration, status, started_at, seconds FROM run_stages WHERE run_id = ? ORDER BY started_at",
+            (run_id,),
+        )
+    ]
+    data["profiles"] = profile_kinds(run_id)
+    return data
+
+
+def profile_kinds(run_id: str) -> list[str]:
+    """Profile artifact kinds stored for a run (empty unless it was profiled)."""
+    rows = _reader().execute("SELECT kind FROM run_profiles WHERE run_id = ? ORDER BY kind", (run_id,))
+    return [r["kind"] for r in rows]
+
+
+def get_profile(run_id: str, kind: str) -> tuple[str, bytes] | None:
+    """(profiler mode, artifact bytes) of one stored profile artifact, or None."""
+    row = _reader().execute(
+        "SELECT mode, data FROM run_profiles WHERE run_id = ? AND kind = ?", (run_id, kind)
+    ).fetchone()
+    return (row["mode"], bytes(row["data"])) if row is not None else None
@@ -0,0 +1,65 @@
+"""In-memory syntax checker: compile() without writing bytecode, content-hash cached, process-pool fan-out."""
+
+import os
+import traceback
+from pathlib import Path
+
+from app.services.file_pass import ContentCache, run_file_pass
+from app.services.syntax_diagnostics import diagnose_source
+
+# Report every likely error of a rejected file, not only the first one compile() stops at
+SYNTAX_REPORT_ALL = os.environ.get("SYNTAX_REPORT_ALL", "1").strip() not in ("0", "false", "no")
+SYNTAX_MAX_ERRORS_PER_FILE = int(os.environ.get("SYNTAX_MAX_ERRORS_PER_FILE", "50"))
+
+# None if clean, else (line, error_msg)
+CheckResult = tuple[int | None, str] | None
+
+_cache = ContentCache()
+
+
+def check_source(source: bytes, filename: str) -> CheckResult:
+    """Compile source in memory. Returns None if it compiles, else (line, error_msg)."""
+    try:
+        compile(source, filename, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        msg = "".join(traceback.format_exception_only(type(e), e)).rstrip()
+        return e.lineno, msg
+    except ValueError as e:  # e.g. source contains null bytes
+        return None, f"{type(e).__name__}: {e}"
+    return None
+
+
+def check_source_all(source: bytes, filename: str) -> list[tuple[int | None, str]]:
+    """
+    Every syntax error site of source: compile()'s first error, plus the later ones the
+    recovering scanner finds. Scanner sites before compile()'s line are dropped (compile
+    proved those lines parse). [] if it compiles.
+    """
+    first = check_source(source, filename)
+    if first is None:
+        return []
+    line, msg = first
+    if not SYNTAX_REPORT_ALL or line is None:
+        return [first]
+    found = {n: m for n, m in diagnose_source(source, filename) if n > line}
+    found[line] = msg
+    return sorted(found.items())[:SYNTAX_MAX_ERRORS_PER_FILE]
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def check_files(
+    repo_path: Path, files: list[Path] | None = None
+) -> tuple[list[tuple[str, int | None, str]], int]:
+    """
+    Syntax-check files (default: every .py under repo_path).
+    Returns ([(rel_path, line, error_msg), ...] sorted by path then line, number of files
+    actually compiled). A file can have several entries (see check_source_all).
+    """
+    results, compiled = run_file_pass(repo_path, check_source_all, _cache, files)
+    failures = [
+        (rel, line, msg) for rel, res in sorted(results.items()) for line, msg in res
+    ]
+    return failures, compiled
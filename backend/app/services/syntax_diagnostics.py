@@ -0,0 +1,207 @@
+"""
+Error-recovering syntax diagnostics: every likely missing-colon, bad-indent and unbalanced
+bracket site of a file in one pass. compile() (and tokenize) stop at the first error, so a file
+with five missing colons needed five check/fix rounds. This line scanner tracks strings,
+comments, brackets and the indent stack itself and resynchronizes after each error.
+Heuristic by design: syntax_check only runs it on files compile() rejected.
+"""
+
+# Compound statements whose header must end with ':' (match/case are soft keywords: skipped)
+COMPOUND_KEYWORDS = ("if", "elif", "else", "for", "while", "try", "except", "finally", "with", "def", "class")
+# Statements that cannot continue an expression: one at or left of an unclosed bracket's
+# statement starts a new statement, so the bracket was never closed
+_RESYNC_KEYWORDS = (
+    "def", "class", "return", "import", "raise", "pass", "break", "continue", "del", "global",
+    "nonlocal", "assert", "try", "while", "with", "elif", "except", "finally",
+)
+_OPEN = {"(": ")", "[": "]", "{": "}"}
+_CLOSE = {v: k for k, v in _OPEN.items()}
+
+# [(line, message), ...] in line order
+Diagnostics = list[tuple[int, str]]
+
+
+def _indent_width(line: str) -> int:
+    """Column of the first non-blank character, tabs to the next multiple of 8 like the tokenizer."""
+    width = 0
+    for ch in line:
+        if ch == " ":
+            width += 1
+        elif ch == "\t":
+            width = (width // 8 + 1) * 8
+        elif ch == "\f":
+            width = 0
+        else:
+            break
+    return width
+
+
+def _first_word(text: str) -> str:
+    word = []
+    for ch in text.lstrip():
+        if not (ch.isalnum() or ch == "_"):
+            break
+        word.append(ch)
+    return "".join(word)
+
+
+def _keyword(code: str) -> str:
+    """Leading keyword of a logical line (async def/for/with count as def/for/with)."""
+    word = _first_word(code)
+    if word == "async":
+        word = _first_word(code.lstrip()[5:])
+    return word
+
+
+class _Scanner:
+    def __init__(self, filename: str, lines: list[str]) -> None:
+        self.filename = filename
+        self.lines = lines
+        self.found: dict[int, str] = {}
+        self.indents = [0]
+        # (line, keyword, certain) of the last header: certain when it ended with ':'
+        self.pending: tuple[int, str, bool] | None = None
+
+    def report(self, line: int, kind: str, message: str) -> None:
+        if line in self.found:
+            return
+        text = self.lines[line - 1].strip() if 0 < line <= len(self.lines) else ""
+        self.found[line] = f'  File "{self.filename}", line {line}\n    {text}\n{kind}: {message}'
+
+    def logical_line(self, start: int, end: int, indent: int, code: str) -> None:
+        """Indentation and header checks for one complete statement (code: depth-0 text only)."""
+        pending, self.pending = self.pending, None
+        if pending is not None and indent > self.indents[-1]:
+            self.indents.append(indent)
+        elif pending is not None and pending[2]:
+            self.report(
+                start, "IndentationError", f"expected an indented block after '{pending[1]}' statement on line {pending[0]}"
+            )
+        elif indent > self.indents[-1]:
+            self.report(start, "IndentationError", "unexpected indent")
+        elif indent < self.indents[-1]:
+            while self.indents[-1] > indent:
+                self.indents.pop()
+            if self.indents[-1] != indent:
+                self.report(start, "IndentationError", "unindent does not match any outer indentation level")
+                # Resynchronize on this level so its siblings are not all reported too
+                self.indents.append(indent)
+
+        stripped = code.rstrip()
+        keyword = _keyword(code)
+        if stripped.endswith(":"):
+            self.pending = (start, keyword or "block", True)
+        elif keyword in COMPOUND_KEYWORDS and ":" not in stripped.replace(":=", ""):
+            # The colon goes at the end of the header's last line; a following indented block
+            # still opens, so the body is not reported as an unexpected indent as well
+            self.report(end, "SyntaxError", "expected ':'")
+            self.pending = (start, keyword, False)
+
+    def scan(self) -> Diagnostics:
+        stack: list[tuple[str, int]] = []  # open brackets: (char, line)
+        string: tuple[str, int] | None = None  # (closing quote, start line) of a string spanning lines
+        continued = False  # backslash continuation
+        start, indent, code = 0, 0, []
+
+        for n, raw_line in enumerate(self.lines, start=1):
+            line = raw_line.rstrip("\r\n")
+            if string is None and not stack and not continued:
+                if not line.strip() or line.lstrip().startswith("#"):
+                    continue
+                start, indent, code = n, _indent_width(line), []
+            elif string is None and stack and not continued:
+                word = _first_word(line)
+                if (word in _RESYNC_KEYWORDS or line.lstrip().startswith("@")) and _indent_width(line) <= indent:
+                    self.report(stack[0][1], "SyntaxError", f"'{stack[0][0]}' was never closed")
+                    stack.clear()
+                    self.logical_line(start, n - 1, indent, "".join(code))
+                    start, indent, code = n, _indent_width(line), []
+
+            continued = False
+            i = 0
+            in_comment = False
+            while i < len(line):
+                ch = line[i]
+                if string is not None:
+                    # Backslashes escape the next character even in raw strings
+                    if ch == "\\":
+                        i += 2
+                        continue
+                    if line.startswith(string[0], i):
+                        i += len(string[0])
+                        string = None
+                        continue
+                    i += 1
+                    continue
+                if ch == "#":
+                    in_comment = True
+                    break
+                if ch in "'\"":
+                    quote = ch * 3 if line.startswith(ch * 3, i) else ch
+                    if not stack:
+                        code.append('""')
+                    i += len(quote)
+                    if len(quote) == 3:
+                        string = (quote, n)
+                        continue
+                    # Single-quoted strings end on this line (or the line ends in a backslash)
+                    while i < len(line) and line[i] != ch:
+                        i += 2 if line[i] == "\\" else 1
+                    if i >= len(line):
+                        if line.endswith("\\"):
+                            string = (ch, n)
+                        else:
+                            self.report(n, "SyntaxError", f"unterminated string literal (detected at line {n})")
+                    i += 1
+                    continue
+                if ch in _OPEN:
+                    if not stack:
+                        code.append(ch)
+                    stack.append((ch, n))
+                elif ch in _CLOSE:
+                    opener = _CLOSE[ch]
+                    if stack and stack[-1][0] == opener:
+                        stack.pop()
+                    elif any(o == opener for o, _ in stack):
+                        top, top_line = stack[-1]
+                        where = "" if top_line == n else f" on line {top_line}"
+                        self.report(
+                            n, "SyntaxError", f"closing parenthesis '{ch}' does not match opening parenthesis '{top}'{where}"
+                        )
+                        while stack and stack.pop()[0] != opener:
+                            pass
+                    else:
+                        self.report(n, "SyntaxError", f"unmatched '{ch}'")
+                        i += 1
+                        continue
+                    if not stack:
+                        code.append(ch)
+                elif not stack:
+                    code.append(ch)
+                i += 1
+
+            if string is not None and len(string[0]) == 1 and not line.endswith("\\"):
+                self.report(string[1], "SyntaxError", f"unterminated string literal (detected at line {n})")
+                string = None
+            if string is None and not in_comment and line.endswith("\\"):
+                continued = True
+                if code and code[-1] == "\\":
+                    code.pop()
+            if string is None and not stack and not continued:
+                self.logical_line(start, n, indent, "".join(code))
+
+        if string is not None:
+            kind = "triple-quoted string literal" if len(string[0]) == 3 else "string literal"
+            self.report(string[1], "SyntaxError", f"unterminated {kind} (detected at line {len(self.lines)})")
+        elif stack:
+            self.report(stack[0][1], "SyntaxError", f"'{stack[0][0]}' was never closed")
+        return sorted(self.found.items())
+
+
+def diagnose_source(source: bytes, filename: str) -> Diagnostics:
+    """
+    Every likely syntax error site of source as [(line, message), ...], messages shaped like
+    compile()'s (SyntaxError vs IndentationError decides the bug type). [] if none was found.
+    """
+    text = source.decode("utf-8", errors="replace")
+    return _Scanner(filename, text.splitlines()).scan()
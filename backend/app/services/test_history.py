@@ -0,0 +1,80 @@
+"""Per-repo record of test outcomes and durations, used to run previously failing tests first."""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.services.mirror_cache import mirror_key
+
+TEST_HISTORY_DIR = Path(
+    os.environ.get("TEST_HISTORY_DIR", "") or Path(tempfile.gettempdir()) / "ai_agent_test_history"
+)
+
+FAILING_OUTCOMES = ("failed", "error")
+
+_lock = threading.Lock()
+
+
+def _history_path(repo_url: str) -> Path:
+    return TEST_HISTORY_DIR / f"{mirror_key(repo_url)}.json"
+
+
+def load_history(repo_url: str) -> dict[str, dict]:
+    """Return {nodeid: {"outcome", "duration", "updated"}} for repo_url (empty if none)."""
+    if not repo_url:
+        return {}
+    with _lock:
+        try:
+            return json.loads(_history_path(repo_url).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+
+def record_results(repo_url: str, results: dict[str, dict], full_run: bool = False) -> None:
+    """
+    Merge {nodeid: {"outcome": str, "duration": float | None}} into the repo history.
+    Durations are kept from earlier runs when the new record has none.
+    A full run also drops tests that no longer exist.
+    """
+    if not repo_url or not results:
+        return
+    path = _history_path(repo_url)
+    now = time.time()
+    with _lock:
+        try:
+            history = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            history = {}
+        if full_run:
+            history = {k: v for k, v in history.items() if k in results}
+        for nodeid, rec in results.items():
+            prev = history.get(nodeid, {})
+            duration = rec.get("duration")
+            history[nodeid] = {
+                "outcome": rec.get("outcome", "unknown"),
+                "duration": duration if duration is not None else prev.get("duration"),
+                "updated": now,
+            }
+        try:
+            TEST_HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(history), encoding="utf-8")
+            tmp.replace(path)
+        except OSError:
+            pass  # Non-fatal: prioritization just falls back to full runs
+
+
+def previously_failing(repo_url: str) -> list[str]:
+    """Node ids whose last recorded outcome was a failure, fastest first."""
+    history = load_history(repo_url)
+    failing = [(rec.get("duration") or 0.0, nodeid) for nodeid, rec in history.items()
+               if rec.get("outcome") in FAILING_OUTCOMES]
+    return [nodeid for _d, nodeid in sorted(failing)]
+
+
+def durations(repo_url: str) -> dict[str, float]:
+    """Last recorded duration per node id (for shard balancing)."""
+    return {nodeid: rec["duration"] for nodeid, rec in load_history(repo_url).items() if rec.get("duration")}
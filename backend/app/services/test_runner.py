@@ -1,53 +1,356 @@
-import re
-import py_compile
+import heapq
+import json
+import os
 import subprocess
 import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable
 
+from app.services import lint_check, pytest_server, syntax_check
+from app.services.metrics import timed
 
+
+@timed("syntax_check")
 def run_syntax_check(repo_path: Path) -> tuple[int, str, list[tuple[str, int | None, str]]]:
     """
     Compile all .py files in the repo to catch SyntaxError/IndentationError
     in code that tests never import. Returns (exit_code, output, [(file, line, error_msg), ...]).
+    Compiles in memory (no .pyc written) and only re-checks files whose content changed.
     """
-    skip_dirs = {"__pycache__", ".git", "venv", ".venv", "env", "node_modules"}
-    failures: list[tuple[str, int | None, str]] = []
-    output_lines: list[str] = []
+    failures, _compiled = syntax_check.check_files(repo_path)
+    output_lines = [f"SyntaxError in {rel} line {line}: {msg}" for rel, line, msg in failures]
 
-    for py_file in repo_path.rglob("*.py"):
-        if any(part in py_file.parts for part in skip_dirs):
-            continue
+    output = "\n".join(output_lines) if output_lines else ""
+    exit_code = 1 if failures else 0
+    return exit_code, output, failures
+
+
+PLUGIN_DIR = Path(__file__).resolve().parent / "pytest_plugin"
+
+# Per pytest process; each shard gets its own budget
+PYTEST_TIMEOUT = int(os.environ.get("PYTEST_TIMEOUT", "120"))
+# Parallel pytest processes (0 = available cores, 1 = no sharding)
+PYTEST_SHARDS = int(os.environ.get("PYTEST_SHARDS", "0")) or (
+    len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+)
+# Never give a shard fewer tests than this (process start-up dominates tiny shards)
+PYTEST_SHARD_MIN_TESTS = int(os.environ.get("PYTEST_SHARD_MIN_TESTS", "20"))
+
+
+def read_report(report_path: Path) -> list[dict]:
+    """Load JSON-lines records written by agent_report_plugin. Tolerates a truncated last line."""
+    records: list[dict] = []
+    try:
+        with open(report_path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return records
+
+
+@timed("lint")
+def run_lint_check(repo_path: Path) -> tuple[int, str, list[tuple[str, int | None, str]]]:
+    """
+    Static unused-import pass over all .py files.
+    Returns (exit_code, output, [(file, line, message), ...]) like run_syntax_check.
+    """
+    findings, _parsed = lint_check.check_files(repo_path)
+    output = "\n".join(f"{rel}:{line}: {msg}" for rel, line, msg in findings)
+    return (1 if findings else 0), output, findings
+
+
+def _pytest_env(report_path: Path | None = None) -> dict[str, str]:
+    env = dict(os.environ)
+    if report_path is not None:
+        env["AGENT_REPORT_PATH"] = str(report_path)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(PLUGIN_DIR), env.get("PYTHONPATH", "")) if p)
+    return env
+
+
+class _ReportTail:
+    """Reads records appended to a report file since the last poll (complete lines only)."""
+
+    def __init__(self, report_path: Path) -> None:
+        self.report_path = report_path
+        self.offset = 0
+
+    def poll(self) -> list[dict]:
         try:
-            py_compile.compile(str(py_file), doraise=True)
-        except py_compile.PyCompileError as e:
+            with open(self.report_path, "rb") as fh:
+                fh.seek(self.offset)
+                chunk = fh.read()
+        except OSError:
+            return []
+        end = chunk.rfind(b"\n") + 1
+        self.offset += end
+        records = []
+        for line in chunk[:end].splitlines():
             try:
-                rel = py_file.relative_to(repo_path)
+                records.append(json.loads(line))
             except ValueError:
-                rel = py_file
-            rel_str = str(rel).replace("\\", "/")
-            line = getattr(e, "lineno", None)
-            if line is None:
-                m = re.search(r"line\s+(\d+)", str(e))
-                line = int(m.group(1)) if m else None
-            msg = str(e.msg) if hasattr(e, "msg") and e.msg else str(e)
-            failures.append((rel_str, line, msg))
-            output_lines.append(f"SyntaxError in {rel_str} line {line}: {msg}")
+                continue
+        return records
 
-    output = "\n".join(output_lines) if output_lines else ""
-    exit_code = 1 if failures else 0
-    return exit_code, output, failures
+
+def _stream_process(
+    proc: "subprocess.Popen | pytest_server.ForkedProcess",
+    cmd: list[str],
+    report_path: Path | None,
+    on_line: Callable[[str], None],
+    on_record: Callable[[dict], None] | None,
+) -> tuple[int, str, str]:
+    """
+    Collect a started process's output, forwarding each stdout line to on_line as it is printed,
+    and each report record to on_record as soon as the plugin flushes it.
+    Raises TimeoutExpired like subprocess.run.
+    """
+    # stderr is drained on its own thread so a full pipe cannot stall the process
+    stderr_parts: list[str] = []
+    drain = threading.Thread(target=lambda: stderr_parts.append(proc.stderr.read()), daemon=True)
+    drain.start()
+    timed_out = threading.Event()
+
+    def _kill() -> None:
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(PYTEST_TIMEOUT, _kill)
+    timer.start()
+    tail = _ReportTail(report_path) if on_record is not None and report_path is not None else None
+    stdout_parts: list[str] = []
+    try:
+        for line in proc.stdout:
+            stdout_parts.append(line)
+            on_line(line.rstrip("\n"))
+            if tail is not None:
+                for rec in tail.poll():
+                    on_record(rec)
+        proc.wait()
+    finally:
+        timer.cancel()
+        try:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        finally:
+            drain.join()
+            proc.stdout.close()
+            proc.stderr.close()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, PYTEST_TIMEOUT, output="".join(stdout_parts))
+    if tail is not None:
+        for rec in tail.poll():
+            on_record(rec)
+    return proc.returncode, "".join(stdout_parts), "".join(stderr_parts)
 
 
-def run_pytest(repo_path: Path) -> tuple[int, str, str]:
+def _ignore_line(_line: str) -> None:
+    pass
+
+
+def _run_forked(
+    python: str,
+    repo_path: Path,
+    cmd: list[str],
+    env: dict[str, str],
+    report_path: Path | None = None,
+    on_line: Callable[[str], None] | None = None,
+    on_record: Callable[[dict], None] | None = None,
+) -> tuple[int, str, str] | None:
+    """
+    Run `python -m pytest ...` (cmd) as a child of the workspace's warm fork server.
+    None means "use a plain subprocess": no server ready yet, or it broke before the run finished.
+    """
+    try:
+        proc = pytest_server.spawn(python, repo_path, cmd[3:], env)
+        if proc is None:
+            return None
+        return _stream_process(proc, cmd, report_path, on_line or _ignore_line, on_record)
+    except pytest_server.ForkServerError:
+        if report_path is not None:
+            report_path.write_text("", encoding="utf-8")  # Partial records of the failed attempt
+        return None
+
+
+def _run_pytest_process(
+    repo_path: Path,
+    args: list[str],
+    python: str | None = None,
+    on_line: Callable[[str], None] | None = None,
+    on_record: Callable[[dict], None] | None = None,
+) -> tuple[int, str, str, list[dict]]:
     """
-    Run pytest in repo directory.
-    Returns (exit_code, stdout, stderr).
+    One pytest process with agent_report_plugin, forked from the workspace's warm fork server
+    when one is ready, else a plain subprocess. Returns (exit_code, stdout, stderr, records).
+    With on_line, output and per-test records are forwarded while pytest runs.
     """
+    cmd = [python or sys.executable, "-m", "pytest", "-v", "--tb=short", "-p", "agent_report_plugin", *args]
+    fd, report_name = tempfile.mkstemp(prefix="agent_report_", suffix=".jsonl")
+    os.close(fd)
+    report_path = Path(report_name)
+    env = {**_pytest_env(report_path), "PYTHONUNBUFFERED": "1"}
+    try:
+        forked = _run_forked(cmd[0], repo_path, cmd, env, report_path, on_line, on_record)
+        if forked is not None:
+            returncode, stdout, stderr = forked
+        elif on_line is not None:
+            proc = subprocess.Popen(
+                cmd,
+                cwd=repo_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                env=env,
+            )
+            returncode, stdout, stderr = _stream_process(proc, cmd, report_path, on_line, on_record)
+        else:
+            result = subprocess.run(
+                cmd,
+                cwd=repo_path,
+                capture_output=True,
+                text=True,
+                timeout=PYTEST_TIMEOUT,
+                env=_pytest_env(report_path),
+            )
+            returncode, stdout, stderr = result.returncode, result.stdout, result.stderr
+        records = read_report(report_path)
+    finally:
+        report_path.unlink(missing_ok=True)
+    return returncode, stdout, stderr, records
+
+
+def collect_test_ids(
+    repo_path: Path, test_ids: list[str] | None = None, python: str | None = None
+) -> list[str] | None:
+    """Node ids pytest would run, or None if collection itself fails (errors must surface unsharded)."""
+    cmd = [python or sys.executable, "-m", "pytest", "--collect-only", "-q", *(test_ids or [])]
+    forked = _run_forked(cmd[0], repo_path, cmd, _pytest_env())
+    if forked is not None:
+        returncode, stdout, _stderr = forked
+        return [line.strip() for line in stdout.splitlines() if "::" in line] if returncode == 0 else None
     result = subprocess.run(
-        [sys.executable, "-m", "pytest", "-v", "--tb=short"],
+        cmd,
         cwd=repo_path,
         capture_output=True,
         text=True,
-        timeout=120,
+        timeout=PYTEST_TIMEOUT,
+        env=_pytest_env(),
     )
-    return result.returncode, result.stdout, result.stderr
+    if result.returncode != 0:
+        return None
+    return [line.strip() for line in result.stdout.splitlines() if "::" in line]
+
+
+def plan_shards(test_ids: list[str], n_shards: int, durations: dict[str, float] | None = None) -> list[list[str]]:
+    """
+    Longest-processing-time-first: place tests by descending recorded duration onto the
+    least-loaded shard. Unknown durations count as the median known one (or 1s).
+    Deterministic for identical inputs; empty shards are dropped.
+    """
+    durations = durations or {}
+    known = sorted(d for d in (durations.get(t) for t in test_ids) if d)
+    default = known[len(known) // 2] if known else 1.0
+    weighted = sorted(((durations.get(t) or default, t) for t in test_ids), key=lambda x: (-x[0], x[1]))
+    loads = [(0.0, i) for i in range(n_shards)]
+    heapq.heapify(loads)
+    shards: list[list[str]] = [[] for _ in range(n_shards)]
+    for weight, nodeid in weighted:
+        load, i = heapq.heappop(loads)
+        shards[i].append(nodeid)
+        heapq.heappush(loads, (load + weight, i))
+    return [s for s in shards if s]
+
+
+def merge_exit_codes(codes: list[int]) -> int:
+    """Combine shard exit codes: failures win, then other errors; "no tests" only if every shard had none."""
+    if 1 in codes:
+        return 1
+    errors = [c for c in codes if c not in (0, 1, 5)]
+    if errors:
+        return errors[0]
+    return 5 if codes and all(c == 5 for c in codes) else 0
+
+
+@timed("pytest")
+def estimated_test_count(test_ids: list[str] | None, durations: dict[str, float] | None) -> int | None:
+    """
+    Tests a selection is expected to run, from the test history (durations) alone: node ids
+    count once, file and directory paths count their recorded tests (at least one). For the
+    whole suite it is the recorded test count; None when there is no history to go by.
+    """
+    known = durations or {}
+    if test_ids is None:
+        return len(known) or None
+    total = 0
+    for test_id in test_ids:
+        if "::" in test_id:
+            total += 1
+            continue
+        prefix = test_id.rstrip("/")
+        total += max(1, sum(1 for nodeid in known if nodeid.startswith((f"{prefix}::", f"{prefix}/"))))
+    return total
+
+
+def run_pytest(
+    repo_path: Path,
+    test_ids: list[str] | None = None,
+    maxfail: int = 0,
+    durations: dict[str, float] | None = None,
+    python: str | None = None,
+    on_line: Callable[[str], None] | None = None,
+    on_record: Callable[[dict], None] | None = None,
+) -> tuple[int, str, str, list[dict]]:
+    """
+    Run pytest in repo directory, optionally restricted to test_ids.
+    maxfail > 0 stops after that many failures (fail-fast).
+    Injects agent_report_plugin for structured per-test records.
+    With PYTEST_SHARDS > 1 and enough tests, splits them into duration-balanced shards
+    run as parallel processes and merges their output and records. Whether there are enough
+    is first estimated from durations (the test history); only then are the tests collected.
+    python selects the interpreter (the repo's venv); defaults to the server's.
+    on_line / on_record receive output lines and per-test records live (from every shard).
+    Returns (exit_code, stdout, stderr, records).
+    """
+    args = [f"--maxfail={maxfail}"] if maxfail > 0 else []
+
+    n_shards = PYTEST_SHARDS
+    nodeids: list[str] | None = None
+    # Collecting costs a pytest process of its own: skip it for selections too small for two shards
+    expected = estimated_test_count(test_ids, durations)
+    if n_shards > 1 and (expected is None or expected >= 2 * max(1, PYTEST_SHARD_MIN_TESTS)):
+        nodeids = collect_test_ids(repo_path, test_ids, python)
+        if nodeids:
+            n_shards = min(n_shards, len(nodeids) // max(1, PYTEST_SHARD_MIN_TESTS))
+    if n_shards <= 1 or not nodeids:
+        return _run_pytest_process(repo_path, args + list(test_ids or []), python, on_line, on_record)
+
+    shards = plan_shards(nodeids, n_shards, durations)
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        results = list(
+            pool.map(lambda ids: _run_pytest_process(repo_path, args + ids, python, on_line, on_record), shards)
+        )
+
+    codes = [r[0] for r in results]
+    stdout = "\n".join(
+        f"===== shard {i + 1}/{len(shards)} ({len(shards[i])} tests) =====\n{r[1]}" for i, r in enumerate(results)
+    )
+    stderr = "\n".join(r[2] for r in results if r[2])
+    records = [rec for r in results for rec in r[3]]
+    return merge_exit_codes(codes), stdout, stderr, records
+
+
+def records_to_history(records: list[dict]) -> dict[str, dict]:
+    """{nodeid: {"outcome", "duration"}} for test_history.record_results."""
+    return {
+        r["nodeid"]: {"outcome": r.get("outcome", "unknown"), "duration": r.get("duration")}
+        for r in records
+        if r.get("nodeid")
+    }
@@ -0,0 +1,232 @@
+"""Per-repo virtualenvs cached by dependency-file hash, with batched pip installs."""
+
+import hashlib
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tomllib
+from pathlib import Path
+
+from app.services.metrics import timed
+from app.services.mirror_cache import normalize_repo_url
+
+VENV_ISOLATION = os.environ.get("VENV_ISOLATION", "1").strip() not in ("0", "false", "no")
+VENV_CACHE_DIR = Path(
+    os.environ.get("VENV_CACHE_DIR", "") or Path(tempfile.gettempdir()) / "ai_agent_venvs"
+)
+# pip's HTTP/wheel cache shared by every venv, so rebuilding an env does not re-download
+WHEEL_CACHE_DIR = Path(
+    os.environ.get("WHEEL_CACHE_DIR", "") or Path(tempfile.gettempdir()) / "ai_agent_wheels"
+)
+VENV_INSTALL_TIMEOUT = int(os.environ.get("VENV_INSTALL_TIMEOUT", "600"))
+# After a failed build the key is not retried for this long, doubling per failure up to VENV_RETRY_MAX_SECONDS
+VENV_RETRY_SECONDS = float(os.environ.get("VENV_RETRY_SECONDS", "60"))
+VENV_RETRY_MAX_SECONDS = float(os.environ.get("VENV_RETRY_MAX_SECONDS", "3600"))
+
+# Files whose content decides the environment
+DEPENDENCY_FILES = (
+    "requirements.txt",
+    "requirements-dev.txt",
+    "requirements_dev.txt",
+    "requirements-test.txt",
+    "test-requirements.txt",
+    "pyproject.toml",
+    "setup.cfg",
+    "setup.py",
+)
+
+# Import name -> PyPI distribution, where they differ
+MODULE_TO_DISTRIBUTION = {
+    "attr": "attrs",
+    "bs4": "beautifulsoup4",
+    "Crypto": "pycryptodome",
+    "cv2": "opencv-python",
+    "dateutil": "python-dateutil",
+    "dotenv": "python-dotenv",
+    "fitz": "PyMuPDF",
+    "git": "GitPython",
+    "jwt": "PyJWT",
+    "magic": "python-magic",
+    "docx": "python-docx",
+    "OpenSSL": "pyOpenSSL",
+    "PIL": "Pillow",
+    "serial": "pyserial",
+    "skimage": "scikit-image",
+    "sklearn": "scikit-learn",
+    "yaml": "PyYAML",
+    "google.protobuf": "protobuf",
+    "pkg_resources": "setuptools",
+}
+
+_READY_MARKER = ".agent_ready"
+_MODULE_RE = re.compile(r"No module named ['\"]([A-Za-z0-9_.\-]+)['\"]")
+
+_locks: dict[str, threading.Lock] = {}
+_guard = threading.Lock()
+# key -> (monotonic time of the next attempt, failures so far)
+_failed: dict[str, tuple[float, int]] = {}
+
+
+def _lock(key: str) -> threading.Lock:
+    with _guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _venv_python(venv_dir: Path) -> Path:
+    if os.name == "nt":
+        return venv_dir / "Scripts" / "python.exe"
+    return venv_dir / "bin" / "python"
+
+
+def requirement_files(repo_path: Path) -> list[Path]:
+    found = [repo_path / name for name in DEPENDENCY_FILES if (repo_path / name).is_file()]
+    req_dir = repo_path / "requirements"
+    if req_dir.is_dir():
+        found.extend(sorted(req_dir.glob("*.txt")))
+    return found
+
+
+def deps_hash(repo_path: Path, repo_url: str = "") -> str:
+    """
+    Hash of the interpreter version and every dependency file's name and content.
+    Without dependency files the normalized repo_url is hashed instead, so repos that declare
+    nothing do not share one venv (and each other's IMPORT fix installs).
+    """
+    h = hashlib.sha256(f"{sys.version_info[:2]}".encode())
+    files = requirement_files(repo_path)
+    for path in files:
+        h.update(str(path.relative_to(repo_path)).encode())
+        h.update(b"\0")
+        h.update(path.read_bytes())
+    if not files and repo_url:
+        h.update(normalize_repo_url(repo_url).encode())
+    return h.hexdigest()[:16]
+
+
+def _pyproject_dependencies(repo_path: Path) -> list[str]:
+    try:
+        data = tomllib.loads((repo_path / "pyproject.toml").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    deps = list(data.get("project", {}).get("dependencies", []) or [])
+    for group in (data.get("project", {}).get("optional-dependencies", {}) or {}).values():
+        deps.extend(group)
+    return [d for d in deps if isinstance(d, str)]
+
+
+def _pip(python: str, args: list[str]) -> subprocess.CompletedProcess:
+    WHEEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return subprocess.run(
+        [python, "-m", "pip", "install", "--disable-pip-version-check", "--cache-dir", str(WHEEL_CACHE_DIR), *args],
+        capture_output=True,
+        text=True,
+        timeout=VENV_INSTALL_TIMEOUT,
+    )
+
+
+def _record_failure(key: str) -> None:
+    with _guard:
+        _next, failures = _failed.get(key, (0.0, 0))
+        delay = min(VENV_RETRY_SECONDS * 2**failures, VENV_RETRY_MAX_SECONDS)
+        _failed[key] = (time.monotonic() + delay, failures + 1)
+
+
+def _backing_off(key: str) -> bool:
+    with _guard:
+        entry = _failed.get(key)
+    return entry is not None and time.monotonic() < entry[0]
+
+
+@timed("venv")
+def ensure_venv(repo_path: Path, repo_url: str = "") -> str:
+    """
+    Return the interpreter tests for repo_path should run with.
+    Reuses the cached venv for this dependency hash, creating and populating it on a miss.
+    With isolation off this is the server interpreter. If the venv cannot be built, returns ""
+    (run_pytest then uses the server interpreter, and nothing may be installed into it); the
+    build is not retried for that key until its backoff (VENV_RETRY_SECONDS, doubling) is up.
+    """
+    if not VENV_ISOLATION:
+        return sys.executable
+    key = deps_hash(repo_path, repo_url)
+    venv_dir = VENV_CACHE_DIR / key
+    python = _venv_python(venv_dir)
+    if (venv_dir / _READY_MARKER).exists():
+        return str(python)
+    if _backing_off(key):
+        return ""
+
+    with _lock(key):
+        if (venv_dir / _READY_MARKER).exists():
+            return str(python)
+        if _backing_off(key):
+            return ""
+        try:
+            VENV_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            subprocess.run(
+                [sys.executable, "-m", "venv", "--clear", str(venv_dir)],
+                check=True,
+                capture_output=True,
+                timeout=VENV_INSTALL_TIMEOUT,
+            )
+            if _pip(str(python), ["pytest"]).returncode != 0:
+                _record_failure(key)
+                return ""
+            # Project requirements are best effort: a broken pin must not block the run
+            reqs = [f for f in requirement_files(repo_path) if f.suffix == ".txt"]
+            args = [a for f in reqs for a in ("-r", str(f))] + _pyproject_dependencies(repo_path)
+            if args:
+                _pip(str(python), args)
+            (venv_dir / _READY_MARKER).write_text(key, encoding="utf-8")
+        except (OSError, subprocess.SubprocessError):
+            _record_failure(key)
+            return ""
+        with _guard:
+            _failed.pop(key, None)
+    return str(python)
+
+
+def missing_module(error_snippet: str) -> str | None:
+    """Top-level module name from a ModuleNotFoundError message."""
+    m = _MODULE_RE.search(error_snippet or "")
+    return m.group(1) if m else None
+
+
+def distribution_for(module: str) -> str:
+    """PyPI distribution name to install for an import name."""
+    if module in MODULE_TO_DISTRIBUTION:
+        return MODULE_TO_DISTRIBUTION[module]
+    top = module.split(".")[0]
+    return MODULE_TO_DISTRIBUTION.get(top, top)
+
+
+def is_local_module(repo_path: Path, module: str) -> bool:
+    """True if the import resolves to code in the repo (never pip install those)."""
+    top = module.split(".")[0]
+    for base in (repo_path, repo_path / "src"):
+        if (base / top).is_dir() or (base / f"{top}.py").is_file():
+            return True
+    return False
+
+
+@timed("pip_install")
+def install_modules(python: str, modules: list[str]) -> dict[str, bool]:
+    """
+    Install the distributions for all modules in one pip call.
+    If the batch fails, retries each distribution alone to find which ones work.
+    Returns {module: installed}.
+    """
+    dists = {m: distribution_for(m) for m in dict.fromkeys(modules)}
+    if not dists:
+        return {}
+    try:
+        if _pip(python, sorted(set(dists.values()))).returncode == 0:
+            return {m: True for m in dists}
+        ok = {d: _pip(python, [d]).returncode == 0 for d in set(dists.values())}
+    except (OSError, subprocess.SubprocessError):
+        return {m: False for m in dists}
+    return {m: ok[d] for m, d in dists.items()}
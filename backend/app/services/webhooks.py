@@ -0,0 +1,299 @@
+"""
+Push webhooks -> agent runs. Deliveries are verified against WEBHOOK_SECRET (GitHub's
+X-Hub-Signature-256 HMAC scheme) and debounced per (repository, branch): a burst of pushes
+becomes one run of the latest head sha. A run still waiting in the queue is retargeted to the
+newer sha instead of queueing another, and a running one is followed by at most one more run.
+Pushes made by the agent itself ([AI-AGENT] commits, fix branches) are skipped.
+
+For local testing, python -m app.services.webhooks builds (and optionally sends) a signed push payload.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable
+
+from app.models import RunRequest
+from app.services.git_service import PREFIX
+from app.services.job_queue import QueueFullError
+from app.services.metrics import WEBHOOK_EVENTS
+from app.services.mirror_cache import normalize_repo_url
+from app.services.repo_service import FIX_BRANCH_SUFFIX
+
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "").strip()
+# Quiet period after the last push of a burst before its run is queued
+WEBHOOK_DEBOUNCE_SECONDS = float(os.environ.get("WEBHOOK_DEBOUNCE_SECONDS", "10"))
+# A steady stream of pushes still gets a run this long after its first push
+WEBHOOK_MAX_DELAY_SECONDS = float(os.environ.get("WEBHOOK_MAX_DELAY_SECONDS", "60"))
+# Fix branch naming for webhook runs (overridable per hook with ?team_name=&team_leader_name=)
+WEBHOOK_TEAM_NAME = os.environ.get("WEBHOOK_TEAM_NAME", "CI").strip()
+WEBHOOK_TEAM_LEADER = os.environ.get("WEBHOOK_TEAM_LEADER", "Webhook").strip()
+
+SIGNATURE_HEADER = "X-Hub-Signature-256"
+EVENT_HEADER = "X-GitHub-Event"
+_ZERO_SHA = "0" * 40
+
+
+def sign(body: bytes, secret: str) -> str:
+    """X-Hub-Signature-256 value for body."""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body: bytes, signature: str | None, secret: str | None = None) -> bool:
+    """Constant-time check of a delivery's signature. Always False without a secret."""
+    secret = WEBHOOK_SECRET if secret is None else secret
+    if not secret or not signature:
+        return False
+    # Bytes: compare_digest rejects str with non-ASCII characters (a forged header must not be a 500)
+    return hmac.compare_digest(sign(body, secret).encode("ascii"), signature.strip().encode("utf-8", "replace"))
+
+
+def fix_branch_leader(team_leader_name: str, branch: str) -> str:
+    """
+    Leader part of a webhook run's fix branch name, with the source branch in it: webhook runs
+    force-push their fix branch, so each source branch needs its own (TEAM_LEADER_BRANCH_AI_Fix).
+    """
+    return f"{team_leader_name} {re.sub(r'[^A-Za-z0-9._-]+', '-', branch)}"
+
+
+class PushEvent:
+    def __init__(self, repo_url: str, branch: str, sha: str) -> None:
+        self.repo_url = repo_url
+        self.branch = branch
+        self.sha = sha
+
+
+def parse_push(payload: dict) -> tuple[PushEvent | None, str]:
+    """(event, "") for a push worth healing, else (None, why it is skipped)."""
+    ref = payload.get("ref") or ""
+    if not ref.startswith("refs/heads/"):
+        return None, "not a branch push"
+    after = payload.get("after") or ""
+    if payload.get("deleted") or not after or after == _ZERO_SHA:
+        return None, "branch deleted"
+    repository = payload.get("repository") or {}
+    repo_url = repository.get("clone_url") or repository.get("url") or ""
+    if not repo_url:
+        return None, "no repository url"
+    branch = ref[len("refs/heads/"):]
+    if branch.endswith(FIX_BRANCH_SUFFIX):
+        return None, "agent fix branch"
+    head = payload.get("head_commit") or {}
+    if (head.get("message") or "").strip().startswith(PREFIX):
+        # The agent's own commits would otherwise trigger runs on themselves forever
+        return None, "pushed by the agent"
+    return PushEvent(repo_url, branch, after), ""
+
+
+class Dispatch:
+    """A queued webhook run: its request can be retargeted to a newer sha until a worker starts it."""
+
+    def __init__(self, request: RunRequest) -> None:
+        self.request = request
+        self.job_id: str | None = None
+        self.started = False
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def retarget(self, request: RunRequest) -> bool:
+        with self._lock:
+            if self.started:
+                return False
+            self.request = request
+            return True
+
+    def run(self, execute: Callable[[RunRequest], Any]) -> Any:
+        """Called on the job worker: runs the latest request."""
+        with self._lock:
+            self.started = True
+            request = self.request
+        try:
+            return execute(request)
+        finally:
+            self.finished = True
+
+
+class _Key:
+    def __init__(self) -> None:
+        self.pending: RunRequest | None = None
+        self.deadline = 0.0
+        self.first_at = 0.0
+        self.coalesced = 0  # Pushes superseded by a later one of the same burst
+        self.dispatch: Dispatch | None = None
+
+
+class Debouncer:
+    """
+    Per (repository, branch) debounce of push events. submit(dispatch) queues a run executing
+    dispatch and returns its job id (raises QueueFullError when the queue is full).
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[Dispatch], str],
+        debounce: float = WEBHOOK_DEBOUNCE_SECONDS,
+        max_delay: float = WEBHOOK_MAX_DELAY_SECONDS,
+    ) -> None:
+        self._submit = submit
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._keys: dict[tuple[str, str], _Key] = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def push(self, event: PushEvent, team_name: str, team_leader_name: str) -> dict:
+        """Record a push; its run starts once the branch has been quiet for the debounce period."""
+        key = (normalize_repo_url(event.repo_url), event.branch)
+        request = RunRequest(
+            repo_url=event.repo_url,
+            team_name=team_name,
+            team_leader_name=fix_branch_leader(team_leader_name, event.branch),
+            ref=event.branch,
+            sha=event.sha,
+            replace_fix_branch=True,
+        )
+        now = time.monotonic()
+        with self._cond:
+            state = self._keys.setdefault(key, _Key())
+            if state.pending is None:
+                state.first_at = now
+                state.coalesced = 0
+                status = "scheduled"
+            else:
+                state.coalesced += 1
+                status = "coalesced"
+            state.pending = request
+            state.deadline = min(now + self.debounce, state.first_at + self.max_delay)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="webhook-debounce", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            run_in = state.deadline - now
+        WEBHOOK_EVENTS.inc(outcome=status)
+        return {
+            "status": status,
+            "repo_url": event.repo_url,
+            "branch": event.branch,
+            "sha": event.sha,
+            "run_in_seconds": round(run_in, 3),
+        }
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due = []
+                for key, state in list(self._keys.items()):
+                    if state.pending is not None and state.deadline <= now:
+                        due.append((state, state.pending))
+                        state.pending = None
+                    elif state.pending is None and (state.dispatch is None or state.dispatch.finished):
+                        del self._keys[key]
+                if not due:
+                    deadlines = [s.deadline for s in self._keys.values() if s.pending is not None]
+                    self._cond.wait(timeout=max(0.0, min(deadlines) - now) if deadlines else None)
+                    continue
+            for state, request in due:
+                self._fire(state, request)
+
+    def _defer(self, state: _Key, request: RunRequest) -> None:
+        """Try again after another debounce period, unless a newer push already replaced request."""
+        with self._cond:
+            if state.pending is None:
+                state.pending = request
+                state.deadline = time.monotonic() + self.debounce
+            self._cond.notify()
+
+    def _fire(self, state: _Key, request: RunRequest) -> None:
+        current = state.dispatch
+        if current is not None and current.retarget(request):
+            WEBHOOK_EVENTS.inc(outcome="retargeted")
+            return
+        if current is not None and not current.finished:
+            # One run per branch at a time: the newer sha runs after the current run
+            self._defer(state, request)
+            return
+        dispatch = Dispatch(request)
+        try:
+            dispatch.job_id = self._submit(dispatch)
+        except QueueFullError:
+            WEBHOOK_EVENTS.inc(outcome="queue_full")
+            self._defer(state, request)
+            return
+        state.dispatch = dispatch
+        WEBHOOK_EVENTS.inc(outcome="dispatched")
+
+    def stats(self) -> dict:
+        """Branches with a pending burst or a webhook run in flight."""
+        now = time.monotonic()
+        with self._cond:
+            items = list(self._keys.items())
+            branches = []
+            for (repo_url, branch), state in items:
+                dispatch = state.dispatch
+                branches.append({
+                    "repo_url": repo_url,
+                    "branch": branch,
+                    "pending_sha": state.pending.sha if state.pending is not None else None,
+                    "coalesced": state.coalesced,
+                    "run_in_seconds": round(max(0.0, state.deadline - now), 3) if state.pending is not None else None,
+                    "job_id": dispatch.job_id if dispatch is not None and not dispatch.finished else None,
+                    "job_sha": dispatch.request.sha if dispatch is not None and not dispatch.finished else None,
+                })
+        return {"debounce_seconds": self.debounce, "max_delay_seconds": self.max_delay, "branches": branches}
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return sum(1 for s in self._keys.values() if s.pending is not None)
+
+
+def push_payload(repo_url: str, branch: str, sha: str, message: str = "Update") -> dict:
+    """Minimal GitHub-style push payload (the fields parse_push reads)."""
+    return {
+        "ref": f"refs/heads/{branch}",
+        "before": _ZERO_SHA,
+        "after": sha,
+        "deleted": False,
+        "repository": {"clone_url": repo_url},
+        "head_commit": {"id": sha, "message": message},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a signed push webhook delivery for local testing.")
+    parser.add_argument("--repo-url", required=True)
+    parser.add_argument("--branch", default="main")
+    parser.add_argument("--sha", help="head sha (default: the branch tip, via git ls-remote)")
+    parser.add_argument("--message", default="Update", help="head commit message")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET, help="default: WEBHOOK_SECRET")
+    parser.add_argument("--send", metavar="URL", help="POST it, e.g. http://localhost:8000/api/webhooks/push")
+    args = parser.parse_args()
+    if not args.secret:
+        parser.error("--secret (or WEBHOOK_SECRET) is required")
+
+    sha = args.sha
+    if not sha:
+        from git import Git
+
+        line = Git().ls_remote(args.repo_url, f"refs/heads/{args.branch}").split("\n")[0]
+        sha = line.split("\t")[0] if line else ""
+        if not sha:
+            parser.error(f"branch {args.branch} not found on {args.repo_url}")
+    body = json.dumps(push_payload(args.repo_url, args.branch, sha, args.message)).encode("utf-8")
+    headers = {"Content-Type": "application/json", EVENT_HEADER: "push", SIGNATURE_HEADER: sign(body, args.secret)}
+    if not args.send:
+        print(json.dumps({"headers": headers, "body": json.loads(body)}, indent=2))
+        return
+    import httpx
+
+    resp = httpx.post(args.send, content=body, headers=headers)
+    print(resp.status_code, resp.text)
+
+
+if __name__ == "__main__":
+    main()
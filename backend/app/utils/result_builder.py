@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 
-from app.models import RunResponse, FixResult, ScoreResult, CITimelineEntry
+from app.models import RunResponse, FixResult, ScoreResult, CITimelineEntry, SpanTiming
+from app.services.metrics import summarize
 
 
 def _compute_score(
@@ -32,6 +33,7 @@ def build_run_response(
     ci_timeline: list[dict],
     retry_limit: int = 5,
     error: str | None = None,
+    spans: list[dict] | None = None,
 ) -> RunResponse:
     """Build RunResponse matching results.json format. Always non-empty."""
     total_commits = len(fixes)
@@ -44,6 +46,8 @@ def build_run_response(
             commit_message=f.get("commit_message", f.get("message", "")),
             description=f.get("description"),
             status=f.get("status", "Fixed"),
+            commit_sha=f.get("commit_sha"),
+            pushed_sha=f.get("pushed_sha"),
         )
         for f in fixes
     ]
@@ -55,6 +59,7 @@ def build_run_response(
         )
         for e in ci_timeline
     ]
+    spans = spans or []
     return RunResponse(
         repo_url=repo_url,
         team_name=team_name,
@@ -69,4 +74,6 @@ def build_run_response(
         ci_timeline=timeline,
         retry_limit=retry_limit,
         error=error,
+        timings=summarize(spans),
+        spans=[SpanTiming(**s) for s in spans],
     )
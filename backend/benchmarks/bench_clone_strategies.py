@@ -0,0 +1,122 @@
+"""
+Benchmark: clone time and bytes for each CLONE_STRATEGY against a local fixture remote
+(served over file:// so git uses the real pack protocol). Also checks that a fix branch
+can be pushed from every strategy.
+
+Run from backend/:  python -m benchmarks.bench_clone_strategies --commits 200 --asset-kb 512
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from git import Actor, Repo
+
+from app.services.repo_service import clone_repo
+
+STRATEGIES = {
+    "full": {"full"},
+    "shallow": {"shallow"},
+    "blobless": {"blobless"},
+    "sparse": {"sparse"},
+    "shallow+sparse": {"shallow", "sparse"},
+    "blobless+sparse": {"blobless", "sparse"},
+}
+
+_AUTHOR = Actor("bench", "bench@example.com")
+
+
+def make_remote(root: Path, commits: int, asset_kb: int, seed: int = 0) -> str:
+    """Bare remote with history: every commit edits Python files and rewrites a binary asset."""
+    rng = random.Random(seed)
+    work = root / "fixture"
+    repo = Repo.init(work, initial_branch="main")
+    for pkg in range(10):
+        (work / f"pkg{pkg}").mkdir(parents=True, exist_ok=True)
+        (work / f"pkg{pkg}" / "__init__.py").write_text("", encoding="utf-8")
+    (work / "tests").mkdir(exist_ok=True)
+    (work / "assets").mkdir(exist_ok=True)
+    for i in range(commits):
+        pkg = i % 10
+        module = work / f"pkg{pkg}" / f"mod{i % 50}.py"
+        module.write_text(f"VALUE = {i}\n\n\ndef f():\n    return VALUE\n", encoding="utf-8")
+        (work / "tests" / f"test_mod{i % 50}.py").write_text("def test_ok():\n    assert True\n", encoding="utf-8")
+        (work / "assets" / f"data{i % 5}.bin").write_bytes(rng.randbytes(asset_kb * 1024))
+        repo.index.add([str(p.relative_to(work)) for p in work.rglob("*") if p.is_file() and ".git" not in p.parts])
+        repo.index.commit(f"commit {i}", author=_AUTHOR, committer=_AUTHOR)
+    remote = root / "remote.git"
+    bare = Repo.clone_from(str(work), remote, bare=True)
+    with bare.config_writer() as cw:
+        cw.set_value("uploadpack", "allowFilter", "true")
+        cw.set_value("uploadpack", "allowAnySHA1InWant", "true")
+    return remote.as_uri()
+
+
+def _size(path: Path) -> int:
+    total = 0
+    for dirpath, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def _push_fix_branch(repo: Repo, name: str) -> bool:
+    work = Path(repo.working_tree_dir)
+    repo.git.checkout("-b", name)
+    target = next(work.rglob("mod*.py"))
+    target.write_text(target.read_text(encoding="utf-8") + "# fixed\n", encoding="utf-8")
+    repo.index.add([str(target.relative_to(work))])
+    repo.index.commit("[AI-AGENT] bench fix", author=_AUTHOR, committer=_AUTHOR)
+    try:
+        repo.remote("origin").push(refspec=f"{name}:{name}").raise_if_error()
+    except Exception:
+        return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commits", type=int, default=200)
+    parser.add_argument("--asset-kb", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="bench_clone_"))
+    try:
+        url = make_remote(root, args.commits, args.asset_kb)
+        report: dict = {"commits": args.commits, "asset_kb": args.asset_kb, "strategies": {}}
+        for label, strategy in STRATEGIES.items():
+            times = []
+            for i in range(args.repeat):
+                dest = root / f"clone_{label}_{i}"
+                start = time.perf_counter()
+                repo = clone_repo(url, dest, strategy)
+                times.append(time.perf_counter() - start)
+                if i < args.repeat - 1:
+                    repo.close()
+                    shutil.rmtree(dest, ignore_errors=True)
+            git_bytes = _size(dest / ".git")
+            tree_bytes = _size(dest) - git_bytes
+            report["strategies"][label] = {
+                "seconds": round(min(times), 4),
+                "git_bytes": git_bytes,
+                "worktree_bytes": tree_bytes,
+                "files": sum(1 for p in dest.rglob("*") if p.is_file() and ".git" not in p.parts),
+                "push_ok": _push_fix_branch(repo, f"bench_{label.replace('+', '_')}"),
+            }
+            repo.close()
+        print(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
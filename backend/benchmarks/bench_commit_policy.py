@@ -0,0 +1,125 @@
+"""
+Benchmark and check: commit_node under every COMMIT_POLICY against a local bare remote.
+Two iterations are committed and pushed; the second fixes a file and line the first already
+fixed. Reports commits and pushes per policy, and checks that every fix was committed once,
+pushed, and that the remote branch has the final content. Exits non-zero if a check fails.
+
+Run from backend/:  python -m benchmarks.bench_commit_policy --files 20
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from git import Actor, Repo
+
+from app.agent import commit_node as commit_module
+from app.services.git_service import close_repo
+
+_AUTHOR = Actor("bench", "bench@example.com")
+BRANCH = "BENCH_POLICY_AI_Fix"
+# Distinct commits of iteration 1 per policy, for `files` files with two fixes each
+_EXPECTED_FIRST = {"per_fix": lambda files: files, "per_file": lambda files: files, "squash": lambda files: 1}
+
+
+def make_remote(root: Path, files: int) -> Path:
+    """Bare remote with files modules of three lines each."""
+    work = root / "fixture"
+    repo = Repo.init(work, initial_branch="main")
+    for i in range(files):
+        (work / f"mod{i}.py").write_text("a = 1\nb = 2\nc = 3\n", encoding="utf-8")
+    repo.git.add(A=True)
+    repo.index.commit("fixture", author=_AUTHOR, committer=_AUTHOR)
+    remote = root / "remote.git"
+    Repo.clone_from(str(work), remote, bare=True).close()
+    repo.close()
+    return remote
+
+
+def _edit(path: Path, line: int, text: str) -> None:
+    lines = path.read_text(encoding="utf-8").splitlines()
+    lines[line - 1] = text
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def run_policy(root: Path, remote: Path, policy: str, files: int) -> dict:
+    work = root / f"ws_{policy}"
+    repo = Repo.clone_from(remote.as_uri(), work)
+    with repo.config_writer() as cw:
+        cw.set_value("user", "name", "bench")
+        cw.set_value("user", "email", "bench@example.com")
+    repo.git.checkout("-b", BRANCH)
+    commit_module.COMMIT_POLICY = policy
+    state: dict = {"repo_path": str(work), "branch_name": BRANCH, "fixes": [], "commits": []}
+
+    # Iteration 1: two fixes per file. Iteration 2: line 1 of mod0 again (same file and line).
+    fixes = []
+    for i in range(files):
+        for line in (1, 3):
+            _edit(work / f"mod{i}.py", line, f"fixed_{line} = {line}")
+            fixes.append({"file": f"mod{i}.py", "line": line, "bug_type": "SYNTAX", "description": "applied"})
+    state["fixes"] = list(fixes)
+    start = time.perf_counter()
+    state.update(commit_module.commit_node(state))
+    first_seconds = time.perf_counter() - start
+    first_shas = {c["sha"] for c in state["commits"]}
+
+    _edit(work / "mod0.py", 1, "refixed = 1")
+    state["fixes"] = state["fixes"] + [{"file": "mod0.py", "line": 1, "bug_type": "SYNTAX", "description": "applied"}]
+    start = time.perf_counter()
+    state.update(commit_module.commit_node(state))
+    second_seconds = time.perf_counter() - start
+
+    bare = Repo(remote)
+    pushed_head = bare.heads[BRANCH].commit if BRANCH in bare.heads else None
+    remote_commits = len(list(bare.iter_commits(f"main..{BRANCH}"))) if pushed_head else 0
+    remote_mod0 = (pushed_head.tree / "mod0.py").data_stream.read().decode() if pushed_head else ""
+    bare.close()
+    close_repo(work)
+    repo.close()
+
+    commits = state["commits"]
+    checks = {
+        "every_fix_committed_once": sorted(c["fix_index"] for c in commits) == list(range(len(state["fixes"]))),
+        "all_pushed": all(c.get("pushed") for c in commits) and not state.get("push_errors"),
+        "refix_committed": commits[-1]["fix_index"] == len(fixes) and commits[-1]["sha"] not in first_shas,
+        "remote_has_refix": remote_mod0.startswith("refixed = 1\n"),
+        "first_iteration_commits": len(first_shas) == _EXPECTED_FIRST[policy](files),
+    }
+    return {
+        "first_commits": len(first_shas),
+        "remote_commits": remote_commits,
+        "first_seconds": round(first_seconds, 4),
+        "second_seconds": round(second_seconds, 4),
+        "checks": checks,
+        "ok": all(checks.values()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=20)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="bench_commit_"))
+    original = commit_module.COMMIT_POLICY
+    try:
+        report: dict = {"files": args.files, "fixes": args.files * 2 + 1, "policies": {}}
+        for policy in commit_module.COMMIT_POLICIES:
+            remote = make_remote(root / policy, args.files)
+            report["policies"][policy] = run_policy(root / policy, remote, policy, args.files)
+        report["ok"] = all(p["ok"] for p in report["policies"].values())
+        print(json.dumps(report, indent=2))
+    finally:
+        commit_module.COMMIT_POLICY = original
+        shutil.rmtree(root, ignore_errors=True)
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+End-to-end benchmark: generate a broken Python repo, push it to a local bare remote, and
+heal it with the real run path (clone_and_create_branch -> run_pipeline loop -> commit/push).
+
+Every run gets a fresh repo with bugs of each fixable bug type, each in its own module:
+  SYNTAX       def line without its colon
+  INDENTATION  over-indented statement inside a function body
+  LINTING      unused import
+  IMPORT       import of a module that is not installed (served from a local wheelhouse
+               through PIP_FIND_LINKS, so the fix is a real pip install without PyPI)
+
+Reports per-stage and per-span seconds, iterations to green, whether the fix branch reached
+the remote, and memory peaks, as JSON. With --baseline, exits 1 if any tracked metric is more
+than --threshold worse than the baseline file (a previous report, see --save-baseline).
+
+Run from backend/:  python -m benchmarks.bench_e2e --modules 50 --bugs 2 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+import zipfile
+from pathlib import Path
+
+from git import Actor, Repo
+
+from app.agent.rules import fix_cache
+from app.api.run import execute_run
+from app.models import RunRequest
+from app.services import run_events, run_store
+
+BUG_TYPES = ("SYNTAX", "INDENTATION", "LINTING", "IMPORT")
+TEAM, LEADER = "Bench Team", "Bench Leader"
+
+_AUTHOR = Actor("bench", "bench@example.com")
+
+
+def _function(name: str, k: int) -> str:
+    return f"def {name}(x):\n    y = x + {k}\n    return y\n"
+
+
+def _module(functions: int, bug: str | None, dep: str | None, errors: int = 1) -> str:
+    """
+    Module source with bug injected into its first function (or its imports). SYNTAX and
+    INDENTATION bugs break the first `errors` functions: compile reports one at a time.
+    """
+    header = ""
+    funcs = [_function(f"f{j}", j) for j in range(functions)]
+    for j in range(min(errors, functions)):
+        if bug == "SYNTAX":
+            funcs[j] = funcs[j].replace(f"def f{j}(x):", f"def f{j}(x)")
+        elif bug == "INDENTATION":
+            funcs[j] = funcs[j].replace("    return y", "        return y")
+    if bug == "LINTING":
+        header = "import os\n\n\n"
+    elif bug == "IMPORT":
+        header = f"import {dep}\n\n\n"
+        funcs[0] = f"def f0(x):\n    y = x + {dep}.OFFSET\n    return y\n"
+    return header + "\n\n".join(funcs)
+
+
+def _test_module(index: int, functions: int) -> str:
+    lines = [f"from pkg.mod{index} import " + ", ".join(f"f{j}" for j in range(functions)), ""]
+    for j in range(functions):
+        lines += ["", f"def test_f{j}():", f"    assert f{j}(1) == {1 + j}", ""]
+    return "\n".join(lines)
+
+
+def _wheel(wheelhouse: Path, name: str) -> None:
+    """Minimal pure-Python wheel providing module name with OFFSET = 0."""
+    dist_info = f"{name}-0.1.dist-info"
+    files = {
+        f"{name}/__init__.py": "OFFSET = 0\n",
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: {name}\nVersion: 0.1\n",
+        f"{dist_info}/WHEEL": "Wheel-Version: 1.0\nGenerator: bench\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = "".join(f"{path},,\n" for path in files) + f"{dist_info}/RECORD,,\n"
+    with zipfile.ZipFile(wheelhouse / f"{name}-0.1-py3-none-any.whl", "w") as whl:
+        for path, text in files.items():
+            whl.writestr(path, text)
+        whl.writestr(f"{dist_info}/RECORD", record)
+
+
+def make_broken_repo(
+    root: Path, modules: int, functions: int, bugs: int, seed: int = 0, errors_per_file: int = 1
+) -> tuple[str, dict]:
+    """
+    Bare remote holding a package of modules (each with a test file) where bugs modules per
+    bug type are broken. Missing-module wheels go to root/wheelhouse. Returns (url, injected).
+    """
+    rng = random.Random(seed)
+    broken = rng.sample(range(modules), min(modules, bugs * len(BUG_TYPES)))
+    plan = {index: BUG_TYPES[i % len(BUG_TYPES)] for i, index in enumerate(broken)}
+    wheelhouse = root / "wheelhouse"
+    wheelhouse.mkdir(exist_ok=True)
+
+    work = root / "fixture"
+    (work / "pkg").mkdir(parents=True)
+    (work / "tests").mkdir()
+    (work / "pkg" / "__init__.py").write_text("", encoding="utf-8")
+    (work / "tests" / "__init__.py").write_text("", encoding="utf-8")
+    (work / "conftest.py").write_text("", encoding="utf-8")
+    for index in range(modules):
+        bug = plan.get(index)
+        dep = f"benchdep_{index}" if bug == "IMPORT" else None
+        if dep:
+            _wheel(wheelhouse, dep)
+        (work / "pkg" / f"mod{index}.py").write_text(_module(functions, bug, dep, errors_per_file), encoding="utf-8")
+        (work / "tests" / f"test_mod{index}.py").write_text(_test_module(index, functions), encoding="utf-8")
+    repo = Repo.init(work, initial_branch="main")
+    repo.git.add(A=True)
+    repo.index.commit("broken fixture", author=_AUTHOR, committer=_AUTHOR)
+    repo.close()
+    remote = root / "remote.git"
+    Repo.clone_from(str(work), remote, bare=True).close()
+    injected = {bug_type: sum(1 for b in plan.values() if b == bug_type) for bug_type in BUG_TYPES}
+    return remote.as_uri(), injected
+
+
+def _stage_seconds(stages: list[dict]) -> dict[str, float]:
+    totals: dict[str, float] = {}
+    for s in stages:
+        totals[s["stage"]] = round(totals.get(s["stage"], 0.0) + s["seconds"], 4)
+    return totals
+
+
+def run_once(root: Path, args: argparse.Namespace, seed: int) -> dict:
+    url, injected = make_broken_repo(root, args.modules, args.functions, args.bugs, seed, args.errors_per_file)
+    if not args.warm_fix_cache:
+        fix_cache.CACHE.invalidate()
+    run_id = f"bench-{uuid.uuid4().hex[:12]}"
+    run_events.open_run(run_id)
+    if args.tracemalloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        response = execute_run(RunRequest(repo_url=url, team_name=TEAM, team_leader_name=LEADER), run_id=run_id)
+        seconds = time.perf_counter() - start
+        stages = run_events.stage_timings(run_id)
+    finally:
+        heap_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+        if args.tracemalloc:
+            tracemalloc.stop()
+        run_events.discard(run_id)
+    remote = Repo(root / "remote.git")
+    pushed = response.branch_name in remote.heads
+    remote.close()
+    return {
+        "seconds": round(seconds, 4),
+        "ci_status": response.ci_status,
+        "iterations": len(response.ci_timeline),
+        "failures": response.total_failures,
+        "fixes": response.total_fixes_applied,
+        "injected": injected,
+        "pushed": pushed,
+        "stages": _stage_seconds(stages),
+        "spans": response.timings,
+        "heap_peak_mb": round(heap_peak / 2**20, 2) if heap_peak is not None else None,
+        "error": response.error,
+    }
+
+
+def _median(runs: list[dict], key) -> float:
+    return round(statistics.median(key(r) for r in runs), 4)
+
+
+def summarize(runs: list[dict]) -> dict:
+    """Median over repeats of every tracked metric (lower is better for all of them)."""
+    stages = sorted({name for r in runs for name in r["stages"]})
+    metrics = {
+        "seconds": _median(runs, lambda r: r["seconds"]),
+        "iterations": _median(runs, lambda r: r["iterations"]),
+    }
+    metrics.update({f"stage:{name}": _median(runs, lambda r: r["stages"].get(name, 0.0)) for name in stages})
+    if runs[0]["heap_peak_mb"] is not None:
+        metrics["heap_peak_mb"] = _median(runs, lambda r: r["heap_peak_mb"])
+    return metrics
+
+
+def regressions(metrics: dict, baseline: dict, threshold: float, min_seconds: float) -> list[dict]:
+    """Metrics worse than baseline by more than threshold (ratio). Tiny stages are ignored as noise."""
+    found = []
+    for name, base in baseline.items():
+        current = metrics.get(name)
+        if current is None or (name != "iterations" and max(current, base) < min_seconds):
+            continue
+        if current > base * (1 + threshold):
+            found.append({"metric": name, "baseline": base, "current": current})
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", type=int, default=50)
+    parser.add_argument("--functions", type=int, default=5, help="functions (and tests) per module")
+    parser.add_argument("--bugs", type=int, default=2, help="broken modules per bug type")
+    parser.add_argument("--errors-per-file", type=int, default=1, help="syntax/indentation errors per broken module")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm-fix-cache", action="store_true", help="keep fix cache entries between repeats")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report Python heap peaks (slows the run)")
+    parser.add_argument("--baseline", type=Path, help="report to compare against; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown ratio per metric")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="ignore metrics below this in both runs")
+    parser.add_argument("--save-baseline", type=Path, help="write this report for later --baseline runs")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="bench_e2e_"))
+    # Runs are stored and exported under root, not in backend/runs.db and results.json
+    run_store.RUN_STORE_PATH = root / "runs.db"
+    run_store.RESULTS_EXPORT_PATH = str(root / "results.json")
+    try:
+        runs = []
+        for i in range(args.repeat):
+            run_root = root / f"run{i}"
+            run_root.mkdir()
+            os.environ["PIP_FIND_LINKS"] = str(run_root / "wheelhouse")
+            runs.append(run_once(run_root, args, args.seed + i))
+        run_store.flush()
+        report = {
+            "modules": args.modules,
+            "functions": args.functions,
+            "bugs_per_type": args.bugs,
+            "errors_per_file": args.errors_per_file,
+            "repeat": args.repeat,
+            "metrics": summarize(runs),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "children_max_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+            "runs": runs,
+        }
+        failed = False
+        if args.baseline:
+            baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["metrics"]
+            report["regressions"] = regressions(report["metrics"], baseline, args.threshold, args.min_seconds)
+            failed = bool(report["regressions"])
+        if args.save_baseline:
+            args.save_baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(json.dumps(report, indent=2))
+        if failed:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark: unused-import pass cold vs warm (content-hash cache) on a synthetic repo.
+
+Run from backend/:  python -m benchmarks.bench_lint_check --files 5000
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from app.services import file_pass, lint_check
+from benchmarks.bench_syntax_check import make_repo
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--touch", type=int, default=2, help="files edited between iterations")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="bench_lint_"))
+    try:
+        paths = make_repo(root, args.files, broken_ratio=0.0)
+        report: dict = {"files": args.files, "workers": file_pass.CHECK_WORKERS}
+
+        lint_check.clear_cache()
+        start = time.perf_counter()
+        findings, parsed = lint_check.check_files(root)
+        report["cold_seconds"] = round(time.perf_counter() - start, 4)
+        report["cold_parsed"] = parsed
+        report["findings"] = len(findings)
+
+        for p in paths[: args.touch]:
+            p.write_text(p.read_text(encoding="utf-8") + "\n# edited\n", encoding="utf-8")
+        start = time.perf_counter()
+        _findings, parsed = lint_check.check_files(root)
+        report["warm_seconds"] = round(time.perf_counter() - start, 4)
+        report["warm_parsed"] = parsed
+        print(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
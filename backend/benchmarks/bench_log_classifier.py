@@ -0,0 +1,115 @@
+"""
+Benchmark: legacy line-by-line failure parsing vs the single-pass classifier on large logs.
+
+Run from backend/:  python -m benchmarks.bench_log_classifier --mb 10
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from app.agent.classifier import PATTERN_TO_BUG_TYPE, classify, classify_file
+
+_PASSING = "tests/test_mod{m}.py::test_case_{n} PASSED{pad}[ {pct}%]\n"
+_TRACEBACK = (
+    "_____________________________ test_case_{n} _____________________________\n"
+    "Traceback (most recent call last):\n"
+    '  File "/tmp/repo/src/mod{m}.py", line {line}, in helper\n'
+    "    value = compute(x)\n"
+    "{error}\n"
+)
+_ERRORS = [
+    "E   AssertionError: assert 1 == 2",
+    "E   TypeError: unsupported operand type(s)",
+    "E   ModuleNotFoundError: No module named 'yaml'",
+    "E   SyntaxError: expected ':'",
+    "E   IndentationError: unexpected indent",
+]
+
+
+def make_log(target_bytes: int, failure_every: int = 200, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    n = 0
+    while size < target_bytes:
+        if n % failure_every == 0:
+            chunk = _TRACEBACK.format(n=n, m=n % 50, line=rng.randint(1, 400), error=rng.choice(_ERRORS))
+        else:
+            chunk = _PASSING.format(m=n % 50, n=n, pad=" " * 20, pct=n % 100)
+        parts.append(chunk)
+        size += len(chunk)
+        n += 1
+    parts.append("FAILED tests/test_mod1.py::test_case_0 - AssertionError\n")
+    return "".join(parts)
+
+
+def _legacy_detect(error_message: str) -> str | None:
+    msg_lower = error_message.lower()
+    for pattern, bug_type in PATTERN_TO_BUG_TYPE.items():
+        if pattern.lower() in msg_lower:
+            return bug_type
+    return None
+
+
+def legacy_parse(test_output: str) -> list[tuple[str, int | None, str]]:
+    """The original parse_pytest_failures traceback pass (without path rewriting)."""
+    found = []
+    lines = test_output.split("\n")
+    for i, line in enumerate(lines):
+        if 'File "' in line and ", line " in line:
+            m = re.search(r'File\s+"([^"]+\.py)"[^,]*,\s*line\s+(\d+)', line)
+            if m:
+                block = " ".join(lines[max(0, i - 3) : min(len(lines), i + 6)])
+                bug_type = _legacy_detect(block)
+                if bug_type:
+                    found.append((m.group(1).strip(), int(m.group(2)), bug_type))
+    seen = set()
+    unique = []
+    for f in found:
+        if f[:2] not in seen:
+            seen.add(f[:2])
+            unique.append(f)
+    return unique
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=10.0)
+    args = parser.parse_args()
+
+    log = make_log(int(args.mb * 1024 * 1024))
+    report: dict = {"log_bytes": len(log.encode())}
+
+    start = time.perf_counter()
+    legacy = legacy_parse(log)
+    report["legacy_seconds"] = round(time.perf_counter() - start, 4)
+
+    start = time.perf_counter()
+    new = classify(log)
+    report["classifier_seconds"] = round(time.perf_counter() - start, 4)
+
+    fd, name = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    try:
+        Path(name).write_text(log, encoding="utf-8")
+        start = time.perf_counter()
+        mapped = classify_file(Path(name))
+        report["classifier_mmap_seconds"] = round(time.perf_counter() - start, 4)
+    finally:
+        os.unlink(name)
+
+    new_keys = [(f["file"], f["line"], f["bug_type"]) for f in new]
+    report["failures"] = len(new)
+    report["matches_legacy"] = new_keys == legacy
+    report["mmap_matches"] = [(f["file"], f["line"], f["bug_type"]) for f in mapped] == new_keys
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
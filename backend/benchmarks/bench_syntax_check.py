@@ -0,0 +1,115 @@
+"""
+Benchmark: legacy serial py_compile loop vs in-memory cached syntax check.
+
+Run from backend/:  python -m benchmarks.bench_syntax_check --files 10000
+"""
+
+import argparse
+import json
+import py_compile
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from app.services import file_pass, syntax_check
+from app.services.file_pass import iter_python_files
+from app.services.syntax_check import check_files
+
+_TEMPLATE = '''import os
+
+
+class Widget{n}:
+    def __init__(self, value):
+        self.value = value
+
+    def scaled(self, factor):
+        if factor > 0:
+            return self.value * factor
+        return 0
+
+
+def helper_{n}(items):
+    total = 0
+    for item in items:
+        total += item
+    return total
+'''
+
+
+def make_repo(root: Path, n_files: int, broken_ratio: float, seed: int = 0) -> list[Path]:
+    """Generate n_files modules in nested packages; a fraction get a missing colon."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(n_files):
+        pkg = root / f"pkg{i // 100}"
+        pkg.mkdir(parents=True, exist_ok=True)
+        src = _TEMPLATE.format(n=i)
+        if rng.random() < broken_ratio:
+            src = src.replace("def helper_", "def broken_", 1).replace("(items):", "(items)", 1)
+        path = pkg / f"mod{i}.py"
+        path.write_text(src, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def legacy_check(repo_path: Path) -> int:
+    """The original run_syntax_check loop (writes .pyc into __pycache__)."""
+    failures = 0
+    for py_file in repo_path.rglob("*.py"):
+        if any(p in py_file.parts for p in file_pass.SKIP_DIRS):
+            continue
+        try:
+            py_compile.compile(str(py_file), doraise=True)
+        except py_compile.PyCompileError:
+            failures += 1
+    return failures
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--broken", type=float, default=0.01)
+    parser.add_argument("--touch", type=int, default=2, help="files edited between iterations")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="bench_syntax_"))
+    try:
+        paths = make_repo(root, args.files, args.broken)
+        report: dict = {"files": args.files, "workers": file_pass.CHECK_WORKERS}
+
+        legacy_dir = root.parent / (root.name + "_legacy")
+        shutil.copytree(root, legacy_dir)
+        t, n = _timed(lambda: legacy_check(legacy_dir))
+        report["legacy_seconds"] = round(t, 4)
+        report["legacy_failures"] = n
+        shutil.rmtree(legacy_dir, ignore_errors=True)
+
+        syntax_check.clear_cache()
+        t, (failures, compiled) = _timed(lambda: check_files(root))
+        report["cold_seconds"] = round(t, 4)
+        report["cold_compiled"] = compiled
+        report["failures"] = len(failures)
+
+        for p in paths[: args.touch]:
+            p.write_text(p.read_text(encoding="utf-8") + "\n# edited\n", encoding="utf-8")
+        t, (_failures, compiled) = _timed(lambda: check_files(root))
+        report["warm_seconds"] = round(t, 4)
+        report["warm_compiled"] = compiled
+
+        report["pyc_written"] = sum(1 for _ in root.rglob("*.pyc"))
+        report["py_files"] = sum(1 for _ in iter_python_files(root))
+        print(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: check/fix rounds to heal multi-error files, first-error-only compile() vs the
+recovering multi-error diagnostics (SYNTAX_REPORT_ALL).
+
+Every fixture module gets --errors errors, mixing missing colons, over-indented statements and
+unindented block bodies. Each round syntax-checks the files still broken, applies the
+SYNTAX/INDENTATION line fixes, and repeats until the files compile or a round fixes nothing.
+
+Run from backend/:  python -m benchmarks.bench_syntax_diagnostics --files 200 --errors 5
+"""
+
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from app.agent.rules import apply_rule_fixes, fix_cache, syntax_failure
+from app.services import syntax_check
+
+_FUNCTION = '''def func_{n}_{k}(items, factor):
+    total = 0
+    for item in items:
+        if item > factor:
+            total += item * factor
+        else:
+            total -= item
+    while total > 100:
+        total //= 2
+    return total
+'''
+
+# (find, replace) applied to one function: each leaves exactly one error
+_INJECTIONS = (
+    ("    for item in items:", "    for item in items"),
+    ("        if item > factor:", "        if item > factor"),
+    ("    while total > 100:", "    while total > 100"),
+    ("    total = 0\n", "        total = 0\n"),
+    ("        else:", "        else"),
+    ("            total -= item", "        total -= item"),
+)
+
+
+def make_fixtures(root: Path, n_files: int, functions: int, errors: int, seed: int = 0) -> int:
+    """Write n_files modules with errors injected errors each (one per function). Returns errors injected."""
+    rng = random.Random(seed)
+    injected = 0
+    for i in range(n_files):
+        funcs = [_FUNCTION.format(n=i, k=k) for k in range(functions)]
+        for k in rng.sample(range(functions), min(errors, functions)):
+            find, replace = rng.choice(_INJECTIONS)
+            funcs[k] = funcs[k].replace(find, replace, 1)
+            injected += 1
+        (root / f"mod{i}.py").write_text("\n\n".join(funcs), encoding="utf-8")
+    return injected
+
+
+def heal(repo_path: Path, report_all: bool, max_rounds: int) -> dict:
+    """Check/fix rounds until every file compiles or a round makes no progress."""
+    syntax_check.SYNTAX_REPORT_ALL = report_all
+    syntax_check.clear_cache()
+    fix_cache.CACHE.invalidate()
+    files = None
+    rounds = fixes = 0
+    reported_first_round = None
+    check_seconds = fix_seconds = 0.0
+    failures: list = []
+    for _ in range(max_rounds):
+        start = time.perf_counter()
+        results, _compiled = syntax_check.check_files(repo_path, files)
+        check_seconds += time.perf_counter() - start
+        failures = [syntax_failure(*r) for r in results]
+        if reported_first_round is None:
+            reported_first_round = len(failures)
+        if not failures:
+            break
+        rounds += 1
+        start = time.perf_counter()
+        fixed = apply_rule_fixes(failures, repo_path)
+        fix_seconds += time.perf_counter() - start
+        if not fixed:
+            break
+        fixes += len(fixed)
+        files = [repo_path / f for f in sorted({f["file"] for f in fixed})]
+    return {
+        "rounds": rounds,
+        "fixes": fixes,
+        "reported_first_round": reported_first_round,
+        "remaining_errors": len(failures),
+        "check_seconds": round(check_seconds, 4),
+        "fix_seconds": round(fix_seconds, 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--functions", type=int, default=8, help="functions per module")
+    parser.add_argument("--errors", type=int, default=5, help="errors per module (at most one per function)")
+    parser.add_argument("--max-rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="bench_syntax_diag_"))
+    saved = syntax_check.SYNTAX_REPORT_ALL
+    try:
+        fixtures = root / "fixtures"
+        fixtures.mkdir()
+        injected = make_fixtures(fixtures, args.files, args.functions, args.errors, args.seed)
+        report: dict = {"files": args.files, "errors_per_file": args.errors, "injected": injected}
+        for mode, report_all in (("first_error", False), ("all_errors", True)):
+            work = root / mode
+            shutil.copytree(fixtures, work)
+            report[mode] = heal(work, report_all, args.max_rounds)
+        report["rounds_saved"] = report["first_error"]["rounds"] - report["all_errors"]["rounds"]
+        print(json.dumps(report, indent=2))
+    finally:
+        syntax_check.SYNTAX_REPORT_ALL = saved
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
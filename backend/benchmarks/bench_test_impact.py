@@ -0,0 +1,92 @@
+"""
+Benchmark: confirming pytest run after a one-module fix, full suite vs the tests import_graph
+selects. The synthetic repo has packages of modules, each imported by its own test modules,
+plus a shared core module every package imports; the "fix" touches one leaf module.
+
+Run from backend/:  python -m benchmarks.bench_test_impact --packages 10 --modules 10 --tests 30
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.services import import_graph
+from app.services.test_runner import run_pytest
+
+
+def make_repo(root: Path, packages: int, modules: int, tests: int) -> list[str]:
+    """Write the repo; returns leaf module paths (repo-relative). packages * modules * tests tests in total."""
+    (root / "src" / "app_core").mkdir(parents=True)
+    (root / "src" / "app_core" / "__init__.py").write_text("", encoding="utf-8")
+    (root / "src" / "app_core" / "base.py").write_text("def ident(x):\n    return x\n", encoding="utf-8")
+    (root / "tests").mkdir()
+    (root / "conftest.py").write_text("import sys\nsys.path.insert(0, 'src')\n", encoding="utf-8")
+    leaves = []
+    for p in range(packages):
+        pkg = root / "src" / f"pkg{p}"
+        pkg.mkdir()
+        (pkg / "__init__.py").write_text("", encoding="utf-8")
+        for m in range(modules):
+            (pkg / f"mod{m}.py").write_text(
+                f"from app_core.base import ident\n\n\ndef value(n):\n    return ident(n) + {m}\n", encoding="utf-8"
+            )
+            leaves.append(f"src/pkg{p}/mod{m}.py")
+            body = "".join(
+                f"\n\ndef test_value_{t}():\n    assert value({t}) == {t + m}\n" for t in range(tests)
+            )
+            (root / "tests" / f"test_pkg{p}_mod{m}.py").write_text(
+                f"from pkg{p}.mod{m} import value\n{body}", encoding="utf-8"
+            )
+    return leaves
+
+
+def _timed_run(root: Path, test_ids: list[str] | None) -> tuple[float, int, int]:
+    start = time.perf_counter()
+    exit_code, _out, _err, records = run_pytest(root, test_ids=test_ids, python=sys.executable)
+    return round(time.perf_counter() - start, 4), exit_code, len(records)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--packages", type=int, default=10)
+    parser.add_argument("--modules", type=int, default=10, help="modules per package")
+    parser.add_argument("--tests", type=int, default=30, help="tests per module")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="bench_impact_"))
+    try:
+        leaves = make_repo(root, args.packages, args.modules, args.tests)
+        report: dict = {
+            "tests": args.packages * args.modules * args.tests,
+            "python_files": len(list(root.rglob("*.py"))),
+        }
+
+        report["full_seconds"], report["full_exit_code"], report["full_records"] = _timed_run(root, None)
+
+        import_graph.clear_cache()
+        start = time.perf_counter()
+        import_graph.affected_tests(root, [])
+        report["graph_cold_seconds"] = round(time.perf_counter() - start, 4)
+
+        fixed = leaves[len(leaves) // 2]
+        path = root / fixed
+        path.write_text(path.read_text(encoding="utf-8") + "\n# fixed\n", encoding="utf-8")
+        start = time.perf_counter()
+        selected = import_graph.affected_tests(root, [fixed])
+        report["graph_warm_seconds"] = round(time.perf_counter() - start, 4)
+        report["selected_modules"] = len(selected or [])
+
+        seconds, report["impacted_exit_code"], report["impacted_records"] = _timed_run(root, selected)
+        report["impacted_seconds"] = round(seconds + report["graph_warm_seconds"], 4)
+        report["speedup"] = round(report["full_seconds"] / max(report["impacted_seconds"], 1e-9), 2)
+        print(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
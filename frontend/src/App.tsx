@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import type { RunResponse, RunRequest } from "./types";
+import type { JobStatus, RunResponse, RunRequest } from "./types";
 import { Section1RunSummary } from "./sections/Section1RunSummary";
 import { Section2WhatHappened } from "./sections/Section2WhatHappened";
 import { Section3Score } from "./sections/Section3Score";
@@ -17,6 +17,8 @@ const BACKEND_BASE = import.meta.env.VITE_API_URL
 
 const GITHUB_TOKEN_KEY = "cicd_agent_github_token";
 
+const POLL_INTERVAL_MS = 1500;
+
 const LOADING_STEPS = [
   "Cloning repository…",
   "Running tests…",
@@ -42,6 +44,66 @@ function useLoadingStep(loading: boolean): string {
   return LOADING_STEPS[stepIndex] ?? LOADING_STEPS[0];
 }
 
+const STAGE_LABELS: Record<string, string> = {
+  clone: "Cloning repository…",
+  syntax_check: "Checking syntax…",
+  syntax_fix: "Repairing syntax…",
+  lint: "Checking imports…",
+  pytest: "Running tests…",
+  fix: "Applying fixes…",
+  review: "Reviewing fixes…",
+  commit: "Committing fixes…",
+  push: "Pushing changes…",
+};
+
+/** Live stage and test counts from GET /api/runs/{id}/events; null until the first event. */
+function useRunProgress(jobId: string | null): string | null {
+  const [progress, setProgress] = useState<string | null>(null);
+  useEffect(() => {
+    setProgress(null);
+    if (!jobId) return;
+    let iteration = 0;
+    let stage = "";
+    let passed = 0;
+    let failed = 0;
+    const render = () => {
+      const counts = passed + failed > 0 ? ` (${passed} passed, ${failed} failed)` : "";
+      const prefix = iteration > 0 ? `Iteration ${iteration} · ` : "";
+      setProgress(`${prefix}${STAGE_LABELS[stage] ?? "Working…"}${stage === "pytest" ? counts : ""}`);
+    };
+    const source = new EventSource(`${API_BASE}/runs/${jobId}/events`);
+    source.addEventListener("iteration", (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      if (data.status === "started") {
+        iteration = data.iteration;
+        passed = 0;
+        failed = 0;
+        render();
+      }
+    });
+    source.addEventListener("stage", (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      if (data.status === "started") {
+        stage = data.stage;
+        if (stage === "pytest") {
+          passed = 0;
+          failed = 0;
+        }
+        render();
+      }
+    });
+    source.addEventListener("test", (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      if (data.outcome === "passed") passed += 1;
+      else if (data.outcome === "failed" || data.outcome === "error") failed += 1;
+      render();
+    });
+    source.addEventListener("done", () => source.close());
+    return () => source.close();
+  }, [jobId]);
+  return progress;
+}
+
 function getStoredToken(): string | null {
   try {
     return localStorage.getItem(GITHUB_TOKEN_KEY);
@@ -59,6 +121,25 @@ function setStoredToken(token: string | null) {
   }
 }
 
+function errorDetail(data: unknown): string {
+  const detail = (data as { detail?: unknown } | null)?.detail;
+  if (Array.isArray(detail)) {
+    return detail.map((d: { msg?: string }) => d?.msg).filter(Boolean).join("; ");
+  }
+  return typeof detail === "string" ? detail : "Request failed";
+}
+
+async function waitForRun(jobId: string): Promise<JobStatus> {
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+    const res = await fetch(`${API_BASE}/runs/${jobId}`);
+    const data = await res.json();
+    if (!res.ok) throw new Error(errorDetail(data) || "Request failed");
+    const job = data as JobStatus;
+    if (job.status === "completed" || job.status === "failed") return job;
+  }
+}
+
 function isAuthPushError(error: string | null | undefined): boolean {
   if (!error) return false;
   const lower = error.toLowerCase();
@@ -72,7 +153,9 @@ export default function App() {
   const [githubToken, setGithubToken] = useState<string | null>(getStoredToken);
   const [authError, setAuthError] = useState<string | null>(null);
   const [showAuthPopup, setShowAuthPopup] = useState(false);
+  const [jobId, setJobId] = useState<string | null>(null);
   const loadingStep = useLoadingStep(loading);
+  const progress = useRunProgress(loading ? jobId : null);
 
   useEffect(() => {
     if (result?.error && isAuthPushError(result.error)) {
@@ -120,16 +203,17 @@ export default function App() {
       });
       const data = await res.json();
       if (!res.ok) {
-        const msg = Array.isArray(data?.detail)
-          ? data.detail.map((d: { msg?: string }) => d?.msg).filter(Boolean).join("; ")
-          : typeof data?.detail === "string"
-            ? data.detail
-            : "Request failed";
-        setError(msg || "Request failed");
+        setError(errorDetail(data) || "Request failed");
+        return;
+      }
+      setJobId((data as JobStatus).job_id);
+      const job = await waitForRun((data as JobStatus).job_id);
+      if (!job.result) {
+        setError(job.error || "Run failed");
         return;
       }
-      setResult(data as RunResponse);
-      console.log("API response:", JSON.stringify(data, null, 2));
+      setResult(job.result);
+      console.log("API response:", JSON.stringify(job.result, null, 2));
     } catch (e) {
       setError(e instanceof Error ? e.message : "Request failed");
     } finally {
@@ -244,7 +328,7 @@ export default function App() {
             }}
           />
           <span style={{ fontSize: "1.1rem", fontWeight: 500, color: "#1e293b" }}>
-            {loadingStep}
+            {progress ?? loadingStep}
           </span>
         </div>
       )}
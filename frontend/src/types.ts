@@ -6,6 +6,8 @@ export interface FixResult {
   commit_message: string;
   description?: string | null;
   status: string;
+  commit_sha?: string | null;
+  pushed_sha?: string | null;
 }
 
 export interface ScoreResult {
@@ -21,6 +23,13 @@ export interface CITimelineEntry {
   timestamp: string;
 }
 
+export interface SpanTiming {
+  name: string;
+  parent?: string | null;
+  start_offset: number;
+  seconds: number;
+}
+
 export interface RunResponse {
   repo_url: string;
   team_name: string;
@@ -35,6 +44,8 @@ export interface RunResponse {
   ci_timeline: CITimelineEntry[];
   retry_limit?: number;
   error?: string | null;
+  timings?: Record<string, number>;
+  spans?: SpanTiming[];
 }
 
 export interface RunRequest {
@@ -42,4 +53,30 @@ export interface RunRequest {
   team_name: string;
   team_leader_name: string;
   github_token?: string | null;
+  profile?: boolean | null;
+  ref?: string | null;
+  sha?: string | null;
+  replace_fix_branch?: boolean;
+}
+
+export interface StageTiming {
+  stage: string;
+  iteration: number;
+  status: string;
+  started_at: string;
+  seconds: number;
+}
+
+/** POST /api/run returns a job; poll GET /api/runs/{job_id} until result is set */
+export interface JobStatus {
+  job_id: string;
+  status: "queued" | "running" | "completed" | "failed";
+  repo_url: string;
+  queued_at: string;
+  started_at?: string | null;
+  finished_at?: string | null;
+  result?: RunResponse | null;
+  error?: string | null;
+  stages?: StageTiming[];
+  profiles?: string[];
 }